@@ -0,0 +1,66 @@
+"""
+Memory and time of holding a full table scan as dicts, __slots__ records or
+column batches, against the in-memory backend. Text values are shared with the
+backend's rows here, so the numbers compare container overhead:
+
+    python -m benchmarks.bench_compact --scale medium --table orders
+"""
+import argparse
+import gc
+import json
+import sys
+import time
+import tracemalloc
+
+def scan(table: str, columns: str, mode):
+    from src.dao.compact import COLUMNS, merge_batches
+    from src.dao.export_dao import ExportDAO
+    rows = ExportDAO().iter_table(table, columns, compact=mode)
+    if mode == COLUMNS:
+        return merge_batches(rows)
+    return list(rows)
+
+def measure(table: str, columns: str, mode) -> dict:
+    gc.collect()
+    tracemalloc.start()
+    started = time.perf_counter()
+    held = scan(table, columns, mode)
+    elapsed = time.perf_counter() - started
+    current, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    n = len(held) if held is not None else 0
+    started = time.perf_counter()
+    if held is not None:
+        # One pass over every row, as a report would do
+        for row in (held.records() if hasattr(held, "records") else held):
+            row["order_id" if "order_id" in row else next(iter(row))]
+    iterate = time.perf_counter() - started
+    return {"mode": mode or "dicts", "rows": n, "retained_mb": round(current / 2**20, 2),
+            "peak_mb": round(peak / 2**20, 2), "bytes_per_row": round(current / n, 1) if n else None,
+            "scan_s": round(elapsed, 3), "iterate_s": round(iterate, 3)}
+
+def main():
+    from benchmarks.datagen import SCALES, generate
+    from benchmarks.fake_supabase import FakeSupabase
+    parser = argparse.ArgumentParser(description="Compare compact result modes for large scans")
+    parser.add_argument("--scale", default="small", choices=list(SCALES))
+    parser.add_argument("--table", default="orders", choices=["orders", "order_items", "products", "customers"])
+    parser.add_argument("--columns", default="*")
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    from src import config
+    backend = FakeSupabase()
+    generate(backend, args.scale, args.seed)
+    config.set_client_factory(lambda: backend)
+    try:
+        scan(args.table, args.columns, None)  # warm the backend so the first mode isn't charged for it
+        results = [measure(args.table, args.columns, mode) for mode in (None, "records", "columns")]
+    finally:
+        config.set_client_factory(None)
+    json.dump({"scale": args.scale, "table": args.table, "columns": args.columns, "results": results},
+              sys.stdout, indent=2)
+    print()
+
+if __name__ == "__main__":
+    main()
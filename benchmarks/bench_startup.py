@@ -0,0 +1,73 @@
+"""
+CLI startup benchmark.
+
+Times `python -m src.cli.main --help` in fresh interpreters and checks that
+parsing the command line imports none of the heavy client libraries.
+Exits non-zero when the median is over budget, so cron hosts and CI can run it:
+
+    python -m benchmarks.bench_startup --runs 20 --budget_ms 150
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Modules that only the command actually being run may import
+HEAVY_MODULES = ["supabase", "postgrest", "httpx", "dotenv", "numpy", "pyarrow"]
+
+PROBE = """
+import json, sys
+from src.cli.main import RetailCLI
+RetailCLI().parser.parse_args(["product", "list"])
+print(json.dumps(sorted(m for m in {heavy!r} if m in sys.modules)))
+"""
+
+def time_help(runs: int) -> list:
+    samples = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        subprocess.run([sys.executable, "-m", "src.cli.main", "--help"], cwd=ROOT,
+                       stdout=subprocess.DEVNULL, check=True)
+        samples.append((time.perf_counter() - start) * 1000)
+    return samples
+
+def baseline(runs: int) -> float:
+    samples = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        subprocess.run([sys.executable, "-c", "pass"], check=True)
+        samples.append((time.perf_counter() - start) * 1000)
+    return statistics.median(samples)
+
+def heavy_imports() -> list:
+    out = subprocess.run([sys.executable, "-c", PROBE.format(heavy=HEAVY_MODULES)], cwd=ROOT,
+                         capture_output=True, text=True, check=True)
+    return json.loads(out.stdout)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--runs", type=int, default=10)
+    parser.add_argument("--budget_ms", type=float, default=float(os.getenv("CLI_STARTUP_BUDGET_MS", "150")),
+                        help="allowed median wall time of `--help`, interpreter start included")
+    args = parser.parse_args()
+
+    samples = time_help(args.runs)
+    result = {
+        "runs": args.runs,
+        "python_startup_ms": round(baseline(args.runs), 1),
+        "help_median_ms": round(statistics.median(samples), 1),
+        "help_max_ms": round(max(samples), 1),
+        "budget_ms": args.budget_ms,
+        "heavy_modules_imported": heavy_imports(),
+    }
+    result["ok"] = result["help_median_ms"] <= args.budget_ms and not result["heavy_modules_imported"]
+    print(json.dumps(result, indent=2))
+    sys.exit(0 if result["ok"] else 1)
+
+if __name__ == "__main__":
+    main()
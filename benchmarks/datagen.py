@@ -0,0 +1,83 @@
+"""
+Deterministic synthetic data for the benchmarks: a catalog, customers and a
+history of orders (with lines and payments) spread over the last 90 days.
+"""
+import csv
+import random
+from datetime import datetime, timedelta, timezone
+from typing import Dict
+
+# name -> (products, customers, orders)
+SCALES = {
+    "tiny": (50, 100, 300),
+    "small": (500, 2_000, 10_000),
+    "medium": (5_000, 20_000, 100_000),
+    "large": (20_000, 100_000, 500_000),
+}
+
+CATEGORIES = ["grocery", "dairy", "bakery", "beverages", "household", "personal-care", "snacks", "frozen"]
+CITIES = ["Hyderabad", "Bengaluru", "Chennai", "Mumbai", "Pune", "Delhi", "Kolkata"]
+
+def generate(backend, scale: str = "small", seed: int = 42) -> Dict[str, int]:
+    """
+    Load a dataset of the given scale into a FakeSupabase. Returns row counts.
+    """
+    n_products, n_customers, n_orders = SCALES[scale]
+    rng = random.Random(seed)
+    now = datetime.now(timezone.utc)
+
+    products = [{
+        "product_id": i, "name": f"Product {i}", "sku": f"SKU-{i:07d}",
+        "price": round(rng.uniform(10, 2000), 2), "category": rng.choice(CATEGORIES),
+        # Most items well stocked, a tail near the reorder line
+        "stock": rng.randint(0, 10) if rng.random() < 0.05 else rng.randint(10_000, 50_000),
+        "created_at": (now - timedelta(days=365)).isoformat(),
+    } for i in range(1, n_products + 1)]
+    backend.load("products", products)
+    prices = {p["product_id"]: p["price"] for p in products}
+
+    backend.load("customers", ({
+        "customer_id": i, "name": f"Customer {i}", "email": f"customer{i}@example.com",
+        "phone": f"9{rng.randint(100000000, 999999999)}", "city": rng.choice(CITIES),
+        "created_at": (now - timedelta(days=365)).isoformat(),
+    } for i in range(1, n_customers + 1)))
+
+    orders, items, payments = [], [], []
+    item_id = 1
+    # A few hot products get most of the sales, as in real baskets
+    weights = [1.0 / (rank ** 0.8) for rank in range(1, n_products + 1)]
+    for order_id in range(1, n_orders + 1):
+        created = now - timedelta(seconds=rng.uniform(0, 90 * 86400))
+        status = rng.choices(["COMPLETED", "PLACED", "CANCELLED"], [0.7, 0.2, 0.1])[0]
+        lines = {}
+        for pid in rng.choices(range(1, n_products + 1), weights, k=rng.randint(1, 4)):
+            lines[pid] = lines.get(pid, 0) + rng.randint(1, 3)
+        total = 0.0
+        for pid, qty in lines.items():
+            items.append({"order_item_id": item_id, "order_id": order_id, "product_id": pid, "quantity": qty,
+                          "created_at": created.isoformat()})
+            item_id += 1
+            total += prices[pid] * qty
+        orders.append({"order_id": order_id, "customer_id": rng.randint(1, n_customers), "status": status,
+                       "total_amount": round(total, 2), "created_at": created.isoformat()})
+        payments.append({"payment_id": order_id, "order_id": order_id, "amount": round(total, 2),
+                         "status": {"COMPLETED": "PAID", "PLACED": "PENDING", "CANCELLED": "REFUNDED"}[status],
+                         "method": None if status == "PLACED" else rng.choice(["Cash", "Card", "UPI"]),
+                         "created_at": created.isoformat()})
+    backend.load("orders", orders)
+    backend.load("order_items", items)
+    backend.load("payments", payments)
+    return {"products": n_products, "customers": n_customers, "orders": n_orders, "order_items": len(items)}
+
+def write_product_csv(path: str, rows: int, start: int = 1, seed: int = 7) -> str:
+    """
+    A product import file with rows new SKUs (SKU-IMP-<n>), for the bulk import scenario.
+    """
+    rng = random.Random(seed)
+    with open(path, "w", newline="", encoding="utf-8") as f:
+        writer = csv.DictWriter(f, fieldnames=["name", "sku", "price", "stock", "category"])
+        writer.writeheader()
+        for i in range(start, start + rows):
+            writer.writerow({"name": f"Imported {i}", "sku": f"SKU-IMP-{i:07d}", "price": round(rng.uniform(10, 500), 2),
+                             "stock": rng.randint(0, 500), "category": rng.choice(CATEGORIES)})
+    return path
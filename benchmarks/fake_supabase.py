@@ -0,0 +1,454 @@
+"""
+In-memory stand-in for the supabase client, for benchmarks and local runs.
+
+Speaks the part of the postgrest query chain the DAOs use: table/select/insert/
+upsert/update/delete, eq/neq/gt/gte/lt/lte/in_/is_/like/ilike filters,
+order/limit/range, resource embedding in select() and rpc() for the functions
+in sql/. Unique and foreign-key violations raise errors with the Postgres codes
+the DAOs map. `latency` seconds are slept on every request to model a network
+round trip; `calls` counts requests per (table, operation).
+"""
+import copy
+import re
+import threading
+import time
+from datetime import datetime, timezone
+from typing import Any, Callable, Dict, Iterable, List, Optional
+
+PRIMARY_KEYS = {
+    "customers": "customer_id",
+    "products": "product_id",
+    "orders": "order_id",
+    "order_items": "order_item_id",
+    "payments": "payment_id",
+}
+
+UNIQUE = {
+    "customers": ["email"],
+    "products": ["sku"],
+}
+
+# child table -> {fk column: parent table}
+FOREIGN_KEYS = {
+    "orders": {"customer_id": "customers"},
+    "order_items": {"order_id": "orders", "product_id": "products"},
+    "payments": {"order_id": "orders"},
+}
+
+def _indexed_columns(table: str) -> List[str]:
+    return [PRIMARY_KEYS[table]] + UNIQUE.get(table, []) + list(FOREIGN_KEYS.get(table, {}))
+
+class FakeAPIError(Exception):
+    def __init__(self, message: str, code: str = ""):
+        super().__init__(message)
+        self.message = message
+        self.code = code
+
+class FakeResponse:
+    def __init__(self, data, count=None):
+        self.data = data
+        self.count = count
+
+def _split_top(s: str) -> List[str]:
+    parts, depth, cur = [], 0, ""
+    for ch in s:
+        if ch == "(":
+            depth += 1
+        elif ch == ")":
+            depth -= 1
+        if ch == "," and depth == 0:
+            parts.append(cur.strip())
+            cur = ""
+        else:
+            cur += ch
+    if cur.strip():
+        parts.append(cur.strip())
+    return parts
+
+def _like(pattern: str, value: Any, ci: bool) -> bool:
+    if value is None:
+        return False
+    rx, i = "^", 0
+    while i < len(pattern):
+        ch = pattern[i]
+        if ch == "\\" and i + 1 < len(pattern):
+            i += 1
+            rx += re.escape(pattern[i])
+        else:
+            rx += ".*" if ch == "%" else "." if ch == "_" else re.escape(ch)
+        i += 1
+    rx += "$"
+    return re.match(rx, str(value), re.IGNORECASE if ci else 0) is not None
+
+class FakeQuery:
+    def __init__(self, backend: "FakeSupabase", table: str):
+        self._b = backend
+        self._table = table
+        self._op = "select"
+        self._columns = "*"
+        self._payload: Any = None
+        self._on_conflict: Optional[str] = None
+        self._filters: List[Callable[[Dict], bool]] = []
+        self._lookup: Optional[tuple] = None  # (column, values) served from an index
+        self._order: List[tuple] = []
+        self._limit: Optional[int] = None
+        self._offset = 0
+        self._count = None
+
+    # operations
+    def select(self, columns: str = "*", count=None):
+        self._op = "select"
+        self._columns = columns
+        self._count = count
+        return self
+
+    def insert(self, json, count=None, returning=None, upsert=False, **kwargs):
+        self._op = "upsert" if upsert else "insert"
+        self._payload = json
+        return self
+
+    def upsert(self, json, count=None, returning=None, on_conflict="", ignore_duplicates=False, **kwargs):
+        self._op = "upsert_ignore" if ignore_duplicates else "upsert"
+        self._payload = json
+        self._on_conflict = on_conflict or None
+        return self
+
+    def update(self, json, count=None, returning=None, **kwargs):
+        self._op = "update"
+        self._payload = json
+        return self
+
+    def delete(self, count=None, returning=None, **kwargs):
+        self._op = "delete"
+        return self
+
+    # filters
+    def _add(self, fn):
+        self._filters.append(fn)
+        return self
+
+    def _index_hint(self, col, values):
+        if self._lookup is None and col in self._b.indexes.get(self._table, {}):
+            self._lookup = (col, values)
+
+    def eq(self, col, val):
+        self._index_hint(col, [val])
+        return self._add(lambda r: r.get(col) == val)
+
+    def neq(self, col, val):
+        return self._add(lambda r: r.get(col) != val)
+
+    def gt(self, col, val):
+        return self._add(lambda r: r.get(col) is not None and r.get(col) > val)
+
+    def gte(self, col, val):
+        return self._add(lambda r: r.get(col) is not None and r.get(col) >= val)
+
+    def lt(self, col, val):
+        return self._add(lambda r: r.get(col) is not None and r.get(col) < val)
+
+    def lte(self, col, val):
+        return self._add(lambda r: r.get(col) is not None and r.get(col) <= val)
+
+    def in_(self, col, values):
+        vals = set(values)
+        self._index_hint(col, vals)
+        return self._add(lambda r: r.get(col) in vals)
+
+    def is_(self, col, val):
+        target = None if val in ("null", None) else val
+        return self._add(lambda r: r.get(col) is target)
+
+    def like(self, col, pattern):
+        return self._add(lambda r: _like(pattern, r.get(col), False))
+
+    def ilike(self, col, pattern):
+        return self._add(lambda r: _like(pattern, r.get(col), True))
+
+    def order(self, col, desc=False, nullsfirst=False, **kwargs):
+        self._order.append((col, desc))
+        return self
+
+    def limit(self, n, **kwargs):
+        self._limit = n
+        return self
+
+    def range(self, start, end, **kwargs):
+        self._offset = start
+        self._limit = end - start + 1
+        return self
+
+    def single(self):
+        return self
+
+    # execution
+    def _candidates(self) -> Iterable[Dict]:
+        if self._lookup is None:
+            return self._b.tables[self._table]
+        col, values = self._lookup
+        index = self._b.indexes[self._table][col]
+        rows = [r for v in values for r in index.get(v, ())]
+        if len(values) > 1:
+            pk = PRIMARY_KEYS[self._table]
+            rows.sort(key=lambda r: r[pk])
+        return rows
+
+    def _matching(self) -> List[Dict]:
+        return [r for r in self._candidates() if all(f(r) for f in self._filters)]
+
+    def execute(self):
+        self._b._tick(self._table, self._op)
+        with self._b._lock:
+            return getattr(self, "_exec_" + self._op.split("_")[0])()
+
+    def _exec_select(self):
+        rows = self._matching()
+        for col, desc in reversed(self._order):
+            rows.sort(key=lambda r: (r.get(col) is None, r.get(col)), reverse=desc)
+        total = len(rows)
+        if self._offset:
+            rows = rows[self._offset:]
+        if self._limit is not None:
+            rows = rows[: self._limit]
+        out = [self._b._project(self._table, r, self._columns) for r in rows]
+        return FakeResponse(out, total if self._count else None)
+
+    def _exec_insert(self):
+        rows = self._payload if isinstance(self._payload, list) else [self._payload]
+        out = []
+        try:
+            for r in rows:
+                out.append(self._b._insert_row(self._table, dict(r)))
+        except FakeAPIError:
+            # One statement: a bulk insert that fails leaves no rows behind
+            for row in out:
+                self._b._remove_row(self._table, row)
+            raise
+        return FakeResponse(copy.deepcopy(out))
+
+    def _exec_upsert(self):
+        rows = self._payload if isinstance(self._payload, list) else [self._payload]
+        key = self._on_conflict or PRIMARY_KEYS[self._table]
+        ignore = self._op == "upsert_ignore"
+        out = []
+        for r in rows:
+            existing = self._b._find(self._table, key, r.get(key))
+            if existing is None:
+                out.append(self._b._insert_row(self._table, dict(r)))
+            elif not ignore:
+                self._b._update_row(self._table, existing, r)
+                out.append(existing)
+        return FakeResponse(copy.deepcopy(out))
+
+    def _exec_update(self):
+        out = []
+        for r in self._matching():
+            self._b._update_row(self._table, r, self._payload)
+            out.append(copy.deepcopy(r))
+        return FakeResponse(out)
+
+    def _exec_delete(self):
+        doomed = self._matching()
+        pk = PRIMARY_KEYS[self._table]
+        ids = {r[pk] for r in doomed}
+        for child, fks in FOREIGN_KEYS.items():
+            for col, parent in fks.items():
+                if parent == self._table and any(self._b.indexes[child][col].get(i) for i in ids):
+                    raise FakeAPIError(f"violates foreign key constraint on {child}", "23503")
+        for r in doomed:
+            self._b._remove_row(self._table, r)
+        return FakeResponse(copy.deepcopy(doomed))
+
+class FakeRPC:
+    def __init__(self, backend, fn, params):
+        self._b, self._fn, self._params = backend, fn, params
+
+    def execute(self):
+        self._b._tick("rpc", self._fn)
+        with self._b._lock:
+            handler = self._b.functions.get(self._fn)
+            if handler is None:
+                raise FakeAPIError(f"function {self._fn} does not exist", "42883")
+            return FakeResponse(handler(self._b, **self._params))
+
+def _reserve_stock(backend, p_items):
+    totals: Dict[int, int] = {}
+    for line in p_items:
+        totals[line["product_id"]] = totals.get(line["product_id"], 0) + line["quantity"]
+    for pid, qty in totals.items():
+        row = backend._find("products", "product_id", pid)
+        if row is None or (row.get("stock") or 0) < qty:
+            raise FakeAPIError(f"Not enough stock for product id {pid}", "P0001")
+    out = []
+    for pid, qty in sorted(totals.items()):
+        row = backend._find("products", "product_id", pid)
+        row["stock"] -= qty
+        out.append({"product_id": pid, "stock": row["stock"]})
+    return out
+
+def _release_stock(backend, p_items):
+    out = []
+    for line in p_items:
+        row = backend._find("products", "product_id", line["product_id"])
+        if row is not None:
+            row["stock"] = (row.get("stock") or 0) + line["quantity"]
+            out.append({"product_id": row["product_id"], "stock": row["stock"]})
+    return out
+
+def _process_payment(backend, p_order_id, p_method, p_key=None):
+    # Mirrors process_payment() in sql/payment_functions.sql
+    order = backend._find("orders", "order_id", p_order_id)
+    if order is None:
+        raise FakeAPIError("Order not found", "P0002")
+    payments = backend.indexes["payments"]["order_id"].get(p_order_id) or []
+    if not payments:
+        raise FakeAPIError("Payment record not found for order", "P0002")
+    payment = max(payments, key=lambda p: p["payment_id"])
+    if payment["status"] == "PAID" and order["status"] == "COMPLETED":
+        if p_key is not None and payment.get("idempotency_key") == p_key:
+            return {"payment": dict(payment), "order": dict(order), "replayed": True}
+        raise FakeAPIError("Payment already processed for order", "P0001")
+    if payment["status"] == "PAID" and (p_key is None or payment.get("idempotency_key") != p_key):
+        raise FakeAPIError("Payment already processed for order", "P0001")
+    if order["status"] != "PLACED":
+        raise FakeAPIError("Payment can only be processed for orders with status PLACED", "P0001")
+    if payment["status"] not in ("PENDING", "PAID"):
+        raise FakeAPIError("Payment already processed for order", "P0001")
+    if payment["status"] == "PENDING":
+        payment.update({"status": "PAID", "method": p_method, "idempotency_key": p_key})
+    order["status"] = "COMPLETED"
+    return {"payment": dict(payment), "order": dict(order), "replayed": False}
+
+class FakeSupabase:
+    """
+    Drop-in for supabase.Client; install it with
+    config.set_client_factory(lambda: backend).
+    """
+    def __init__(self, latency: float = 0.0):
+        self.latency = latency
+        self.tables: Dict[str, List[Dict]] = {t: [] for t in PRIMARY_KEYS}
+        # table -> column -> value -> rows, for primary, unique and foreign-key columns
+        self.indexes: Dict[str, Dict[str, Dict[Any, List[Dict]]]] = {
+            t: {c: {} for c in _indexed_columns(t)} for t in PRIMARY_KEYS}
+        self._next_id: Dict[str, int] = {t: 1 for t in PRIMARY_KEYS}
+        self.functions: Dict[str, Callable] = {"reserve_stock": _reserve_stock, "release_stock": _release_stock,
+                                               "process_payment": _process_payment}
+        self.calls: Dict[tuple, int] = {}
+        self._lock = threading.RLock()
+
+    @property
+    def round_trips(self) -> int:
+        return sum(self.calls.values())
+
+    def reset_calls(self) -> None:
+        with self._lock:
+            self.calls.clear()
+
+    def load(self, table: str, rows: Iterable[Dict]) -> None:
+        """
+        Bulk-load rows without constraint checks or request accounting (test data).
+        """
+        pk = PRIMARY_KEYS[table]
+        with self._lock:
+            for row in rows:
+                row = dict(row)
+                if row.get(pk) is None:
+                    row[pk] = self._next_id[table]
+                self._next_id[table] = max(self._next_id[table], row[pk] + 1)
+                self.tables[table].append(row)
+                self._index(table, row)
+
+    def _tick(self, table, op):
+        with self._lock:
+            self.calls[(table, op)] = self.calls.get((table, op), 0) + 1
+        if self.latency:
+            time.sleep(self.latency)
+
+    def table(self, name: str) -> FakeQuery:
+        if name not in self.tables:
+            raise FakeAPIError(f'relation "{name}" does not exist', "42P01")
+        return FakeQuery(self, name)
+
+    def from_(self, name: str) -> FakeQuery:
+        return self.table(name)
+
+    def rpc(self, fn: str, params: Optional[Dict] = None) -> FakeRPC:
+        return FakeRPC(self, fn, params or {})
+
+    def _find(self, table: str, col: str, value) -> Optional[Dict]:
+        if value is None:
+            return None
+        index = self.indexes[table].get(col)
+        if index is not None:
+            rows = index.get(value)
+            return rows[0] if rows else None
+        return next((r for r in self.tables[table] if r.get(col) == value), None)
+
+    def _index(self, table: str, row: Dict) -> None:
+        for col, index in self.indexes[table].items():
+            if row.get(col) is not None:
+                index.setdefault(row[col], []).append(row)
+
+    def _unindex(self, table: str, row: Dict) -> None:
+        for col, index in self.indexes[table].items():
+            bucket = index.get(row.get(col))
+            if bucket:
+                bucket[:] = [r for r in bucket if r is not row]
+
+    def _insert_row(self, table: str, row: Dict) -> Dict:
+        pk = PRIMARY_KEYS[table]
+        for col in UNIQUE.get(table, []):
+            if self._find(table, col, row.get(col)) is not None:
+                raise FakeAPIError(f'duplicate key value violates unique constraint "{table}_{col}_key"', "23505")
+        for col, parent in FOREIGN_KEYS.get(table, {}).items():
+            if row.get(col) is not None and self._find(parent, PRIMARY_KEYS[parent], row[col]) is None:
+                raise FakeAPIError(f"insert on {table} violates foreign key constraint on {col}", "23503")
+        if row.get(pk) is None:
+            row[pk] = self._next_id[table]
+        self._next_id[table] = max(self._next_id[table], row[pk] + 1)
+        row.setdefault("created_at", datetime.now(timezone.utc).isoformat())
+        self.tables[table].append(row)
+        self._index(table, row)
+        return row
+
+    def _update_row(self, table: str, row: Dict, fields: Dict) -> None:
+        for col in UNIQUE.get(table, []):
+            if col in fields and fields[col] != row.get(col) and self._find(table, col, fields[col]) is not None:
+                raise FakeAPIError(f'duplicate key value violates unique constraint "{table}_{col}_key"', "23505")
+        reindex = any(c in fields for c in self.indexes[table])
+        if reindex:
+            self._unindex(table, row)
+        row.update(fields)
+        if reindex:
+            self._index(table, row)
+
+    def _remove_row(self, table: str, row: Dict) -> None:
+        self._unindex(table, row)
+        self.tables[table] = [r for r in self.tables[table] if r is not row]
+
+    def _project(self, table: str, row: Dict, columns: str) -> Dict:
+        out: Dict[str, Any] = {}
+        for part in _split_top(columns):
+            m = re.match(r"^(?:(\w+):)?(\w+)\((.*)\)$", part, re.S)
+            if m:
+                alias, rel, inner = m.group(1), m.group(2), m.group(3)
+                out[alias or rel] = self._embed(table, row, rel, inner)
+            elif part == "*":
+                out.update(copy.deepcopy(row))
+            else:
+                alias, _, col = part.rpartition(":")
+                out[(alias or col).strip()] = row.get(col.strip())
+        return out
+
+    def _embed(self, table, row, rel, inner):
+        # many-to-one: this table holds the FK
+        for col, parent in FOREIGN_KEYS.get(table, {}).items():
+            if parent == rel:
+                match = self._find(parent, PRIMARY_KEYS[parent], row.get(col))
+                return self._project(parent, match, inner) if match else None
+        # one-to-many: rel holds the FK to this table
+        for col, parent in FOREIGN_KEYS.get(rel, {}).items():
+            if parent == table:
+                children = self.indexes[rel][col].get(row[PRIMARY_KEYS[table]]) or []
+                return [self._project(rel, c, inner) for c in children]
+        raise FakeAPIError(f"Could not find a relationship between '{table}' and '{rel}'", "PGRST200")
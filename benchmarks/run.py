@@ -0,0 +1,243 @@
+"""
+Benchmark suite: runs the services against the in-memory backend in
+benchmarks/fake_supabase.py with an injected per-request latency, and records
+throughput, latency percentiles and database round trips per scenario.
+
+    python -m benchmarks.run --scale small --latency_ms 1 --out results.json
+    python -m benchmarks.run --scale small --baseline results.json --max_regression 20
+
+Results are JSON, so runs from different commits can be compared with --baseline.
+"""
+import argparse
+import json
+import os
+import platform
+import random
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+from typing import Callable, Dict, List, Tuple
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# name -> builder(ctx, n) returning (ops, units per op); setup inside the builder is not timed
+SCENARIOS: Dict[str, Callable] = {}
+
+def scenario(name: str):
+    def register(fn):
+        SCENARIOS[name] = fn
+        return fn
+    return register
+
+class Context:
+    def __init__(self, backend, dataset: Dict[str, int], seed: int, workdir: str, import_rows: int):
+        self.backend = backend
+        self.dataset = dataset
+        self.rng = random.Random(seed)
+        self.workdir = workdir
+        self.import_rows = import_rows
+
+    def orders_with_status(self, status: str, n: int) -> List[int]:
+        ids = [o["order_id"] for o in self.backend.tables["orders"] if o["status"] == status]
+        self.rng.shuffle(ids)
+        return ids[:n]
+
+    def basket(self) -> List[Dict[str, int]]:
+        stocked = self.dataset["products"]
+        return [{"prod_id": self.rng.randint(1, stocked), "quantity": self.rng.randint(1, 3)}
+                for _ in range(self.rng.randint(1, 4))]
+
+@scenario("create_order")
+def _create_order(ctx: Context, n: int):
+    from src.services.order_service import OrderService
+    svc = OrderService()
+    calls = [(ctx.rng.randint(1, ctx.dataset["customers"]), ctx.basket()) for _ in range(n)]
+    return [lambda c=c, items=items: svc.create_order(c, items) for c, items in calls], 1
+
+@scenario("get_order_details")
+def _get_order_details(ctx: Context, n: int):
+    from src.services.order_service import OrderService
+    svc = OrderService()
+    ids = [ctx.rng.randint(1, ctx.dataset["orders"]) for _ in range(n)]
+    return [lambda oid=oid: svc.get_order_details(oid) for oid in ids], 1
+
+@scenario("cancel_order")
+def _cancel_order(ctx: Context, n: int):
+    from src.services.order_service import OrderService
+    svc = OrderService()
+    return [lambda oid=oid: svc.cancel_order(oid) for oid in ctx.orders_with_status("PLACED", n)], 1
+
+@scenario("get_low_stock")
+def _get_low_stock(ctx: Context, n: int):
+    from src.services.product_service import ProductService
+    svc = ProductService()
+    return [lambda: svc.get_low_stock(threshold=10) for _ in range(max(5, n // 20))], 1
+
+@scenario("report_refresh")
+def _report_refresh(ctx: Context, n: int):
+    from src.services.reporting_serivce import ReportingService
+    # Cold: every rollup rebuilt from the database
+    return [ReportingService().rebuild], 1
+
+@scenario("reports")
+def _reports(ctx: Context, n: int):
+    from src.services.reporting_serivce import ReportingService
+    from src.services.revenue_service import RevenueService, last_month_range
+    reporting, revenue = ReportingService(), RevenueService()
+    start, end = last_month_range()
+    cycle = [
+        lambda: reporting.get_top_selling_products(10),
+        reporting.get_order_count_per_customer,
+        lambda: reporting.get_customers_with_multiple_orders(2),
+        lambda: revenue.total(start, end),
+    ]
+    return [cycle[i % len(cycle)] for i in range(max(len(cycle), n // 10))], 1
+
+@scenario("bulk_import")
+def _bulk_import(ctx: Context, n: int):
+    from benchmarks.datagen import write_product_csv
+    from src.services.import_service import ImportService
+    path = write_product_csv(os.path.join(ctx.workdir, "products.csv"), ctx.import_rows)
+    svc = ImportService(batch_size=500, workers=4)
+    return [lambda: svc.import_products(path)], ctx.import_rows
+
+DEFAULT_SCENARIOS = list(SCENARIOS)
+
+def _percentile(ordered: List[float], q: float) -> float:
+    if not ordered:
+        return 0.0
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+def measure(backend, ops: List[Callable], units: int) -> Dict:
+    latencies, errors = [], 0
+    backend.reset_calls()
+    started = time.perf_counter()
+    for op in ops:
+        t0 = time.perf_counter()
+        try:
+            op()
+        except Exception:
+            errors += 1
+        latencies.append((time.perf_counter() - t0) * 1000)
+    elapsed = time.perf_counter() - started
+    ordered = sorted(latencies)
+    trips = backend.round_trips
+    return {
+        "ops": len(ops),
+        "errors": errors,
+        "seconds": round(elapsed, 4),
+        "throughput_per_s": round(len(ops) * units / elapsed, 2) if elapsed else None,
+        "mean_ms": round(statistics.fmean(latencies), 3) if latencies else 0.0,
+        "p50_ms": round(_percentile(ordered, 0.50), 3),
+        "p95_ms": round(_percentile(ordered, 0.95), 3),
+        "p99_ms": round(_percentile(ordered, 0.99), 3),
+        "max_ms": round(ordered[-1], 3) if ordered else 0.0,
+        "round_trips": trips,
+        "round_trips_per_op": round(trips / len(ops), 2) if ops else 0.0,
+        "round_trip_breakdown": {f"{t}.{op}": c for (t, op), c in sorted(backend.calls.items())},
+    }
+
+def _git_commit() -> str:
+    try:
+        out = subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, capture_output=True, text=True)
+        return out.stdout.strip() or "unknown"
+    except OSError:
+        return "unknown"
+
+def run(scale: str, latency_ms: float, ops: int, names: List[str], seed: int, import_rows: int) -> Dict:
+    workdir = tempfile.mkdtemp(prefix="retail-bench-")
+    # Local caches/rollups go to a scratch directory; read by the modules at import
+    os.environ.setdefault("LOCAL_STORE_PATH", os.path.join(workdir, "local.db"))
+
+    from benchmarks.datagen import generate
+    from benchmarks.fake_supabase import FakeSupabase
+    from src import config
+
+    backend = FakeSupabase()
+    dataset = generate(backend, scale, seed)
+    config.set_client_factory(lambda: backend)
+    ctx = Context(backend, dataset, seed, workdir, import_rows)
+
+    results = {}
+    try:
+        for name in names:
+            built, units = SCENARIOS[name](ctx, ops)
+            backend.latency = latency_ms / 1000
+            results[name] = measure(backend, built, units)
+            backend.latency = 0.0
+            print(f"{name:<18} ops={results[name]['ops']:<6} p50={results[name]['p50_ms']:>9.3f}ms "
+                  f"p99={results[name]['p99_ms']:>9.3f}ms trips/op={results[name]['round_trips_per_op']:<7} "
+                  f"thr={results[name]['throughput_per_s']}/s", file=sys.stderr)
+    finally:
+        config.set_client_factory(None)
+
+    return {
+        "meta": {
+            "commit": _git_commit(),
+            "timestamp": datetime.now(timezone.utc).isoformat(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "scale": scale,
+            "latency_ms": latency_ms,
+            "ops": ops,
+            "seed": seed,
+        },
+        "dataset": dataset,
+        "scenarios": results,
+    }
+
+def compare(baseline: Dict, current: Dict, max_regression: float = None) -> bool:
+    """
+    Print per-scenario changes against a baseline result. Returns False if any
+    scenario's p99 or round trips per op got worse by more than max_regression percent.
+    """
+    ok = True
+    print(f"{'scenario':<18} {'p50 ms':>18} {'p99 ms':>18} {'trips/op':>16} {'throughput/s':>22}")
+    for name, cur in current["scenarios"].items():
+        base = baseline.get("scenarios", {}).get(name)
+        if not base:
+            continue
+        cells = []
+        for key in ("p50_ms", "p99_ms", "round_trips_per_op", "throughput_per_s"):
+            b, c = base.get(key) or 0, cur.get(key) or 0
+            pct = ((c - b) / b * 100) if b else 0.0
+            cells.append(f"{b:>8g}->{c:<8g}({pct:+.0f}%)")
+            worse = pct if key != "throughput_per_s" else -pct
+            if max_regression is not None and key in ("p99_ms", "round_trips_per_op") and worse > max_regression:
+                ok = False
+        print(f"{name:<18} " + " ".join(cells))
+    return ok
+
+def main():
+    from benchmarks.datagen import SCALES
+    parser = argparse.ArgumentParser(description="Retail service benchmarks against an in-memory backend")
+    parser.add_argument("--scale", default="small", choices=list(SCALES))
+    parser.add_argument("--latency_ms", type=float, default=1.0, help="injected latency per database request")
+    parser.add_argument("--ops", type=int, default=200, help="operations per scenario")
+    parser.add_argument("--scenario", action="append", default=None, choices=DEFAULT_SCENARIOS,
+                        help="repeatable; default: all")
+    parser.add_argument("--import_rows", type=int, default=5000)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--out", default=None, help="write results JSON here")
+    parser.add_argument("--baseline", default=None, help="results JSON from an earlier run to compare against")
+    parser.add_argument("--max_regression", type=float, default=None,
+                        help="with --baseline, exit 1 if p99 or trips/op grow by more than this percent")
+    args = parser.parse_args()
+
+    sys.path.insert(0, ROOT)
+    result = run(args.scale, args.latency_ms, args.ops, args.scenario or DEFAULT_SCENARIOS, args.seed, args.import_rows)
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            json.dump(result, f, indent=2)
+    else:
+        print(json.dumps(result, indent=2))
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            if not compare(json.load(f), result, args.max_regression):
+                sys.exit(1)
+
+if __name__ == "__main__":
+    main()
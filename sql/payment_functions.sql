@@ -0,0 +1,56 @@
+-- Payment processing used by src/services/payment_service.py.
+-- Run once; safe to re-run.
+
+-- Request key of the call that paid each payment; a retry with the same key
+-- gets the original result back instead of an error.
+alter table payments add column if not exists idempotency_key text;
+create unique index if not exists payments_idempotency_key_idx
+    on payments (idempotency_key) where idempotency_key is not null;
+
+-- Pay and complete an order in one transaction (PAYMENT_USE_RPC=1).
+-- Finishes a payment that was marked PAID by an earlier, interrupted call with the same key.
+create or replace function process_payment(p_order_id bigint, p_method text, p_key text default null)
+returns jsonb
+language plpgsql
+as $$
+declare
+    o orders%rowtype;
+    p payments%rowtype;
+begin
+    -- Same lock order as every other caller: order, then its payment
+    select * into o from orders where order_id = p_order_id for update;
+    if not found then
+        raise exception 'Order not found' using errcode = 'P0002';
+    end if;
+    select * into p from payments where order_id = p_order_id
+     order by payment_id desc limit 1 for update;
+    if not found then
+        raise exception 'Payment record not found for order' using errcode = 'P0002';
+    end if;
+
+    if p.status = 'PAID' and o.status = 'COMPLETED' then
+        if p_key is not null and p.idempotency_key = p_key then
+            return jsonb_build_object('payment', to_jsonb(p), 'order', to_jsonb(o), 'replayed', true);
+        end if;
+        raise exception 'Payment already processed for order' using errcode = 'P0001';
+    end if;
+    -- Only the call that paid (same key) may finish an interrupted payment
+    if p.status = 'PAID' and (p_key is null or p.idempotency_key is distinct from p_key) then
+        raise exception 'Payment already processed for order' using errcode = 'P0001';
+    end if;
+    if o.status <> 'PLACED' then
+        raise exception 'Payment can only be processed for orders with status PLACED' using errcode = 'P0001';
+    end if;
+    if p.status not in ('PENDING', 'PAID') then
+        raise exception 'Payment already processed for order' using errcode = 'P0001';
+    end if;
+
+    if p.status = 'PENDING' then
+        update payments set status = 'PAID', method = p_method, idempotency_key = p_key
+         where payment_id = p.payment_id
+        returning * into p;
+    end if;
+    update orders set status = 'COMPLETED' where order_id = p_order_id returning * into o;
+    return jsonb_build_object('payment', to_jsonb(p), 'order', to_jsonb(o), 'replayed', false);
+end;
+$$;
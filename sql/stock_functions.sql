@@ -0,0 +1,53 @@
+-- Stock reservation functions used by src/dao/stock_dao.py (called through supabase rpc).
+-- Each call runs in a single transaction: if any line is short on stock the
+-- whole call raises and nothing is decremented.
+
+create or replace function reserve_stock(p_items jsonb)
+returns table (product_id bigint, stock integer)
+language plpgsql
+as $$
+declare
+    line record;
+begin
+    for line in
+        select (e->>'product_id')::bigint as pid, sum((e->>'quantity')::integer) as qty
+        from jsonb_array_elements(p_items) e
+        group by 1
+        order by 1  -- fixed lock order avoids deadlocks between concurrent checkouts
+    loop
+        update products p
+           set stock = p.stock - line.qty
+         where p.product_id = line.pid
+           and p.stock >= line.qty
+        returning p.product_id, p.stock into product_id, stock;
+        if not found then
+            raise exception 'Not enough stock for product id %', line.pid using errcode = 'P0001';
+        end if;
+        return next;
+    end loop;
+end;
+$$;
+
+create or replace function release_stock(p_items jsonb)
+returns table (product_id bigint, stock integer)
+language plpgsql
+as $$
+declare
+    line record;
+begin
+    for line in
+        select (e->>'product_id')::bigint as pid, sum((e->>'quantity')::integer) as qty
+        from jsonb_array_elements(p_items) e
+        group by 1
+        order by 1
+    loop
+        update products p
+           set stock = coalesce(p.stock, 0) + line.qty
+         where p.product_id = line.pid
+        returning p.product_id, p.stock into product_id, stock;
+        if found then
+            return next;
+        end if;
+    end loop;
+end;
+$$;
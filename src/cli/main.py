@@ -1,22 +1,65 @@
 import argparse
 import json
-from src.services.customer_service import CustomerService, CustomerServiceError
-from src.services.product_service import ProductService, ProductServiceError
-from src.services.order_service import OrderService, OrderServiceError
-from src.services.payment_service import PaymentService, PaymentServiceError
-from src.services.reporting_serivce import ReportingService
+import sys
+from datetime import date
+from functools import cached_property
+from itertools import islice
+from src.config import load_env
+
+# Services (and through them supabase/httpx) are imported and built by the
+# first command that needs them, so `--help` or a single `product list` only
+# pays for what it uses. Keep module-level imports here to the standard library.
+
+def print_json_list(rows):
+    """
+    Print an iterable of rows as a JSON array (same layout as json.dumps(indent=2))
+    without collecting it in memory first.
+    """
+    first = True
+    for row in rows:
+        body = json.dumps(row, indent=2, default=str).replace("\n", "\n  ")
+        print(("[\n  " if first else ",\n  ") + body, end="")
+        first = False
+    print("[]" if first else "\n]")
+
+def page_size_for(args) -> int:
+    """
+    No bigger pages than --limit needs, so a limited listing doesn't pull rows it won't print.
+    """
+    return min(args.page_size, args.limit) if args.limit else args.page_size
 
 class RetailCLI:
     def __init__(self):
-        self.customer_service = CustomerService()
-        self.product_service = ProductService()
-        self.order_service = OrderService()
-        self.payment_service = PaymentService()
-        self.reporting_service = ReportingService()
         self.parser = self.build_parser()
 
+    @cached_property
+    def customer_service(self):
+        from src.services.customer_service import CustomerService
+        return CustomerService()
+
+    @cached_property
+    def product_service(self):
+        from src.services.product_service import ProductService
+        return ProductService()
+
+    @cached_property
+    def order_service(self):
+        from src.services.order_service import OrderService
+        return OrderService()
+
+    @cached_property
+    def payment_service(self):
+        from src.services.payment_service import PaymentService
+        return PaymentService()
+
+    @cached_property
+    def reporting_service(self):
+        from src.services.reporting_serivce import ReportingService
+        return ReportingService()
+
     # Product commands
     def cmd_product_add(self, args):
+        from src.services.product_service import ProductServiceError
         try:
             p = self.product_service.add_product(args.name, args.sku, args.price, args.stock, args.category)
             print("Created product:")
@@ -25,11 +68,48 @@ class RetailCLI:
             print("Error:", e)
 
     def cmd_product_list(self, args):
-        ps = self.product_service.list_products(limit=args.limit, category=args.category)
-        print(json.dumps(ps, indent=2, default=str))
+        ps = self.product_service.iter_products(category=args.category, columns=args.columns,
+                                              page_size=page_size_for(args))
+        print_json_list(islice(ps, args.limit or None))
+
+    def cmd_product_low_stock(self, args):
+        if args.thresholds:
+            from src.services.low_stock_service import LowStockMonitor, LowStockServiceError
+            try:
+                monitor = LowStockMonitor.from_file(args.thresholds, dao=self.product_service.dao)
+            except LowStockServiceError as e:
+                print("Error:", e)
+                return
+            print_json_list(monitor.refresh())
+            monitor.close()
+        else:
+            print_json_list(self.product_service.iter_low_stock(args.threshold, args.category))
+
+    def cmd_product_import(self, args):
+        self._run_import("import_products", args)
+
+    def cmd_product_flush_stock(self, args):
+        # Also recovers deltas journaled by a process that exited without flushing
+        from src.dao.stock_journal import get_stock_journal
+        journal = get_stock_journal()
+        applied = journal.flush()
+        print(f"Flushed stock deltas for {len(applied)} product(s)")
+        print(json.dumps(journal.journal_stats(), indent=2, default=str))
+
+    def _run_import(self, method, args, **kwargs):
+        from src.services.import_service import ImportService, ImportServiceError
+        try:
+            svc = ImportService(batch_size=args.batch_size, workers=args.workers)
+            stats = getattr(svc, method)(args.file, fmt=args.format, upsert=args.upsert, rejects_path=args.rejects,
+                                         **kwargs)
+            print("Import finished:")
+            print(json.dumps(stats, indent=2, default=str))
+        except ImportServiceError as e:
+            print("Error:", e)
 
     # Customer commands
     def cmd_customer_add(self, args):
+        from src.services.customer_service import CustomerServiceError
         try:
             c = self.customer_service.create_customer(args.name, args.email, args.phone, args.city)
             print("Created customer:")
@@ -38,6 +118,7 @@ class RetailCLI:
             print("Error:", e)
 
     def cmd_customer_update(self, args):
+        from src.services.customer_service import CustomerServiceError
         try:
             c = self.customer_service.update_customer(args.customer_id, args.phone, args.city)
             print("Updated customer:")
@@ -46,6 +127,7 @@ class RetailCLI:
             print("Error:", e)
 
     def cmd_customer_delete(self, args):
+        from src.services.customer_service import CustomerServiceError
         try:
             c = self.customer_service.delete_customer(args.customer_id)
             print("Deleted customer:")
@@ -53,16 +135,42 @@ class RetailCLI:
         except CustomerServiceError as e:
             print("Error:", e)
 
+    def cmd_customer_import(self, args):
+        self._run_import("import_customers", args, warm_index=args.warm_index)
+
     def cmd_customer_list(self, args):
-        cs = self.customer_service.list_customers(limit=args.limit)
-        print(json.dumps(cs, indent=2, default=str))
+        cs = self.customer_service.iter_customers(columns=args.columns, page_size=page_size_for(args))
+        print_json_list(islice(cs, args.limit or None))
 
     def cmd_customer_search(self, args):
-        cs = self.customer_service.search_customers(email=args.email, city=args.city)
-        print(json.dumps(cs, indent=2, default=str))
+        cs = self.customer_service.iter_search_customers(email=args.email, city=args.city, name=args.name,
+                                                         prefix=args.prefix, ignore_case=args.ignore_case,
+                                                         columns=args.columns, page_size=page_size_for(args),
+                                                         after=args.after)
+        print_json_list(islice(cs, args.limit or None))
+
+    def cmd_customer_check_email(self, args):
+        available = self.customer_service.email_available(args.email)
+        print(f"{args.email}: {'available' if available else 'already registered'}")
+
+    def cmd_customer_summary(self, args):
+        from src.services.customer_summary_service import CustomerSummaryService, CustomerSummaryServiceError
+        svc = CustomerSummaryService()
+        try:
+            if args.rebuild:
+                stats = svc.rebuild()
+                print("Customer summaries rebuilt:")
+                print(json.dumps(stats, indent=2, default=str))
+            if args.customer_id is not None:
+                print(json.dumps(svc.get_summary(args.customer_id), indent=2, default=str))
+            elif not args.rebuild:
+                print("Error: --customer_id or --rebuild is required")
+        except CustomerSummaryServiceError as e:
+            print("Error:", e)
 
     # Order commands
     def cmd_order_create(self, args):
+        from src.services.order_service import OrderServiceError
         items = []
         for item_str in args.item:
             try:
@@ -78,7 +186,19 @@ class RetailCLI:
         except OrderServiceError as e:
             print("Error:", e)
 
+    def cmd_order_ingest(self, args):
+        from src.services.ingest_service import IngestService, IngestServiceError
+        try:
+            options = {"workers": args.workers, "queue_size": args.queue_size, "chunk_size": args.chunk_size}
+            svc = IngestService(**{k: v for k, v in options.items() if v is not None})
+            stats = svc.ingest(args.file, dead_letter_path=args.dead_letter)
+            print("Ingest finished:")
+            print(json.dumps(stats, indent=2, default=str))
+        except IngestServiceError as e:
+            print("Error:", e)
+
     def cmd_order_show(self, args):
+        from src.services.order_service import OrderServiceError
         try:
             ord_details = self.order_service.get_order_details(args.order_id)
             print(json.dumps(ord_details, indent=2, default=str))
@@ -86,13 +206,18 @@ class RetailCLI:
             print("Error:", e)
 
     def cmd_order_list(self, args):
+        from src.services.order_service import OrderServiceError
         try:
-            orders = self.order_service.list_orders_by_customer(args.customer_id)
-            print(json.dumps(orders, indent=2, default=str))
+            orders = self.order_service.iter_orders_by_customer(args.customer_id, columns=args.columns,
+                                                                page_size=args.page_size)
+            print_json_list(orders)
         except OrderServiceError as e:
             print("Error:", e)
 
     def cmd_order_cancel(self, args):
+        if args.ids_file:
+            return self._run_batch("cancel_orders", args)
+        from src.services.order_service import OrderServiceError
         try:
             ord = self.order_service.cancel_order(args.order_id)
             print("Order cancelled:")
@@ -101,6 +226,9 @@ class RetailCLI:
             print("Error:", e)
 
     def cmd_order_complete(self, args):
+        if args.ids_file:
+            return self._run_batch("complete_orders", args)
+        from src.services.order_service import OrderServiceError
         try:
             ord = self.order_service.complete_order(args.order_id)
             print("Order marked as Completed:")
@@ -108,16 +236,32 @@ class RetailCLI:
         except OrderServiceError as e:
             print("Error:", e)
 
+    def _run_batch(self, method, args, *extra):
+        from src.services.batch_service import BatchOrderService, BatchServiceError, read_ids, BATCH_WORKERS
+        try:
+            svc = BatchOrderService(workers=args.workers or BATCH_WORKERS)
+            summary = getattr(svc, method)(read_ids(args.ids_file), *extra)
+            print("Batch finished:")
+            print(json.dumps(summary, indent=2, default=str))
+        except BatchServiceError as e:
+            print("Error:", e)
+
     # Payment commands
     def cmd_payment_process(self, args):
+        if args.ids_file:
+            return self._run_batch("process_payments", args, args.method)
+        from src.services.payment_service import PaymentServiceError
         try:
-            result = self.payment_service.process_payment(args.order_id, args.method)
+            result = self.payment_service.process_payment(args.order_id, args.method, args.idempotency_key)
             print("Payment processed:")
             print(json.dumps(result, indent=2, default=str))
         except PaymentServiceError as e:
             print("Error:", e)
 
     def cmd_payment_refund(self, args):
+        if args.ids_file:
+            return self._run_batch("refund_payments", args)
+        from src.services.payment_service import PaymentServiceError
         try:
             refund = self.payment_service.refund_payment(args.order_id)
             print("Payment refunded:")
@@ -127,13 +271,42 @@ class RetailCLI:
 
     # Reporting commands
     def cmd_report_top_products(self, args):
-        data = self.reporting_service.get_top_selling_products(args.top_n)
-        print("Top selling products:")
-        print(json.dumps(data, indent=2, default=str))
+        from src.services.bestseller_service import BestsellerServiceError
+        try:
+            if args.rebuild:
+                stats = self.reporting_service.bestsellers.rebuild()
+                print("Best-seller buckets rebuilt:")
+                print(json.dumps(stats, indent=2, default=str))
+                return
+            data = self.reporting_service.get_top_selling_products(args.top_n, args.hours, args.days, args.by)
+            print("Top selling products:")
+            print(json.dumps(data, indent=2, default=str))
+        except BestsellerServiceError as e:
+            print("Error:", e)
+
+    def cmd_report_refresh(self, args):
+        stats = self.reporting_service.rebuild()
+        print("Report rollups rebuilt:")
+        print(json.dumps(stats, indent=2, default=str))
 
     def cmd_report_revenue(self, args):
-        revenue = self.reporting_service.get_total_revenue_last_month()
-        print(f"Total revenue last month: {revenue}")
+        from src.services.revenue_service import RevenueService, RevenueServiceError, last_month_range
+        svc = RevenueService()
+        try:
+            if args.rebuild:
+                stats = svc.rebuild()
+                print("Revenue rollups rebuilt:")
+                print(json.dumps(stats, indent=2, default=str))
+                return
+            if not (args.from_date or args.to_date or args.by):
+                start, end = last_month_range()
+                print(f"Total revenue last month: {svc.total(start, end)}")
+                return
+            default_start, default_end = last_month_range()
+            data = svc.report(args.from_date or default_start, args.to_date or default_end, args.by or "day")
+            print_json_list(data)
+        except RevenueServiceError as e:
+            print("Error:", e)
 
     def cmd_report_order_counts(self, args):
         data = self.reporting_service.get_order_count_per_customer()
@@ -145,8 +318,47 @@ class RetailCLI:
         print("Customers with more than 2 orders:")
         print(json.dumps(data, indent=2, default=str))
 
+    # Export commands
+    def cmd_export(self, args):
+        from src.services.export_service import ExportService, ExportServiceError
+        tables = args.table or ["orders", "order_items", "payments", "products", "customers"]
+        try:
+            svc = ExportService(page_size=args.page_size)
+            for result in svc.export(tables, args.out, args.format, args.gzip, args.columns,
+                                     args.since_id, args.since, args.state):
+                print(json.dumps(result, default=str))
+        except ExportServiceError as e:
+            print("Error:", e)
+
+    # Server mode
+    def cmd_serve(self, args):
+        import logging
+        from src.server.app import run_server
+        logging.basicConfig(level=logging.INFO, format="%(asctime)s %(process)d %(levelname)s %(message)s")
+        print(f"Serving on http://{args.host}:{args.port} with {args.workers} worker(s)")
+        run_server(args.host, args.port, args.workers)
+
+    def add_import_arguments(self, p):
+        p.add_argument("--file", required=True, help="CSV or JSONL file (.gz ok)")
+        p.add_argument("--format", default=None, choices=["csv", "jsonl"], help="default: from file extension")
+        p.add_argument("--batch_size", type=int, default=500)
+        p.add_argument("--workers", type=int, default=4)
+        p.add_argument("--upsert", action="store_true", help="update existing rows instead of rejecting them")
+        p.add_argument("--rejects", default=None, help="write rejected rows here (.csv or .jsonl)")
+
+    def add_batch_arguments(self, p):
+        target = p.add_mutually_exclusive_group(required=True)
+        target.add_argument("--order_id", type=int)
+        target.add_argument("--ids_file", help="file with one order id per line ('-' for stdin)")
+        p.add_argument("--workers", type=int, default=None, help="threads for batch requests (default: BATCH_WORKERS)")
+
     def build_parser(self):
+        from src.dao.pagination import DEFAULT_PAGE_SIZE
         parser = argparse.ArgumentParser(prog="retail-cli")
+        parser.add_argument("--profile", action="store_true",
+                            help="print per-query timings, grouped by service method, to stderr when done")
+        parser.add_argument("--profile_format", default="text", choices=["text", "json", "prometheus"])
+        parser.add_argument("--trace", action="store_true", help="log every database query as a JSON line on stderr")
         sub = parser.add_subparsers(dest="cmd")
 
         # Product commands
@@ -161,10 +373,25 @@ class RetailCLI:
         addp.set_defaults(func=self.cmd_product_add)
 
         listp = pprod_sub.add_parser("list")
-        listp.add_argument("--limit", type=int, default=100)
+        listp.add_argument("--limit", type=int, default=100, help="0 for no limit")
         listp.add_argument("--category", default=None)
+        listp.add_argument("--columns", default="*", help="comma-separated columns to fetch")
+        listp.add_argument("--page_size", type=int, default=DEFAULT_PAGE_SIZE)
         listp.set_defaults(func=self.cmd_product_list)
 
+        lowp = pprod_sub.add_parser("low-stock")
+        lowp.add_argument("--threshold", type=int, default=5)
+        lowp.add_argument("--category", default=None)
+        lowp.add_argument("--thresholds", default=None, help="JSON file with default/category/product reorder thresholds")
+        lowp.set_defaults(func=self.cmd_product_low_stock)
+
+        importp = pprod_sub.add_parser("import")
+        self.add_import_arguments(importp)
+        importp.set_defaults(func=self.cmd_product_import)
+
+        flushp = pprod_sub.add_parser("flush-stock", help="write buffered stock increments from the journal")
+        flushp.set_defaults(func=self.cmd_product_flush_stock)
+
         # Customer commands
         pcust = sub.add_parser("customer", help="customer commands")
         pcust_sub = pcust.add_subparsers(dest="action")
@@ -187,14 +414,38 @@ class RetailCLI:
         deletec.set_defaults(func=self.cmd_customer_delete)
 
         listc = pcust_sub.add_parser("list")
-        listc.add_argument("--limit", type=int, default=100)
+        listc.add_argument("--limit", type=int, default=100, help="0 for no limit")
+        listc.add_argument("--columns", default="*", help="comma-separated columns to fetch")
+        listc.add_argument("--page_size", type=int, default=DEFAULT_PAGE_SIZE)
         listc.set_defaults(func=self.cmd_customer_list)
 
         searchc = pcust_sub.add_parser("search")
         searchc.add_argument("--email", default=None)
         searchc.add_argument("--city", default=None)
+        searchc.add_argument("--name", default=None)
+        searchc.add_argument("--prefix", action="store_true", help="match values starting with the given text")
+        searchc.add_argument("--ignore_case", action="store_true")
+        searchc.add_argument("--limit", type=int, default=0, help="0 for no limit")
+        searchc.add_argument("--after", type=int, default=None, help="resume after this customer_id")
+        searchc.add_argument("--columns", default="*", help="comma-separated columns to fetch")
+        searchc.add_argument("--page_size", type=int, default=DEFAULT_PAGE_SIZE)
         searchc.set_defaults(func=self.cmd_customer_search)
 
+        checkc = pcust_sub.add_parser("check-email")
+        checkc.add_argument("--email", required=True)
+        checkc.set_defaults(func=self.cmd_customer_check_email)
+
+        summaryc = pcust_sub.add_parser("summary", help="order count, lifetime value and last order of a customer")
+        summaryc.add_argument("--customer_id", type=int, default=None)
+        summaryc.add_argument("--rebuild", action="store_true", help="recompute all summaries from the orders table")
+        summaryc.set_defaults(func=self.cmd_customer_summary)
+
+        importc = pcust_sub.add_parser("import")
+        self.add_import_arguments(importc)
+        importc.add_argument("--warm_index", action="store_true",
+                             help="load the customer email index first; only possible duplicates hit the database")
+        importc.set_defaults(func=self.cmd_customer_import)
+
         # Order commands
         porder = sub.add_parser("order", help="order commands")
         porder_sub = porder.add_subparsers(dest="action")
@@ -204,20 +455,31 @@ class RetailCLI:
         createo.add_argument("--item", required=True, nargs="+", help="prod_id:qty (repeatable)")
         createo.set_defaults(func=self.cmd_order_create)
 
+        ingesto = porder_sub.add_parser("ingest", help="create orders from a JSONL feed")
+        ingesto.add_argument("--file", required=True,
+                             help='JSONL (.gz ok), one {"customer_id": n, "items": [...]} per line')
+        ingesto.add_argument("--workers", type=int, default=None, help="worker processes, 0 = inline (default: INGEST_WORKERS)")
+        ingesto.add_argument("--queue_size", type=int, default=None, help="chunks buffered per worker (default: INGEST_QUEUE_SIZE)")
+        ingesto.add_argument("--chunk_size", type=int, default=None, help="orders per chunk (default: INGEST_CHUNK_SIZE)")
+        ingesto.add_argument("--dead_letter", default=None, help="write failed orders here (JSONL, can be re-ingested)")
+        ingesto.set_defaults(func=self.cmd_order_ingest)
+
         showo = porder_sub.add_parser("show")
         showo.add_argument("--order_id", type=int, required=True)
         showo.set_defaults(func=self.cmd_order_show)
 
         listo = porder_sub.add_parser("list")
         listo.add_argument("--customer_id", type=int, required=True)
+        listo.add_argument("--columns", default="*", help="comma-separated columns to fetch")
+        listo.add_argument("--page_size", type=int, default=DEFAULT_PAGE_SIZE)
         listo.set_defaults(func=self.cmd_order_list)
 
         canco = porder_sub.add_parser("cancel")
-        canco.add_argument("--order_id", type=int, required=True)
+        self.add_batch_arguments(canco)
         canco.set_defaults(func=self.cmd_order_cancel)
 
         compo = porder_sub.add_parser("complete")
-        compo.add_argument("--order_id", type=int, required=True)
+        self.add_batch_arguments(compo)
         compo.set_defaults(func=self.cmd_order_complete)
 
         # Payment commands
@@ -225,23 +487,56 @@ class RetailCLI:
         ppay_sub = ppay.add_subparsers(dest="action")
 
         process_pay = ppay_sub.add_parser("process")
-        process_pay.add_argument("--order_id", type=int, required=True)
+        self.add_batch_arguments(process_pay)
         process_pay.add_argument("--method", required=True, choices=["Cash", "Card", "UPI"])
+        process_pay.add_argument("--idempotency_key", default=None,
+                                 help="request key; repeating it returns the first result instead of an error")
         process_pay.set_defaults(func=self.cmd_payment_process)
 
         refund_pay = ppay_sub.add_parser("refund")
-        refund_pay.add_argument("--order_id", type=int, required=True)
+        self.add_batch_arguments(refund_pay)
         refund_pay.set_defaults(func=self.cmd_payment_refund)
 
+        # Server mode
+        pserve = sub.add_parser("serve", help="run a long-lived JSON HTTP server")
+        pserve.add_argument("--host", default="127.0.0.1")
+        pserve.add_argument("--port", type=int, default=8080)
+        pserve.add_argument("--workers", type=int, default=1, help="worker processes sharing the port")
+        pserve.set_defaults(func=self.cmd_serve)
+
+        # Export commands
+        pexp = sub.add_parser("export", help="stream tables to CSV/JSONL/Parquet files")
+        pexp.add_argument("--table", action="append", default=None,
+                          choices=["orders", "order_items", "payments", "products", "customers"],
+                          help="repeatable; default: all tables")
+        pexp.add_argument("--format", default="jsonl", choices=["csv", "jsonl", "parquet"])
+        pexp.add_argument("--out", default="export", help="output directory")
+        pexp.add_argument("--gzip", action="store_true")
+        pexp.add_argument("--columns", default="*", help="comma-separated columns to export")
+        pexp.add_argument("--since", default=None, help="only rows with created_at >= this timestamp")
+        pexp.add_argument("--since_id", type=int, default=None, help="only rows with a key above this id")
+        pexp.add_argument("--state", default=None, help="JSON watermark file; resumes from and updates the last exported id")
+        pexp.add_argument("--page_size", type=int, default=DEFAULT_PAGE_SIZE)
+        pexp.set_defaults(func=self.cmd_export)
+
         # Reporting commands
         prep = sub.add_parser("report", help="reporting commands")
         prep_sub = prep.add_subparsers(dest="action")
 
         topprod = prep_sub.add_parser("top-products")
         topprod.add_argument("--top_n", type=int, default=5)
+        window = topprod.add_mutually_exclusive_group()
+        window.add_argument("--hours", type=int, default=None, help="only the last N hours (current hour included)")
+        window.add_argument("--days", type=int, default=None, help="only the last N days (today included)")
+        topprod.add_argument("--by", default="quantity", choices=["quantity", "revenue"])
+        topprod.add_argument("--rebuild", action="store_true", help="recompute best-seller buckets from the orders table")
         topprod.set_defaults(func=self.cmd_report_top_products)
 
-        revenue = prep_sub.add_parser("revenue")
+        revenue = prep_sub.add_parser("revenue", help="revenue from daily rollups (default: last month's total)")
+        revenue.add_argument("--from", dest="from_date", type=date.fromisoformat, default=None, help="YYYY-MM-DD, inclusive")
+        revenue.add_argument("--to", dest="to_date", type=date.fromisoformat, default=None, help="YYYY-MM-DD, inclusive")
+        revenue.add_argument("--by", default=None, choices=["day", "week", "month", "category"])
+        revenue.add_argument("--rebuild", action="store_true", help="recompute rollups from the orders table")
         revenue.set_defaults(func=self.cmd_report_revenue)
 
         ordercount = prep_sub.add_parser("order-count")
@@ -251,6 +546,9 @@ class RetailCLI:
         activecust.add_argument("--min_orders", type=int, default=2)
         activecust.set_defaults(func=self.cmd_report_active_customers)
 
+        refreshrep = prep_sub.add_parser("refresh", help="rebuild the revenue, customer and best-seller rollups")
+        refreshrep.set_defaults(func=self.cmd_report_refresh)
+
         return parser
 
     def run(self):
@@ -258,9 +556,24 @@ class RetailCLI:
         if not hasattr(args, "func"):
             self.parser.print_help()
             return
-        args.func(args)
+        if not (args.profile or args.trace):
+            args.func(args)
+            return
+
+        import logging
+        from src.dao import instrumentation
+        instrumentation.enable(trace_log=args.trace)
+        logging.basicConfig(level=logging.INFO, stream=sys.stderr, format="%(message)s")
+        command = " ".join(filter(None, ["cli:" + args.cmd, getattr(args, "action", None)]))
+        try:
+            with instrumentation.scope(command):
+                args.func(args)
+        finally:
+            if args.profile:
+                print(instrumentation.render_report(args.profile_format), file=sys.stderr)
 
 def main():
+    load_env()
     RetailCLI().run()
 
 if __name__ == "__main__":
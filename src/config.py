@@ -1,17 +1,139 @@
 # src/config.py
 import os
-from dotenv import load_dotenv
-from supabase import create_client, Client
- 
-load_dotenv()  # loads .env from project root
- 
-SUPABASE_URL = os.getenv("SUPABASE_URL")
-SUPABASE_KEY = os.getenv("SUPABASE_KEY")
- 
-def get_supabase() -> Client:
-    """
-    Return a supabase client. Raises RuntimeError if config missing.
-    """
-    if not SUPABASE_URL or not SUPABASE_KEY:
+import threading
+from typing import TYPE_CHECKING, Awaitable, Callable, Optional
+
+if TYPE_CHECKING:
+    from supabase import Client, AsyncClient
+
+# supabase, httpx and dotenv are imported on first use, not here: every CLI
+# invocation imports this module and most never need all three.
+_env_loaded = False
+
+def load_env() -> None:
+    """
+    Load .env from the project root once. Entry points call this before
+    importing modules that read settings; client creation calls it too.
+    """
+    global _env_loaded
+    if _env_loaded:
+        return
+    from dotenv import load_dotenv
+    load_dotenv()
+    _env_loaded = True
+
+def _settings():
+    """
+    Credentials and connection pool settings shared by every DAO in the process,
+    read when the first client is built so values from .env are honoured.
+    """
+    load_env()
+    url, key = os.getenv("SUPABASE_URL"), os.getenv("SUPABASE_KEY")
+    if not url or not key:
         raise RuntimeError("SUPABASE_URL and SUPABASE_KEY must be set in environment (.env)")
-    return create_client(SUPABASE_URL, SUPABASE_KEY)
\ No newline at end of file
+    pool_size = int(os.getenv("SUPABASE_POOL_SIZE", "20"))
+    keepalive = int(os.getenv("SUPABASE_KEEPALIVE", str(pool_size)))
+    timeout = float(os.getenv("SUPABASE_TIMEOUT", "10"))
+    connect_timeout = float(os.getenv("SUPABASE_CONNECT_TIMEOUT", "5"))
+    return url, key, pool_size, keepalive, timeout, connect_timeout
+
+_client: Optional["Client"] = None
+_client_factory: Optional[Callable[[], "Client"]] = None
+# Optional decorator applied to every client handed out (e.g. query instrumentation)
+_client_wrapper: Optional[Callable] = None
+_client_lock = threading.Lock()
+
+def _create_pooled_client() -> "Client":
+    import httpx
+    from supabase import create_client, ClientOptions
+    url, key, pool_size, keepalive, timeout, connect_timeout = _settings()
+    http = httpx.Client(
+        limits=httpx.Limits(max_connections=pool_size, max_keepalive_connections=keepalive),
+        timeout=httpx.Timeout(timeout, connect=connect_timeout),
+    )
+    options = ClientOptions(postgrest_client_timeout=timeout, httpx_client=http)
+    return create_client(url, key, options=options)
+
+def get_supabase() -> "Client":
+    """
+    Return the process-wide supabase client, creating it on first use.
+    All DAOs share this client and its keep-alive connection pool.
+    Raises RuntimeError if config missing.
+    """
+    global _client
+    if _client is None:
+        with _client_lock:
+            if _client is None:
+                factory = _client_factory or _create_pooled_client
+                _client = _wrap(factory())
+    return _client
+
+def _wrap(client):
+    global _client_wrapper
+    if _client_wrapper is None and os.getenv("DB_INSTRUMENT", "0") == "1":
+        from src.dao import instrumentation
+        _client_wrapper = instrumentation.start()
+    return _client_wrapper(client) if _client_wrapper else client
+
+def set_client_factory(factory: Optional[Callable[[], "Client"]]) -> None:
+    """
+    Swap the backend used by get_supabase() (e.g. a local stand-in for tests).
+    Pass None to go back to the pooled supabase client. Drops the current client.
+    """
+    global _client_factory
+    with _client_lock:
+        _client_factory = factory
+    reset_supabase()
+
+def set_client_wrapper(wrapper: Optional[Callable]) -> None:
+    """
+    Wrap every client get_supabase()/get_async_supabase() hands out from now on
+    (None removes the wrapper). Drops the current clients so the change applies.
+    """
+    global _client_wrapper, _async_client
+    with _client_lock:
+        _client_wrapper = wrapper
+        _async_client = None
+    reset_supabase()
+
+def reset_supabase() -> None:
+    """
+    Drop the shared client so the next get_supabase() builds a fresh one.
+    """
+    global _client
+    with _client_lock:
+        _client = None
+
+_async_client: Optional["AsyncClient"] = None
+_async_client_factory: Optional[Callable[[], Awaitable["AsyncClient"]]] = None
+
+async def _create_pooled_async_client() -> "AsyncClient":
+    import httpx
+    from supabase import acreate_client, AsyncClientOptions
+    url, key, pool_size, keepalive, timeout, connect_timeout = _settings()
+    http = httpx.AsyncClient(
+        limits=httpx.Limits(max_connections=pool_size, max_keepalive_connections=keepalive),
+        timeout=httpx.Timeout(timeout, connect=connect_timeout),
+    )
+    options = AsyncClientOptions(postgrest_client_timeout=timeout, httpx_client=http)
+    return await acreate_client(url, key, options=options)
+
+async def get_async_supabase() -> "AsyncClient":
+    """
+    Async counterpart of get_supabase(): one pooled AsyncClient per process.
+    Use it from a single event loop (the pool is bound to the loop that first used it).
+    """
+    global _async_client
+    if _async_client is None:
+        factory = _async_client_factory or _create_pooled_async_client
+        client = _wrap(await factory())
+        with _client_lock:
+            if _async_client is None:
+                _async_client = client
+    return _async_client
+
+def set_async_client_factory(factory: Optional[Callable[[], Awaitable["AsyncClient"]]]) -> None:
+    global _async_client_factory, _async_client
+    with _client_lock:
+        _async_client_factory = factory
+        _async_client = None
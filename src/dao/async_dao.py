@@ -0,0 +1,221 @@
+import asyncio
+from typing import Awaitable, Dict, Iterable, List, Optional
+from src.config import get_async_supabase
+from src.dao.order_dao import OrderDAOError, ORDER_DETAILS_SELECT
+from src.dao.payment_dao import PaymentDAOError, PAYMENT_USE_RPC
+from src.dao.writes import insert_one_async, update_one_async, FOREIGN_KEY_VIOLATION
+from src.dao.stock_dao import StockDAOError, InsufficientStockError, aggregate_items, _notify, rollback_failed, \
+    rpc_missing, cas_backoff, STOCK_CAS_RETRIES, STOCK_USE_RPC
+
+async def bounded_gather(sem: asyncio.Semaphore, *aws: Awaitable) -> List:
+    """
+    asyncio.gather, but at most sem's worth of the awaitables run at once.
+    """
+    async def run(aw):
+        async with sem:
+            return await aw
+    return await asyncio.gather(*(run(aw) for aw in aws))
+
+class _AsyncDAO:
+    def __init__(self, sb):
+        self._sb = sb
+
+    @classmethod
+    async def create(cls):
+        return cls(await get_async_supabase())
+
+    async def _first(self, q) -> Optional[Dict]:
+        resp = await q.limit(1).execute()
+        return resp.data[0] if resp.data else None
+
+class AsyncCustomerDAO(_AsyncDAO):
+    async def get_customer_by_id(self, cust_id: int) -> Optional[Dict]:
+        return await self._first(self._sb.table("customers").select("*").eq("customer_id", cust_id))
+
+    async def get_customer_by_email(self, email: str) -> Optional[Dict]:
+        return await self._first(self._sb.table("customers").select("*").eq("email", email))
+
+class AsyncProductDAO(_AsyncDAO):
+    async def get_product_by_id(self, prod_id: int) -> Optional[Dict]:
+        return await self._first(self._sb.table("products").select("*").eq("product_id", prod_id))
+
+    async def get_products_by_ids(self, prod_ids: Iterable[int], columns: str = "*") -> List[Dict]:
+        ids = list(prod_ids)
+        if not ids:
+            return []
+        resp = await self._sb.table("products").select(columns).in_("product_id", ids).execute()
+        return resp.data or []
+
+class AsyncStockDAO(_AsyncDAO):
+    """
+    Same compare-and-set stock changes as StockDAO; the lines of one order run concurrently.
+    """
+    max_retries = STOCK_CAS_RETRIES
+    use_rpc = STOCK_USE_RPC
+
+    async def adjust_stock(self, prod_id: int, delta: int) -> int:
+        for attempt in range(self.max_retries):
+            if attempt:
+                await asyncio.sleep(cas_backoff(attempt))
+            row = await self._first(self._sb.table("products").select("product_id, stock").eq("product_id", prod_id))
+            if not row:
+                raise StockDAOError(f"Product with id {prod_id} not found")
+            current = row["stock"]
+            new_stock = (current or 0) + delta
+            if new_stock < 0:
+                raise InsufficientStockError(f"Not enough stock for product id {prod_id}")
+            q = self._sb.table("products").update({"stock": new_stock}).eq("product_id", prod_id)
+            q = q.is_("stock", "null") if current is None else q.eq("stock", current)
+            if (await q.execute()).data:
+                _notify({prod_id: new_stock})
+                return new_stock
+        raise StockDAOError(f"Stock for product id {prod_id} changed too often, try again")
+
+    async def reserve(self, items: List[Dict], sem: Optional[asyncio.Semaphore] = None) -> Dict[int, int]:
+        totals = aggregate_items(items)
+        if self.use_rpc:
+            changes = await self._call_rpc("reserve_stock", totals)
+            if changes is not None:
+                return changes
+        sem = sem or asyncio.Semaphore(len(totals) or 1)
+        pids = sorted(totals)
+        results = await bounded_gather(sem, *(self._try_adjust(pid, -totals[pid]) for pid in pids))
+        failures = [r for r in results if isinstance(r, Exception)]
+        if failures:
+            # Give back whatever was taken before reporting the first failure
+            taken = [pid for pid, r in zip(pids, results) if not isinstance(r, Exception)]
+            undone = await bounded_gather(sem, *(self._try_adjust(pid, totals[pid]) for pid in taken))
+            unreleased = {pid: totals[pid] for pid, r in zip(taken, undone) if isinstance(r, Exception)}
+            if unreleased:
+                raise rollback_failed(failures[0], unreleased) from failures[0]
+            raise failures[0]
+        return dict(zip(pids, results))
+
+    async def release(self, items: List[Dict], sem: Optional[asyncio.Semaphore] = None) -> Dict[int, int]:
+        totals = aggregate_items(items)
+        if self.use_rpc:
+            changes = await self._call_rpc("release_stock", totals)
+            if changes is not None:
+                return changes
+        sem = sem or asyncio.Semaphore(len(totals) or 1)
+        pids = sorted(totals)
+        results = await bounded_gather(sem, *(self.adjust_stock(pid, totals[pid]) for pid in pids))
+        return dict(zip(pids, results))
+
+    async def _call_rpc(self, fn: str, totals: Dict[int, int]) -> Optional[Dict[int, int]]:
+        payload = [{"product_id": pid, "quantity": qty} for pid, qty in totals.items()]
+        try:
+            resp = await self._sb.rpc(fn, {"p_items": payload}).execute()
+        except Exception as e:
+            if rpc_missing(e):
+                self.use_rpc = False
+                return None
+            if "Not enough stock" in str(e):
+                raise InsufficientStockError(str(e))
+            raise StockDAOError(str(e))
+        changes = {row["product_id"]: row["stock"] for row in (resp.data or [])}
+        _notify(changes)
+        return changes
+
+    async def _try_adjust(self, prod_id: int, delta: int):
+        try:
+            return await self.adjust_stock(prod_id, delta)
+        except Exception as e:
+            return e
+
+class AsyncOrderDAO(_AsyncDAO):
+    async def create_order(self, customer_id: int, items: List[Dict], prices: Optional[Dict[int, float]] = None) -> Dict:
+        prod_ids = list({item["prod_id"] for item in items})
+        if prices is None:
+            prices = {}
+            if prod_ids:
+                resp = await self._sb.table("products").select("product_id, price").in_("product_id", prod_ids).execute()
+                prices = {p["product_id"]: p["price"] for p in (resp.data or [])}
+        total_amount = sum((prices.get(item["prod_id"]) or 0) * item["quantity"] for item in items)
+
+        # Constraint violations become OrderDAOError, as in OrderDAO
+        order = await insert_one_async(self._sb, "orders",
+                                       {"customer_id": customer_id, "status": "PLACED", "total_amount": total_amount},
+                                       OrderDAOError, {FOREIGN_KEY_VIOLATION: f"Customer {customer_id} does not exist"})
+        if items:
+            try:
+                await self._sb.table("order_items").insert([
+                    {"order_id": order["order_id"], "product_id": item["prod_id"], "quantity": item["quantity"]}
+                    for item in items
+                ]).execute()
+            except Exception as e:
+                await self._sb.table("orders").delete().eq("order_id", order["order_id"]).execute()
+                raise OrderDAOError(f"Failed to create order items: {e}")
+        return order
+
+    async def get_order_by_id(self, order_id: int) -> Optional[Dict]:
+        return await self._first(self._sb.table("orders").select("*").eq("order_id", order_id))
+
+    async def get_order_with_details(self, order_id: int) -> Optional[Dict]:
+        return await self._first(self._sb.table("orders").select(ORDER_DETAILS_SELECT).eq("order_id", order_id))
+
+    async def get_orders_with_details(self, order_ids: List[int], sem: asyncio.Semaphore,
+                                      chunk_size: int = 200) -> List[Dict]:
+        ids = list(dict.fromkeys(order_ids))
+        chunks = [ids[i:i + chunk_size] for i in range(0, len(ids), chunk_size)]
+        pages = await bounded_gather(sem, *(
+            self._sb.table("orders").select(ORDER_DETAILS_SELECT).in_("order_id", chunk).order("order_id").execute()
+            for chunk in chunks))
+        return [row for page in pages for row in (page.data or [])]
+
+    async def get_order_items(self, order_id: int) -> List[Dict]:
+        resp = await self._sb.table("order_items").select("*").eq("order_id", order_id).execute()
+        return resp.data or []
+
+    async def update_order_status(self, order_id: int, status: str) -> Optional[Dict]:
+        return await update_one_async(self._sb, "orders", "order_id", order_id, {"status": status}, OrderDAOError)
+
+    async def transition_order_status(self, order_id: int, from_status: str, to_status: str) -> Optional[Dict]:
+        resp = await self._sb.table("orders").update({"status": to_status})\
+            .eq("order_id", order_id).eq("status", from_status).execute()
+        return resp.data[0] if resp.data else None
+
+class AsyncPaymentDAO(_AsyncDAO):
+    async def create_payment(self, order_id: int, amount: float) -> Optional[Dict]:
+        return await insert_one_async(self._sb, "payments",
+                                      {"order_id": order_id, "amount": amount, "status": "PENDING", "method": None},
+                                      PaymentDAOError, {FOREIGN_KEY_VIOLATION: f"Order {order_id} does not exist"})
+
+    use_rpc = PAYMENT_USE_RPC
+
+    async def get_payment_by_order(self, order_id: int) -> Optional[Dict]:
+        # The latest payment, as in PaymentDAO
+        return await self._first(self._sb.table("payments").select("*").eq("order_id", order_id)
+                                 .order("payment_id", desc=True))
+
+    async def mark_paid(self, payment_id: int, method: str, idempotency_key: Optional[str] = None) -> Optional[Dict]:
+        """
+        Move a payment from PENDING to PAID; None if it was no longer PENDING.
+        """
+        fields = {"status": "PAID", "method": method}
+        if idempotency_key is not None:
+            fields["idempotency_key"] = idempotency_key
+        resp = await self._sb.table("payments").update(fields)\
+            .eq("payment_id", payment_id).eq("status", "PENDING").execute()
+        return resp.data[0] if resp.data else None
+
+    async def mark_refunded(self, payment_id: int) -> Optional[Dict]:
+        """
+        Move a payment from PAID to REFUNDED; None if it wasn't PAID.
+        """
+        resp = await self._sb.table("payments").update({"status": "REFUNDED"})\
+            .eq("payment_id", payment_id).eq("status", "PAID").execute()
+        return resp.data[0] if resp.data else None
+
+    async def process_payment_rpc(self, order_id: int, method: str, idempotency_key: Optional[str] = None) -> Dict:
+        resp = await self._sb.rpc("process_payment", {"p_order_id": order_id, "p_method": method,
+                                                      "p_key": idempotency_key}).execute()
+        if not resp.data:
+            raise PaymentDAOError("process_payment returned nothing")
+        return resp.data[0] if isinstance(resp.data, list) else resp.data
+
+    async def update_payment(self, payment_id: int, status: str, method: Optional[str] = None) -> Optional[Dict]:
+        fields = {"status": status}
+        if method is not None:
+            fields["method"] = method
+        return await update_one_async(self._sb, "payments", "payment_id", payment_id, fields, PaymentDAOError)
@@ -0,0 +1,110 @@
+from typing import Dict, List, Optional, Tuple
+from src.dao.local_store import LocalStore, get_local_store
+
+HOUR = "hour"
+DAY = "day"
+BUCKET_SECONDS = {HOUR: 3600, DAY: 86400}
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS bestseller_buckets (
+    granularity TEXT NOT NULL,
+    bucket INTEGER NOT NULL,
+    product_id INTEGER NOT NULL,
+    quantity INTEGER NOT NULL DEFAULT 0,
+    revenue REAL NOT NULL DEFAULT 0,
+    PRIMARY KEY (granularity, bucket, product_id)
+);
+-- What each counted order added, so a cancellation takes back exactly that
+CREATE TABLE IF NOT EXISTS bestseller_order_lines (
+    order_id INTEGER NOT NULL,
+    product_id INTEGER NOT NULL,
+    created INTEGER NOT NULL,
+    quantity INTEGER NOT NULL,
+    revenue REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS bestseller_order_lines_order ON bestseller_order_lines (order_id);
+CREATE INDEX IF NOT EXISTS bestseller_order_lines_created ON bestseller_order_lines (created);
+CREATE TABLE IF NOT EXISTS rollup_meta (
+    key TEXT PRIMARY KEY,
+    value TEXT
+);
+"""
+
+def bucket_start(epoch: float, granularity: str) -> int:
+    size = BUCKET_SECONDS[granularity]
+    return int(epoch) // size * size
+
+class BestsellerDAO:
+    """
+    Units sold and revenue per product in hourly and daily buckets, kept in the local store.
+    """
+    def __init__(self, store: Optional[LocalStore] = None):
+        self.store = store or get_local_store()
+        self.store.ensure_schema(SCHEMA)
+
+    def apply_order(self, order_id: int, created: float, lines: List[Tuple[int, int, float]]) -> bool:
+        """
+        Count an order's lines in the buckets holding created (epoch seconds).
+        Returns False if it was already counted. lines are (product_id, quantity, revenue).
+        """
+        with self.store.transaction() as conn:
+            if conn.execute("SELECT 1 FROM bestseller_order_lines WHERE order_id = ? LIMIT 1", (order_id,)).fetchone():
+                return False
+            for product_id, quantity, revenue in lines:
+                conn.execute("INSERT INTO bestseller_order_lines (order_id, product_id, created, quantity, revenue) "
+                             "VALUES (?, ?, ?, ?, ?)", (order_id, product_id, int(created), quantity, revenue))
+                self._add(conn, created, product_id, quantity, revenue)
+            return True
+
+    def reverse_order(self, order_id: int) -> bool:
+        """
+        Take a counted order back out (cancellation). Returns False if it wasn't counted.
+        """
+        with self.store.transaction() as conn:
+            lines = conn.execute("SELECT product_id, created, quantity, revenue FROM bestseller_order_lines "
+                                 "WHERE order_id = ?", (order_id,)).fetchall()
+            if not lines:
+                return False
+            for line in lines:
+                self._add(conn, line["created"], line["product_id"], -line["quantity"], -line["revenue"])
+            conn.execute("DELETE FROM bestseller_order_lines WHERE order_id = ?", (order_id,))
+            return True
+
+    @staticmethod
+    def _add(conn, created: float, product_id: int, quantity: int, revenue: float) -> None:
+        for granularity in BUCKET_SECONDS:
+            conn.execute("""INSERT INTO bestseller_buckets (granularity, bucket, product_id, quantity, revenue)
+                            VALUES (?, ?, ?, ?, ?)
+                            ON CONFLICT(granularity, bucket, product_id) DO UPDATE SET
+                                quantity = quantity + excluded.quantity, revenue = revenue + excluded.revenue""",
+                         (granularity, bucket_start(created, granularity), product_id, quantity, revenue))
+
+    def totals(self, granularity: str, start: int) -> List[Dict]:
+        """
+        Quantity and revenue per product over buckets starting at or after start.
+        """
+        return self.store.query("""SELECT product_id, SUM(quantity) AS quantity, SUM(revenue) AS revenue
+                                   FROM bestseller_buckets WHERE granularity = ? AND bucket >= ?
+                                   GROUP BY product_id HAVING SUM(quantity) > 0""", (granularity, start))
+
+    def prune(self, hour_cutoff: int, day_cutoff: int) -> None:
+        """
+        Drop hourly buckets before hour_cutoff, daily buckets and order lines before day_cutoff.
+        """
+        with self.store.transaction() as conn:
+            conn.execute("DELETE FROM bestseller_buckets WHERE granularity = ? AND bucket < ?", (HOUR, hour_cutoff))
+            conn.execute("DELETE FROM bestseller_buckets WHERE granularity = ? AND bucket < ?", (DAY, day_cutoff))
+            conn.execute("DELETE FROM bestseller_order_lines WHERE created < ?", (day_cutoff,))
+
+    def clear(self) -> None:
+        with self.store.transaction() as conn:
+            for table in ("bestseller_buckets", "bestseller_order_lines"):
+                conn.execute(f"DELETE FROM {table}")
+
+    def get_meta(self, key: str) -> Optional[str]:
+        row = self.store.query_one("SELECT value FROM rollup_meta WHERE key = ?", (key,))
+        return row["value"] if row else None
+
+    def set_meta(self, key: str, value: str) -> None:
+        self.store.execute("INSERT INTO rollup_meta (key, value) VALUES (?, ?) "
+                           "ON CONFLICT(key) DO UPDATE SET value = excluded.value", (key, value))
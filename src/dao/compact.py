@@ -0,0 +1,236 @@
+import sys
+from array import array
+from functools import lru_cache
+from typing import Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+try:
+    import numpy as np
+except ImportError:  # numpy is optional; columns stay array/list backed
+    np = None
+
+# Result shapes for scan methods: plain dicts (default), __slots__ records, or column batches
+RECORDS = "records"
+COLUMNS = "columns"
+COMPACT_MODES = (RECORDS, COLUMNS)
+
+# Low-cardinality text columns: each distinct value is stored once
+INTERN_COLUMNS = frozenset({"status", "category", "city", "method"})
+
+class CompactError(Exception):
+    pass
+
+def check_mode(compact: Optional[str]) -> Optional[str]:
+    if compact is not None and compact not in COMPACT_MODES:
+        raise CompactError(f"compact must be one of {', '.join(COMPACT_MODES)}")
+    return compact
+
+class Record:
+    """
+    Base for generated row classes: attribute access plus the read side of the
+    dict API (row["x"], get, keys, items), so code written for dict rows keeps working.
+    """
+    __slots__ = ()
+    _fields: Tuple[str, ...] = ()
+
+    def __getitem__(self, key: str):
+        try:
+            return getattr(self, key)
+        except AttributeError:
+            raise KeyError(key) from None
+
+    def get(self, key: str, default=None):
+        return getattr(self, key, default)
+
+    def __contains__(self, key: str) -> bool:
+        return key in self._fields
+
+    def keys(self) -> Tuple[str, ...]:
+        return self._fields
+
+    def values(self) -> List:
+        return [getattr(self, f) for f in self._fields]
+
+    def items(self) -> List[Tuple[str, object]]:
+        return [(f, getattr(self, f)) for f in self._fields]
+
+    def __iter__(self):
+        return iter(self._fields)
+
+    def __len__(self) -> int:
+        return len(self._fields)
+
+    def _asdict(self) -> Dict:
+        return {f: getattr(self, f) for f in self._fields}
+
+    def __eq__(self, other) -> bool:
+        if isinstance(other, Record):
+            return self._fields == other._fields and self.values() == other.values()
+        if isinstance(other, dict):
+            return self._asdict() == other
+        return NotImplemented
+
+    def __repr__(self) -> str:
+        return f"{type(self).__name__}({', '.join(f'{f}={getattr(self, f)!r}' for f in self._fields)})"
+
+@lru_cache(maxsize=256)
+def record_class(name: str, fields: Tuple[str, ...]) -> type:
+    """
+    A Record subclass with one slot per field, cached per (name, fields).
+    """
+    def __init__(self, *values):
+        for f, v in zip(fields, values):
+            setattr(self, f, v)
+    cls_name = "".join(part.capitalize() for part in name.split("_")) + "Record"
+    return type(cls_name, (Record,), {"__slots__": fields, "_fields": fields, "__init__": __init__})
+
+def _intern_value(value):
+    return sys.intern(value) if isinstance(value, str) else value
+
+def to_records(rows: Iterable[Dict], name: str = "row", columns: Optional[Sequence[str]] = None) -> Iterator[Record]:
+    """
+    Convert dict rows to slotted records. Fields come from columns, or from the
+    first row's keys; keys missing from a row become None.
+    """
+    cls = None
+    interned: Tuple[bool, ...] = ()
+    for row in rows:
+        if cls is None:
+            fields = tuple(columns or row.keys())
+            cls = record_class(name, fields)
+            interned = tuple(f in INTERN_COLUMNS for f in fields)
+        values = [row.get(f) for f in cls._fields]
+        for i, intern in enumerate(interned):
+            if intern:
+                values[i] = _intern_value(values[i])
+        yield cls(*values)
+
+# array typecodes for numeric columns; anything else (text, null-bearing, nested) is a list
+_INT, _FLOAT = "q", "d"
+
+class ColumnBatch:
+    """
+    Rows stored column by column: ints and floats in typed arrays (8 bytes a value),
+    low-cardinality text interned, other values in lists. A numeric column that
+    meets a null or a non-number falls back to a list; an int column that meets
+    a float is widened to float.
+    """
+    __slots__ = ("columns", "_data", "_length")
+
+    def __init__(self, columns: Sequence[str]):
+        self.columns: Tuple[str, ...] = tuple(columns)
+        self._data: Dict[str, object] = {c: None for c in self.columns}
+        self._length = 0
+
+    @classmethod
+    def from_rows(cls, rows: Iterable[Dict], columns: Optional[Sequence[str]] = None) -> "ColumnBatch":
+        rows = rows if isinstance(rows, list) else list(rows)
+        batch = cls(columns or (rows[0].keys() if rows else ()))
+        batch.extend(rows)
+        return batch
+
+    def __len__(self) -> int:
+        return self._length
+
+    def extend(self, rows: Iterable[Dict]) -> None:
+        n = 0
+        for row in rows:
+            for c in self.columns:
+                self._append(c, row.get(c))
+            n += 1
+        self._length += n
+
+    def extend_batch(self, other: "ColumnBatch") -> None:
+        if other.columns != self.columns:
+            raise CompactError("Cannot combine batches with different columns")
+        for c in self.columns:
+            mine, theirs = self._data[c], other._data[c]
+            if isinstance(theirs, array) and (mine is None or
+                                              isinstance(mine, array) and mine.typecode == theirs.typecode):
+                # Same storage on both sides: one C-level copy instead of a Python loop
+                if mine is None:
+                    self._data[c] = array(theirs.typecode)
+                self._data[c].extend(theirs)
+                continue
+            for value in other.column(c):
+                self._append(c, value)
+        self._length += len(other)
+
+    def _append(self, c: str, value) -> None:
+        col = self._data[c]
+        if col is None:
+            col = self._data[c] = self._new_column(value)
+        if isinstance(col, array):
+            if col.typecode == _INT and isinstance(value, int) and not isinstance(value, bool):
+                col.append(value)
+                return
+            if col.typecode == _FLOAT and isinstance(value, (int, float)) and not isinstance(value, bool):
+                col.append(float(value))
+                return
+            if col.typecode == _INT and isinstance(value, float):
+                col = self._data[c] = array(_FLOAT, (float(v) for v in col))
+                col.append(value)
+                return
+            col = self._data[c] = list(col)
+        col.append(_intern_value(value) if c in INTERN_COLUMNS else value)
+
+    @staticmethod
+    def _new_column(first):
+        if isinstance(first, int) and not isinstance(first, bool):
+            return array(_INT)
+        if isinstance(first, float):
+            return array(_FLOAT)
+        return []
+
+    def column(self, name: str):
+        """
+        The stored column: an array.array for numeric columns, otherwise a list.
+        """
+        if name not in self._data:
+            raise KeyError(name)
+        col = self._data[name]
+        return col if col is not None else []
+
+    def to_numpy(self, name: str):
+        if np is None:
+            raise CompactError("numpy is not installed")
+        col = self.column(name)
+        if isinstance(col, array):
+            return np.frombuffer(col, dtype=np.int64 if col.typecode == _INT else np.float64)
+        return np.array(col, dtype=object)
+
+    def row(self, i: int) -> Dict:
+        if not -self._length <= i < self._length:
+            raise IndexError(i)
+        return {c: self.column(c)[i] for c in self.columns}
+
+    def records(self, name: str = "row") -> Iterator[Record]:
+        cls = record_class(name, self.columns)
+        cols = [self.column(c) for c in self.columns]
+        for values in zip(*cols):
+            yield cls(*values)
+
+    def __iter__(self) -> Iterator[Record]:
+        return self.records()
+
+    def nbytes(self) -> int:
+        """
+        Approximate memory held by the column containers (not shared interned strings).
+        """
+        total = 0
+        for col in self._data.values():
+            if isinstance(col, array):
+                total += col.buffer_info()[1] * col.itemsize
+            elif col is not None:
+                total += sys.getsizeof(col)
+        return total
+
+def merge_batches(batches: Iterable[ColumnBatch]) -> Optional[ColumnBatch]:
+    """
+    Concatenate page batches (same columns) into one batch; None if there were none.
+    """
+    merged = None
+    for batch in batches:
+        if merged is None:
+            merged = ColumnBatch(batch.columns)
+        merged.extend_batch(batch)
+    return merged
@@ -1,5 +1,8 @@
-from typing import Optional, List, Dict
+from itertools import islice
+from typing import Optional, List, Dict, Iterator
 from src.config import get_supabase
+from src.dao.pagination import iter_keyset, escape_like, DEFAULT_PAGE_SIZE
+from src.dao.writes import insert_one, update_one, delete_one, UNIQUE_VIOLATION, FOREIGN_KEY_VIOLATION
 
 class CustomerDAOError(Exception):
     pass
@@ -12,15 +15,10 @@ class CustomerDAO:
         if not name or not email:
             raise CustomerDAOError("Name and email are required")
 
-        existing = self.get_customer_by_email(email)
-        if existing:
-            raise CustomerDAOError(f"Email already exists: {email}")
-
+        # The unique index on email rejects duplicates; no lookup first
         payload = {"name": name, "email": email, "phone": phone, "city": city}
-
-        self._sb.table("customers").insert(payload).execute()
-        resp = self._sb.table("customers").select("*").eq("email", email).limit(1).execute()
-        return resp.data[0] if resp.data else None
+        return insert_one(self._sb, "customers", payload, CustomerDAOError,
+                          {UNIQUE_VIOLATION: f"Email already exists: {email}"})
 
     def get_customer_by_id(self, cust_id: int) -> Optional[Dict]:
         resp = self._sb.table("customers").select("*").eq("customer_id", cust_id).limit(1).execute()
@@ -34,29 +32,69 @@ class CustomerDAO:
         if not fields:
             raise CustomerDAOError("No fields to update")
 
-        self._sb.table("customers").update(fields).eq("customer_id", cust_id).execute()
-        resp = self._sb.table("customers").select("*").eq("customer_id", cust_id).limit(1).execute()
-        return resp.data[0] if resp.data else None
+        return update_one(self._sb, "customers", "customer_id", cust_id, fields, CustomerDAOError,
+                          {UNIQUE_VIOLATION: "Email already exists"})
 
     def delete_customer(self, cust_id: int) -> Optional[Dict]:
-        orders_resp = self._sb.table("orders").select("*").eq("customer_id", cust_id).limit(1).execute()
-        if orders_resp.data:
-            raise CustomerDAOError("Cannot delete customer with existing orders.")
+        # orders.customer_id's foreign key refuses the delete while orders exist
+        return delete_one(self._sb, "customers", "customer_id", cust_id, CustomerDAOError,
+                          {FOREIGN_KEY_VIOLATION: "Cannot delete customer with existing orders."})
 
-        resp_before = self._sb.table("customers").select("*").eq("customer_id", cust_id).limit(1).execute()
-        row = resp_before.data[0] if resp_before.data else None
-        self._sb.table("customers").delete().eq("customer_id", cust_id).execute()
-        return row
+    def list_customers(self, limit: int = 100, columns: str = "*") -> List[Dict]:
+        return list(islice(self.iter_customers(columns, max(1, min(limit, DEFAULT_PAGE_SIZE))), limit))
 
-    def list_customers(self, limit: int = 100) -> List[Dict]:
-        resp = self._sb.table("customers").select("*").order("customer_id", desc=False).limit(limit).execute()
-        return resp.data or []
+    def iter_customers(self, columns: str = "*", page_size: int = DEFAULT_PAGE_SIZE,
+                       compact: Optional[str] = None) -> Iterator:
+        return iter_keyset(self._sb, "customers", "customer_id", columns, page_size, compact=compact)
+
+    def search_customers(self, email: Optional[str] = None, city: Optional[str] = None, name: Optional[str] = None,
+                         prefix: bool = False, ignore_case: bool = False, limit: int = 100,
+                         after: Optional[int] = None, columns: str = "*") -> List[Dict]:
+        """
+        One page of matches ordered by customer_id; pass the last id as after for the next page.
+        """
+        limit = max(1, limit)
+        return list(islice(self.iter_search_customers(email, city, name, prefix, ignore_case, columns,
+                                                      min(limit, DEFAULT_PAGE_SIZE), after), limit))
+
+    def iter_search_customers(self, email: Optional[str] = None, city: Optional[str] = None,
+                              name: Optional[str] = None, prefix: bool = False, ignore_case: bool = False,
+                              columns: str = "*", page_size: int = DEFAULT_PAGE_SIZE,
+                              after: Optional[int] = None) -> Iterator[Dict]:
+        """
+        Filters run server-side: exact eq by default, like/ilike for prefix or
+        case-insensitive matches (wildcards in the input are matched literally).
+        """
+        def match(q, col, value):
+            if not prefix and not ignore_case:
+                return q.eq(col, value)
+            pattern = escape_like(value) + ("%" if prefix else "")
+            return q.ilike(col, pattern) if ignore_case else q.like(col, pattern)
 
-    def search_customers(self, email: Optional[str] = None, city: Optional[str] = None) -> List[Dict]:
-        q = self._sb.table("customers").select("*")
-        if email:
-            q = q.eq("email", email)
-        if city:
-            q = q.eq("city", city)
-        resp = q.execute()
-        return resp.data or []
\ No newline at end of file
+        def filters(q):
+            if email:
+                q = match(q, "email", email)
+            if city:
+                q = match(q, "city", city)
+            if name:
+                q = match(q, "name", name)
+            return q
+        return iter_keyset(self._sb, "customers", "customer_id", columns, page_size, filters, after)
+
+    def existing_emails(self, emails: List[str]) -> set:
+        if not emails:
+            return set()
+        resp = self._sb.table("customers").select("email").in_("email", list(emails)).execute()
+        return {row["email"] for row in (resp.data or [])}
+
+    def bulk_create_customers(self, rows: List[Dict], upsert: bool = False) -> List[Dict]:
+        """
+        Insert many customers in one request; with upsert, rows with an existing email are updated.
+        """
+        if not rows:
+            return []
+        if upsert:
+            resp = self._sb.table("customers").upsert(rows, on_conflict="email").execute()
+        else:
+            resp = self._sb.table("customers").insert(rows).execute()
+        return resp.data or []
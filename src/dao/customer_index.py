@@ -0,0 +1,200 @@
+import hashlib
+import math
+import os
+import threading
+import time
+from typing import Dict, Iterable, List, Optional
+from src.dao.customer_dao import CustomerDAO
+from src.dao.pagination import iter_keyset, DEFAULT_PAGE_SIZE
+
+CUSTOMER_INDEX_CAPACITY = int(os.getenv("CUSTOMER_INDEX_CAPACITY", "1000000"))
+CUSTOMER_BLOOM_ERROR_RATE = float(os.getenv("CUSTOMER_BLOOM_ERROR_RATE", "0.01"))
+# How often a warm index pulls customers created by other processes (new ids only)
+CUSTOMER_INDEX_REFRESH = float(os.getenv("CUSTOMER_INDEX_REFRESH", "30"))
+
+def normalize_email(email: str) -> str:
+    return email.strip().lower()
+
+class BloomFilter:
+    """
+    Fixed-size Bloom filter over strings. might_contain() is never wrong when
+    it says False; it says True for absent keys about error_rate of the time.
+    """
+    def __init__(self, capacity: int = CUSTOMER_INDEX_CAPACITY, error_rate: float = CUSTOMER_BLOOM_ERROR_RATE):
+        if capacity <= 0 or not 0 < error_rate < 1:
+            raise ValueError("capacity must be positive and error_rate in (0, 1)")
+        self.size = max(8, int(-capacity * math.log(error_rate) / (math.log(2) ** 2)))
+        self.hashes = max(1, round(self.size / capacity * math.log(2)))
+        self._bits = bytearray((self.size + 7) // 8)
+        self.count = 0
+
+    def _positions(self, key: str) -> Iterable[int]:
+        # Double hashing: h1 + i*h2 from one 128-bit digest
+        digest = hashlib.blake2b(key.encode("utf-8"), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], "little")
+        h2 = int.from_bytes(digest[8:], "little") | 1
+        return ((h1 + i * h2) % self.size for i in range(self.hashes))
+
+    def add(self, key: str) -> None:
+        for pos in self._positions(key):
+            self._bits[pos >> 3] |= 1 << (pos & 7)
+        self.count += 1
+
+    def might_contain(self, key: str) -> bool:
+        return all(self._bits[pos >> 3] & (1 << (pos & 7)) for pos in self._positions(key))
+
+class CustomerIndex:
+    """
+    In-process Bloom filter of customer emails, for "definitely new" answers.
+    Everything else goes to the database: an index per process can't see
+    updates and deletes made by other processes. The filter only answers once
+    warm() has loaded it; a cold index says "don't know".
+    """
+    def __init__(self, capacity: int = CUSTOMER_INDEX_CAPACITY, error_rate: float = CUSTOMER_BLOOM_ERROR_RATE,
+                 refresh_interval: float = CUSTOMER_INDEX_REFRESH):
+        self.capacity = capacity
+        self.error_rate = error_rate
+        self.refresh_interval = refresh_interval
+        self._lock = threading.Lock()
+        self._bloom = BloomFilter(capacity, error_rate)
+        self._max_id = 0
+        self._refreshed_at: Optional[float] = None
+        self.bloom_negatives = 0
+        self.fallbacks = 0
+
+    @property
+    def warm(self) -> bool:
+        return self._refreshed_at is not None
+
+    def load(self, rows: Iterable[Dict]) -> int:
+        # rows may be a lazy database cursor; the lock is taken per row, not across fetches
+        n = 0
+        for row in rows:
+            self.add(row)
+            n += 1
+        self._refreshed_at = time.monotonic()
+        return n
+
+    def needs_refresh(self) -> bool:
+        return self.warm and time.monotonic() - self._refreshed_at > self.refresh_interval
+
+    def add(self, row: Dict) -> None:
+        # Emails are only ever added: a changed or deleted email just costs a database check later
+        with self._lock:
+            if row.get("email"):
+                self._bloom.add(normalize_email(row["email"]))
+            self._max_id = max(self._max_id, row["customer_id"])
+
+    def email_maybe_taken(self, email: str) -> Optional[bool]:
+        """
+        False: the email is definitely not in use. True: it might be (check the
+        database). None: the index is cold and can't tell.
+        """
+        if not self.warm:
+            return None
+        if not self._bloom.might_contain(normalize_email(email)):
+            self.bloom_negatives += 1
+            return False
+        return True
+
+    def partition_emails(self, emails: Iterable[str]):
+        """
+        Split emails into (definitely_new, maybe_taken) using the Bloom filter.
+        """
+        new, maybe = [], []
+        for email in emails:
+            (maybe if self.email_maybe_taken(email) else new).append(email)
+        return new, maybe
+
+    def stats(self) -> Dict:
+        with self._lock:
+            return {
+                "warm": self.warm,
+                "emails": self._bloom.count,
+                "max_customer_id": self._max_id,
+                "bloom_bits": self._bloom.size,
+                "bloom_hashes": self._bloom.hashes,
+                "bloom_negatives": self.bloom_negatives,
+                "fallbacks": self.fallbacks,
+            }
+
+_shared_index: Optional[CustomerIndex] = None
+_shared_lock = threading.Lock()
+
+def get_customer_index() -> CustomerIndex:
+    """
+    Process-wide customer index, shared by every IndexedCustomerDAO.
+    """
+    global _shared_index
+    if _shared_index is None:
+        with _shared_lock:
+            if _shared_index is None:
+                _shared_index = CustomerIndex()
+    return _shared_index
+
+INDEX_COLUMNS = "customer_id, email"
+
+class IndexedCustomerDAO(CustomerDAO):
+    """
+    CustomerDAO that keeps the shared CustomerIndex in step with its writes so
+    bulk imports only ask the database about emails the Bloom filter can't rule
+    out. Single lookups always go to the database: another process may have
+    created the customer since the last refresh(), and a stale "definitely
+    absent" would report a real customer as missing.
+    """
+    def __init__(self, index: Optional[CustomerIndex] = None):
+        super().__init__()
+        self.index = index or get_customer_index()
+
+    def warm(self, page_size: int = DEFAULT_PAGE_SIZE) -> int:
+        """
+        Load every customer's email into the index; returns the row count.
+        """
+        return self.index.load(self.iter_customers(INDEX_COLUMNS, page_size))
+
+    def refresh(self) -> int:
+        after = self.index.stats()["max_customer_id"]
+        return self.index.load(iter_keyset(self._sb, "customers", "customer_id", INDEX_COLUMNS, after=after))
+
+    def _fresh_index(self) -> CustomerIndex:
+        if self.index.needs_refresh():
+            self.refresh()
+        return self.index
+
+    def create_customer(self, name: str, email: str, phone: Optional[str] = None, city: Optional[str] = None) -> Dict:
+        row = super().create_customer(name, email, phone, city)
+        self.index.add(row)
+        return row
+
+    def email_available(self, email: str) -> bool:
+        """
+        True if no customer uses email.
+        """
+        return self.get_customer_by_email(email) is None
+
+    def update_customer(self, cust_id: int, fields: Dict) -> Optional[Dict]:
+        row = super().update_customer(cust_id, fields)
+        if row:
+            self.index.add(row)
+        return row
+
+    def customer_ids_in_city(self, city: str) -> List[int]:
+        # Always the database: cities change and customers are deleted in other processes
+        return [r["customer_id"] for r in self.iter_search_customers(city=city, ignore_case=True,
+                                                                        columns="customer_id")]
+
+    def existing_emails(self, emails: List[str]) -> set:
+        if self._fresh_index().warm:
+            _, emails = self.index.partition_emails(emails)
+        if emails:
+            self.index.fallbacks += 1
+        return super().existing_emails(emails)
+
+    def bulk_create_customers(self, rows: List[Dict], upsert: bool = False) -> List[Dict]:
+        written = super().bulk_create_customers(rows, upsert)
+        for row in written:
+            self.index.add(row)
+        return written
+
+    def index_stats(self) -> Dict:
+        return self.index.stats()
@@ -0,0 +1,131 @@
+from typing import Dict, Iterable, List, Optional
+from src.dao.local_store import LocalStore, get_local_store, to_epoch
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS customer_summary (
+    customer_id INTEGER PRIMARY KEY,
+    order_count INTEGER NOT NULL DEFAULT 0,
+    lifetime_value REAL NOT NULL DEFAULT 0,
+    refunded INTEGER NOT NULL DEFAULT 0,
+    last_order_at TEXT
+);
+CREATE TABLE IF NOT EXISTS customer_summary_status (
+    customer_id INTEGER NOT NULL,
+    status TEXT NOT NULL,
+    orders INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY (customer_id, status)
+);
+-- What each order currently contributes, so status changes and replays adjust it exactly once
+CREATE TABLE IF NOT EXISTS customer_summary_orders (
+    order_id INTEGER PRIMARY KEY,
+    customer_id INTEGER NOT NULL,
+    status TEXT NOT NULL,
+    amount REAL NOT NULL,
+    refunded INTEGER NOT NULL DEFAULT 0
+);
+CREATE TABLE IF NOT EXISTS rollup_meta (
+    key TEXT PRIMARY KEY,
+    value TEXT
+);
+"""
+
+def _value(status: str, amount: float, refunded: bool) -> float:
+    # Lifetime value counts paid-for orders only, like the revenue rollups
+    return amount if status == "COMPLETED" and not refunded else 0.0
+
+class CustomerSummaryDAO:
+    """
+    Per-customer order count, lifetime value, last order date and orders per
+    status, kept in the local store.
+    """
+    def __init__(self, store: Optional[LocalStore] = None):
+        self.store = store or get_local_store()
+        self.store.ensure_schema(SCHEMA)
+
+    def apply_orders(self, orders: Iterable[Dict]) -> int:
+        """
+        Record the current state of each order: {order_id, customer_id, status,
+        amount, created_at, refunded}. An order moves out of its old status and
+        value into the new ones; a finished order never goes back to PLACED
+        (a late ORDER_CREATED event). Returns how many orders changed anything.
+        """
+        changed = 0
+        with self.store.transaction() as conn:
+            for order in orders:
+                changed += self._apply(conn, order)
+        return changed
+
+    def _apply(self, conn, order: Dict) -> int:
+        oid, cid = order["order_id"], order["customer_id"]
+        status, amount = order["status"], float(order.get("amount") or 0)
+        refunded = bool(order.get("refunded"))
+        old = conn.execute("SELECT status, amount, refunded FROM customer_summary_orders WHERE order_id = ?",
+                           (oid,)).fetchone()
+        if old is not None:
+            if status == "PLACED" and old["status"] != "PLACED":
+                status = old["status"]
+            refunded = refunded or bool(old["refunded"])
+            if (old["status"], old["amount"], bool(old["refunded"])) == (status, amount, refunded):
+                return 0
+        row = conn.execute("SELECT * FROM customer_summary WHERE customer_id = ?", (cid,)).fetchone()
+        summary = dict(row) if row else {"customer_id": cid, "order_count": 0, "lifetime_value": 0.0,
+                                         "refunded": 0, "last_order_at": None}
+        value = _value(status, amount, refunded)
+        if old is None:
+            summary["order_count"] += 1
+        else:
+            value -= _value(old["status"], old["amount"], bool(old["refunded"]))
+            summary["refunded"] -= old["refunded"]
+            self._count_status(conn, cid, old["status"], -1)
+        summary["lifetime_value"] += value
+        summary["refunded"] += int(refunded)
+        created_at = order.get("created_at")
+        if created_at and (summary["last_order_at"] is None or
+                           to_epoch(created_at) > to_epoch(summary["last_order_at"])):
+            summary["last_order_at"] = str(created_at)
+        self._count_status(conn, cid, status, 1)
+        conn.execute("""INSERT OR REPLACE INTO customer_summary
+                        (customer_id, order_count, lifetime_value, refunded, last_order_at)
+                        VALUES (:customer_id, :order_count, :lifetime_value, :refunded, :last_order_at)""", summary)
+        conn.execute("INSERT OR REPLACE INTO customer_summary_orders (order_id, customer_id, status, amount, refunded) "
+                     "VALUES (?, ?, ?, ?, ?)", (oid, cid, status, amount, int(refunded)))
+        return 1
+
+    @staticmethod
+    def _count_status(conn, cid: int, status: str, delta: int) -> None:
+        conn.execute("""INSERT INTO customer_summary_status (customer_id, status, orders) VALUES (?, ?, ?)
+                        ON CONFLICT(customer_id, status) DO UPDATE SET orders = orders + excluded.orders""",
+                     (cid, status, delta))
+        conn.execute("DELETE FROM customer_summary_status WHERE customer_id = ? AND status = ? AND orders <= 0",
+                     (cid, status))
+
+    def get_order(self, order_id: int) -> Optional[Dict]:
+        return self.store.query_one("SELECT * FROM customer_summary_orders WHERE order_id = ?", (order_id,))
+
+    def get_summary(self, customer_id: int) -> Optional[Dict]:
+        row = self.store.query_one("SELECT * FROM customer_summary WHERE customer_id = ?", (customer_id,))
+        if row is None:
+            return None
+        row["by_status"] = {r["status"]: r["orders"] for r in self.store.query(
+            "SELECT status, orders FROM customer_summary_status WHERE customer_id = ? ORDER BY status", (customer_id,))}
+        return row
+
+    def order_counts(self, min_orders: int = 0) -> List[Dict]:
+        """
+        (customer_id, order_count) for customers with more than min_orders orders.
+        """
+        return self.store.query("SELECT customer_id, order_count FROM customer_summary "
+                                "WHERE order_count > ? ORDER BY customer_id", (min_orders,))
+
+    def clear(self) -> None:
+        with self.store.transaction() as conn:
+            for table in ("customer_summary", "customer_summary_status", "customer_summary_orders"):
+                conn.execute(f"DELETE FROM {table}")
+
+    def get_meta(self, key: str) -> Optional[str]:
+        row = self.store.query_one("SELECT value FROM rollup_meta WHERE key = ?", (key,))
+        return row["value"] if row else None
+
+    def set_meta(self, key: str, value: str) -> None:
+        self.store.execute("INSERT INTO rollup_meta (key, value) VALUES (?, ?) "
+                           "ON CONFLICT(key) DO UPDATE SET value = excluded.value", (key, value))
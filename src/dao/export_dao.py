@@ -0,0 +1,33 @@
+from typing import Dict, Iterator, Optional
+from src.config import get_supabase
+from src.dao.pagination import iter_keyset, DEFAULT_PAGE_SIZE
+
+# Exportable tables and the key they are paged (and watermarked) on
+EXPORT_TABLES = {
+    "orders": "order_id",
+    "order_items": "order_item_id",
+    "payments": "payment_id",
+    "products": "product_id",
+    "customers": "customer_id",
+}
+
+class ExportDAOError(Exception):
+    pass
+
+class ExportDAO:
+    def __init__(self):
+        self._sb = get_supabase()
+
+    def iter_table(self, table: str, columns: str = "*", since_id: Optional[int] = None,
+                   since: Optional[str] = None, page_size: int = DEFAULT_PAGE_SIZE,
+                   compact: Optional[str] = None) -> Iterator:
+        """
+        Stream a whole table in key order. since_id skips rows up to and including that key;
+        since keeps rows with created_at >= since. compact="records"/"columns" returns
+        compact rows for large scans (see src.dao.compact).
+        """
+        if table not in EXPORT_TABLES:
+            raise ExportDAOError(f"Unknown table: {table}")
+        filters = (lambda q: q.gte("created_at", since)) if since else None
+        return iter_keyset(self._sb, table, EXPORT_TABLES[table], columns, page_size, filters, after=since_id,
+                           compact=compact)
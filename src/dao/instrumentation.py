@@ -0,0 +1,372 @@
+# Timing and tracing for every query the DAOs send. enable() wraps the shared
+# supabase client(s); queries are grouped by the innermost service method
+# (service classes opt in with @instrumented) and reported as text/JSON,
+# Prometheus text, or one JSON log line per query.
+import functools
+import inspect
+import json
+import logging
+import os
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Callable, Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+DB_INSTRUMENT = os.getenv("DB_INSTRUMENT", "0") == "1"
+DB_TRACE_LOG = os.getenv("DB_TRACE_LOG", "0") == "1"
+# Queries one service call may issue itself before it is reported as an N+1 pattern
+DB_N_PLUS_ONE_THRESHOLD = int(os.getenv("DB_N_PLUS_ONE_THRESHOLD", "10"))
+
+# Latency histogram bucket upper bounds, milliseconds
+BUCKETS_MS = (1, 2.5, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000)
+# Latencies kept per series for percentiles
+SAMPLES_PER_SERIES = 512
+
+WRITE_OPS = ("insert", "upsert", "update", "delete")
+FILTER_OPS = {"eq", "neq", "gt", "gte", "lt", "lte", "like", "ilike", "is_", "in_", "contains",
+              "contained_by", "match", "or_", "filter", "not_", "fts", "text_search"}
+
+_enabled = False
+_trace_log = False
+_current: ContextVar[Optional["_Scope"]] = ContextVar("dao_scope", default=None)
+
+class _Series:
+    __slots__ = ("calls", "errors", "rows", "bytes_in", "bytes_out", "total_ms", "max_ms", "buckets", "samples")
+
+    def __init__(self):
+        self.calls = self.errors = self.rows = self.bytes_in = self.bytes_out = 0
+        self.total_ms = self.max_ms = 0.0
+        self.buckets = [0] * (len(BUCKETS_MS) + 1)
+        self.samples: List[float] = []
+
+    def add(self, ms: float, rows: int, bytes_in: int, bytes_out: int, error: bool) -> None:
+        self.calls += 1
+        self.errors += error
+        self.rows += rows
+        self.bytes_in += bytes_in
+        self.bytes_out += bytes_out
+        self.total_ms += ms
+        self.max_ms = max(self.max_ms, ms)
+        for i, bound in enumerate(BUCKETS_MS):
+            if ms <= bound:
+                self.buckets[i] += 1
+                break
+        else:
+            self.buckets[-1] += 1
+        if len(self.samples) < SAMPLES_PER_SERIES:
+            self.samples.append(ms)
+        else:
+            self.samples[self.calls % SAMPLES_PER_SERIES] = ms
+
+    def percentile(self, q: float) -> float:
+        if not self.samples:
+            return 0.0
+        ordered = sorted(self.samples)
+        return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+class Recorder:
+    """
+    Process-wide query statistics keyed by (caller, table, operation).
+    """
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.series: Dict[Tuple[str, str, str], _Series] = {}
+        self.n_plus_one: List[Dict] = []
+
+    def record(self, caller: str, table: str, op: str, ms: float, rows: int,
+               bytes_in: int, bytes_out: int, error: bool) -> None:
+        key = (caller, table, op)
+        with self._lock:
+            series = self.series.get(key)
+            if series is None:
+                series = self.series[key] = _Series()
+            series.add(ms, rows, bytes_in, bytes_out, error)
+
+    def flag(self, finding: Dict) -> None:
+        with self._lock:
+            self.n_plus_one.append(finding)
+            del self.n_plus_one[:-100]
+
+    def reset(self) -> None:
+        with self._lock:
+            self.series.clear()
+            self.n_plus_one.clear()
+
+    def snapshot(self) -> Dict:
+        with self._lock:
+            rows = [{
+                "caller": caller, "table": table, "op": op, "calls": s.calls, "errors": s.errors,
+                "rows": s.rows, "bytes_in": s.bytes_in, "bytes_out": s.bytes_out,
+                "total_ms": round(s.total_ms, 3), "p50_ms": round(s.percentile(0.5), 3),
+                "p99_ms": round(s.percentile(0.99), 3), "max_ms": round(s.max_ms, 3),
+            } for (caller, table, op), s in self.series.items()]
+            findings = list(self.n_plus_one)
+        rows.sort(key=lambda r: r["total_ms"], reverse=True)
+        return {"queries": sum(r["calls"] for r in rows), "total_ms": round(sum(r["total_ms"] for r in rows), 3),
+                "series": rows, "n_plus_one": findings}
+
+    def prometheus(self, prefix: str = "retail_dao") -> str:
+        """
+        Prometheus text exposition format (counters and a latency histogram in seconds).
+        """
+        with self._lock:
+            items = [(k, s.calls, s.errors, s.rows, s.bytes_in, s.bytes_out, s.total_ms, list(s.buckets))
+                     for k, s in self.series.items()]
+        lines = [f"# TYPE {prefix}_requests_total counter", f"# TYPE {prefix}_request_errors_total counter",
+                 f"# TYPE {prefix}_rows_total counter", f"# TYPE {prefix}_bytes_total counter",
+                 f"# TYPE {prefix}_request_duration_seconds histogram"]
+        for (caller, table, op), calls, errors, rows, b_in, b_out, total_ms, buckets in sorted(items):
+            labels = f'caller="{_escape(caller)}",table="{_escape(table)}",op="{op}"'
+            lines.append(f"{prefix}_requests_total{{{labels}}} {calls}")
+            lines.append(f"{prefix}_request_errors_total{{{labels}}} {errors}")
+            lines.append(f"{prefix}_rows_total{{{labels}}} {rows}")
+            lines.append(f'{prefix}_bytes_total{{{labels},direction="in"}} {b_in}')
+            lines.append(f'{prefix}_bytes_total{{{labels},direction="out"}} {b_out}')
+            cumulative = 0
+            for bound, count in zip(BUCKETS_MS, buckets):
+                cumulative += count
+                lines.append(f'{prefix}_request_duration_seconds_bucket{{{labels},le="{bound / 1000:g}"}} {cumulative}')
+            lines.append(f'{prefix}_request_duration_seconds_bucket{{{labels},le="+Inf"}} {calls}')
+            lines.append(f"{prefix}_request_duration_seconds_sum{{{labels}}} {total_ms / 1000:.6f}")
+            lines.append(f"{prefix}_request_duration_seconds_count{{{labels}}} {calls}")
+        return "\n".join(lines) + "\n"
+
+recorder = Recorder()
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"')
+
+class _Scope:
+    __slots__ = ("name", "parent", "own", "total", "signatures")
+
+    def __init__(self, name: str, parent: Optional["_Scope"]):
+        self.name = name
+        self.parent = parent
+        self.own = 0
+        self.total = 0
+        self.signatures: Counter = Counter()
+
+@contextmanager
+def scope(name: str):
+    """
+    Attribute the queries issued inside the block to name (a service method,
+    CLI command or HTTP route). Scopes nest; a query counts for the innermost one.
+    """
+    if not _enabled:
+        yield
+        return
+    current = _Scope(name, _current.get())
+    token = _current.set(current)
+    try:
+        yield
+    finally:
+        _current.reset(token)
+        if current.own > DB_N_PLUS_ONE_THRESHOLD:
+            signature, repeats = current.signatures.most_common(1)[0]
+            finding = {"caller": name, "queries": current.own, "threshold": DB_N_PLUS_ONE_THRESHOLD,
+                       "most_repeated": signature, "repeats": repeats}
+            recorder.flag(finding)
+            logger.warning("Possible N+1: %s issued %d queries (most repeated: %s x%d)",
+                           name, current.own, signature, repeats)
+
+def traced(name: str) -> Callable:
+    """
+    Decorator form of scope(name); works on plain and async functions.
+    """
+    def wrap(fn):
+        if inspect.iscoroutinefunction(fn):
+            @functools.wraps(fn)
+            async def run_async(*args, **kwargs):
+                if not _enabled:
+                    return await fn(*args, **kwargs)
+                with scope(name):
+                    return await fn(*args, **kwargs)
+            return run_async
+
+        @functools.wraps(fn)
+        def run(*args, **kwargs):
+            if not _enabled:
+                return fn(*args, **kwargs)
+            with scope(name):
+                return fn(*args, **kwargs)
+        return run
+    return wrap
+
+def instrumented(cls):
+    """
+    Class decorator: trace every public method of a service as "Class.method".
+    Costs one flag check per call while instrumentation is off. Generator
+    methods are left alone: their queries run after the call has returned.
+    """
+    for attr, value in list(vars(cls).items()):
+        if attr.startswith("_") or not inspect.isfunction(value) or inspect.isgeneratorfunction(value):
+            continue
+        setattr(cls, attr, traced(f"{cls.__name__}.{attr}")(value))
+    return cls
+
+def _size(value) -> int:
+    if value is None:
+        return 0
+    try:
+        return len(json.dumps(value, default=str))
+    except (TypeError, ValueError):
+        return 0
+
+class _Query:
+    """
+    Shape of one query as the DAO builds it: table, operation and filtered columns.
+    """
+    __slots__ = ("table", "op", "filters", "bytes_out")
+
+    def __init__(self, table: str, op: str = "select"):
+        self.table = table
+        self.op = op
+        self.filters: List[str] = []
+        self.bytes_out = 0
+
+    def signature(self) -> str:
+        where = " ".join(self.filters)
+        return f"{self.op} {self.table}" + (f" [{where}]" if where else "")
+
+def _finish(query: _Query, started: float, resp, error: Optional[BaseException]) -> None:
+    ms = (time.perf_counter() - started) * 1000
+    data = getattr(resp, "data", None)
+    rows = len(data) if isinstance(data, list) else (1 if data else 0)
+    bytes_in = _size(data)
+    current = _current.get()
+    caller = current.name if current else "-"
+    if current is not None:
+        current.own += 1
+        current.signatures[query.signature()] += 1
+        s = current
+        while s is not None:
+            s.total += 1
+            s = s.parent
+    recorder.record(caller, query.table, query.op, ms, rows, bytes_in, query.bytes_out, error is not None)
+    if _trace_log:
+        logger.info(json.dumps({
+            "event": "db_query", "caller": caller, "table": query.table, "op": query.op,
+            "filters": query.filters, "ms": round(ms, 3), "rows": rows, "bytes_in": bytes_in,
+            "bytes_out": query.bytes_out, "error": None if error is None else str(error)[:200],
+        }))
+
+class _BuilderProxy:
+    """
+    Stands in for a PostgREST request builder: notes each chained call and times execute().
+    """
+    __slots__ = ("_target", "_query")
+
+    def __init__(self, target, query: _Query):
+        self._target = target
+        self._query = query
+
+    def __getattr__(self, name):
+        attr = getattr(self._target, name)
+        if name == "execute":
+            return self._execute
+        if not callable(attr):
+            return _BuilderProxy(attr, self._query) if hasattr(attr, "execute") else attr
+
+        def call(*args, **kwargs):
+            query = self._query
+            if name in WRITE_OPS:
+                query.op = name
+                query.bytes_out = _size(args[0] if args else kwargs.get("json"))
+            elif name in FILTER_OPS:
+                query.filters.append(f"{name.rstrip('_')}:{args[0]}" if args and isinstance(args[0], str) else name)
+            result = attr(*args, **kwargs)
+            return _BuilderProxy(result, query) if hasattr(result, "execute") else result
+        return call
+
+    def _execute(self, *args, **kwargs):
+        started = time.perf_counter()
+        try:
+            resp = self._target.execute(*args, **kwargs)
+        except Exception as e:
+            _finish(self._query, started, None, e)
+            raise
+        if inspect.isawaitable(resp):
+            return self._await(resp, started)
+        _finish(self._query, started, resp, None)
+        return resp
+
+    async def _await(self, pending, started: float):
+        try:
+            resp = await pending
+        except Exception as e:
+            _finish(self._query, started, None, e)
+            raise
+        _finish(self._query, started, resp, None)
+        return resp
+
+class InstrumentedClient:
+    """
+    Wraps a supabase Client/AsyncClient; table()/from_()/rpc() builders are traced,
+    everything else passes through.
+    """
+    def __init__(self, client):
+        self._client = client
+
+    def table(self, name: str):
+        return _BuilderProxy(self._client.table(name), _Query(name))
+
+    from_ = table
+
+    def rpc(self, fn: str, params: Optional[Dict] = None, *args, **kwargs):
+        query = _Query(fn, "rpc")
+        query.bytes_out = _size(params)
+        return _BuilderProxy(self._client.rpc(fn, params or {}, *args, **kwargs), query)
+
+    def __getattr__(self, name):
+        return getattr(self._client, name)
+
+def enable(trace_log: bool = DB_TRACE_LOG) -> None:
+    """
+    Start recording. Clients built from now on are wrapped; an existing shared
+    client is dropped so the next get_supabase() returns a wrapped one.
+    """
+    from src import config
+    config.set_client_wrapper(start(trace_log))
+
+def start(trace_log: bool = DB_TRACE_LOG):
+    """
+    Turn recording on and return the client wrapper (config uses this for DB_INSTRUMENT=1).
+    """
+    global _enabled, _trace_log
+    _enabled = True
+    _trace_log = trace_log
+    return InstrumentedClient
+
+def disable() -> None:
+    global _enabled
+    from src import config
+    _enabled = False
+    config.set_client_wrapper(None)
+
+def is_enabled() -> bool:
+    return _enabled
+
+def render_report(fmt: str = "text") -> str:
+    """
+    The recorded statistics as "text" (a table), "json" or "prometheus".
+    """
+    if fmt == "prometheus":
+        return recorder.prometheus()
+    snap = recorder.snapshot()
+    if fmt == "json":
+        return json.dumps(snap, indent=2)
+    header = f"{'caller':<40} {'table':<16} {'op':<7} {'calls':>6} {'rows':>7} {'bytes':>9} " \
+             f"{'total ms':>9} {'p50':>7} {'p99':>7} {'max':>7}"
+    lines = [f"{snap['queries']} queries, {snap['total_ms']:.1f} ms in the database client", header, "-" * len(header)]
+    for r in snap["series"]:
+        lines.append(f"{r['caller'][:40]:<40} {r['table'][:16]:<16} {r['op']:<7} {r['calls']:>6} {r['rows']:>7} "
+                     f"{r['bytes_in'] + r['bytes_out']:>9} {r['total_ms']:>9.1f} {r['p50_ms']:>7.1f} "
+                     f"{r['p99_ms']:>7.1f} {r['max_ms']:>7.1f}")
+    for f in snap["n_plus_one"]:
+        lines.append(f"Possible N+1: {f['caller']} issued {f['queries']} queries "
+                     f"(most repeated: {f['most_repeated']} x{f['repeats']})")
+    return "\n".join(lines)
@@ -0,0 +1,97 @@
+import os
+import sqlite3
+import threading
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from typing import Dict, Iterable, List, Optional
+
+_PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+def _store_path(path: str) -> str:
+    # Relative paths are taken from the project root, not the current directory,
+    # so the CLI and server find the same store wherever they are started
+    return path if path == ":memory:" else os.path.join(_PROJECT_ROOT, path)
+
+# SQLite file holding derived data (rollups, summaries)
+LOCAL_STORE_PATH = _store_path(os.getenv("LOCAL_STORE_PATH", "retail_local.db"))
+
+class LocalStoreError(Exception):
+    pass
+
+def to_epoch(ts) -> float:
+    """
+    Epoch seconds for a PostgREST timestamp (ISO string), datetime or number; naive means UTC.
+    """
+    if ts is None:
+        return 0.0
+    if isinstance(ts, (int, float)):
+        return float(ts)
+    if isinstance(ts, datetime):
+        dt = ts
+    else:
+        dt = datetime.fromisoformat(str(ts).replace("Z", "+00:00"))
+    if dt.tzinfo is None:
+        dt = dt.replace(tzinfo=timezone.utc)
+    return dt.timestamp()
+
+class LocalStore:
+    """
+    Small wrapper over one SQLite connection shared by the threads of a process.
+    Writes are serialized with a lock; WAL mode lets other processes read meanwhile.
+    """
+    def __init__(self, path: str = LOCAL_STORE_PATH):
+        self.path = path
+        try:
+            self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None, timeout=30)
+        except sqlite3.Error as e:
+            raise LocalStoreError(f"Cannot open local store {path}: {e}")
+        self._conn.row_factory = sqlite3.Row
+        self._lock = threading.RLock()
+        if path != ":memory:":
+            self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+
+    def ensure_schema(self, ddl: str) -> None:
+        with self._lock:
+            self._conn.executescript(ddl)
+
+    @contextmanager
+    def transaction(self):
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                yield self._conn
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+            else:
+                self._conn.execute("COMMIT")
+
+    def execute(self, sql: str, params: Iterable = ()) -> None:
+        with self._lock:
+            self._conn.execute(sql, tuple(params))
+
+    def query(self, sql: str, params: Iterable = ()) -> List[Dict]:
+        with self._lock:
+            return [dict(row) for row in self._conn.execute(sql, tuple(params)).fetchall()]
+
+    def query_one(self, sql: str, params: Iterable = ()) -> Optional[Dict]:
+        rows = self.query(sql, params)
+        return rows[0] if rows else None
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+_stores: Dict[str, LocalStore] = {}
+_stores_lock = threading.Lock()
+
+def get_local_store(path: Optional[str] = None) -> LocalStore:
+    """
+    Process-wide LocalStore per path (default LOCAL_STORE_PATH).
+    """
+    path = path or LOCAL_STORE_PATH
+    with _stores_lock:
+        if path not in _stores:
+            _stores[path] = LocalStore(path)
+        return _stores[path]
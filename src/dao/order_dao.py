@@ -1,5 +1,16 @@
-from typing import Optional, List, Dict
+from typing import Optional, List, Dict, Iterator
 from src.config import get_supabase
+from src.dao.pagination import iter_keyset, DEFAULT_PAGE_SIZE
+from src.dao.writes import insert_one, update_one, FOREIGN_KEY_VIOLATION
+
+# One request brings back the order with its customer, lines and each line's product
+ORDER_DETAILS_SELECT = "*, customers(*), order_items(*, products(*))"
+# What revenue rollups need: the order total and each line's price/category
+ORDER_REVENUE_SELECT = "order_id, status, total_amount, created_at, order_items(quantity, products(price, category))"
+# What customer summaries need: the order's state and whether its payment was refunded
+ORDER_SUMMARY_SELECT = "order_id, customer_id, status, total_amount, created_at, payments(status)"
+# What best-seller buckets need: when the order was placed and each line's product price
+ORDER_LINES_SELECT = "order_id, created_at, order_items(product_id, quantity, products(price))"
 
 class OrderDAOError(Exception):
     pass
@@ -8,36 +19,42 @@ class OrderDAO:
     def __init__(self):
         self._sb = get_supabase()
 
-    def create_order(self, customer_id: int, items: List[Dict]) -> Dict:
-        # Insert new order with status 'PLACED', total_amount initially 0
-        payload = {"customer_id": customer_id, "status": "PLACED", "total_amount": 0}
-        self._sb.table("orders").insert(payload).execute()
-        resp = self._sb.table("orders").select("*").order("order_id", desc=True).limit(1).execute()
-        order = resp.data[0] if resp.data else None
-        if not order:
-            raise OrderDAOError("Failed to create order")
+    def get_prices(self, prod_ids) -> Dict[int, float]:
+        """
+        {product_id: price} for the given products, in one request.
+        """
+        prod_ids = list(set(prod_ids))
+        if not prod_ids:
+            return {}
+        resp = self._sb.table("products").select("product_id, price").in_("product_id", prod_ids).execute()
+        return {p["product_id"]: p["price"] for p in (resp.data or [])}
+
+    def create_order(self, customer_id: int, items: List[Dict], prices: Optional[Dict[int, float]] = None) -> Dict:
+        """
+        Insert the order and its lines; total_amount comes from prices
+        (fetched here when not given).
+        """
+        if prices is None:
+            prices = self.get_prices(item["prod_id"] for item in items)
+        total_amount = sum((prices.get(item["prod_id"]) or 0) * item["quantity"] for item in items)
 
+        # Insert new order with status 'PLACED'; the insert returns the created row (and its id)
+        payload = {"customer_id": customer_id, "status": "PLACED", "total_amount": total_amount}
+        order = insert_one(self._sb, "orders", payload, OrderDAOError,
+                           {FOREIGN_KEY_VIOLATION: f"Customer {customer_id} does not exist"})
         order_id = order["order_id"]
 
-        # Insert order_items entries
-        total_amount = 0
-        for item in items:
-            prod_id = item["prod_id"]
-            quantity = item["quantity"]
-            self._sb.table("order_items").insert({
-                "order_id": order_id,
-                "product_id": prod_id,
-                "quantity": quantity
-            }).execute()
-
-            # Fetch product price for calculation
-            prod_resp = self._sb.table("products").select("price").eq("product_id", prod_id).limit(1).execute()
-            price = prod_resp.data[0]["price"] if prod_resp.data else 0
-            total_amount += price * quantity
-
-        # Update order total_amount
-        self._sb.table("orders").update({"total_amount": total_amount}).eq("order_id", order_id).execute()
-        order["total_amount"] = total_amount
+        # Insert all order_items entries in one bulk insert
+        if items:
+            try:
+                self._sb.table("order_items").insert([
+                    {"order_id": order_id, "product_id": item["prod_id"], "quantity": item["quantity"]}
+                    for item in items
+                ]).execute()
+            except Exception as e:
+                # Don't leave an order without its lines behind
+                self._sb.table("orders").delete().eq("order_id", order_id).execute()
+                raise OrderDAOError(f"Failed to create order items: {e}")
 
         return order
 
@@ -45,18 +62,117 @@ class OrderDAO:
         resp = self._sb.table("orders").select("*").eq("order_id", order_id).limit(1).execute()
         return resp.data[0] if resp.data else None
 
-    def list_orders_by_customer(self, customer_id: int) -> List[Dict]:
-        resp = self._sb.table("orders").select("*").eq("customer_id", customer_id).order("order_id").execute()
+    def get_orders_by_ids(self, order_ids: List[int], columns: str = "*") -> List[Dict]:
+        """
+        Fetch many orders in one request. Unknown ids are skipped.
+        """
+        if not order_ids:
+            return []
+        resp = self._sb.table("orders").select(columns).in_("order_id", list(order_ids)).execute()
         return resp.data or []
 
+    def get_order_with_details(self, order_id: int) -> Optional[Dict]:
+        resp = self._sb.table("orders").select(ORDER_DETAILS_SELECT).eq("order_id", order_id).limit(1).execute()
+        return resp.data[0] if resp.data else None
+
+    def get_orders_with_details(self, order_ids: List[int], chunk_size: int = 200) -> List[Dict]:
+        """
+        Same embedded fetch for many orders, one request per chunk of ids.
+        """
+        ids = list(dict.fromkeys(order_ids))
+        rows = []
+        for i in range(0, len(ids), chunk_size):
+            resp = self._sb.table("orders").select(ORDER_DETAILS_SELECT)\
+                .in_("order_id", ids[i:i + chunk_size]).order("order_id").execute()
+            rows.extend(resp.data or [])
+        return rows
+
+    def get_order_for_revenue(self, order_id: int) -> Optional[Dict]:
+        resp = self._sb.table("orders").select(ORDER_REVENUE_SELECT).eq("order_id", order_id).limit(1).execute()
+        return resp.data[0] if resp.data else None
+
+    def get_orders_for_revenue(self, order_ids: List[int], chunk_size: int = 200) -> List[Dict]:
+        """
+        get_order_for_revenue for many orders, one request per chunk of ids.
+        """
+        ids = list(dict.fromkeys(order_ids))
+        rows = []
+        for i in range(0, len(ids), chunk_size):
+            resp = self._sb.table("orders").select(ORDER_REVENUE_SELECT)\
+                .in_("order_id", ids[i:i + chunk_size]).order("order_id").execute()
+            rows.extend(resp.data or [])
+        return rows
+
+    def iter_completed_orders_for_revenue(self, page_size: int = DEFAULT_PAGE_SIZE) -> Iterator[Dict]:
+        """
+        Stream COMPLETED orders with their lines and payment status, for rebuilding rollups.
+        """
+        return iter_keyset(self._sb, "orders", "order_id", ORDER_REVENUE_SELECT + ", payments(status)", page_size,
+                           lambda q: q.eq("status", "COMPLETED"))
+
+    def iter_orders_for_summary(self, page_size: int = DEFAULT_PAGE_SIZE) -> Iterator[Dict]:
+        """
+        Stream every order with its payment status, for rebuilding customer summaries.
+        """
+        return iter_keyset(self._sb, "orders", "order_id", ORDER_SUMMARY_SELECT, page_size)
+
+    def get_order_for_summary(self, order_id: int) -> Optional[Dict]:
+        resp = self._sb.table("orders").select(ORDER_SUMMARY_SELECT).eq("order_id", order_id).limit(1).execute()
+        return resp.data[0] if resp.data else None
+
+    def iter_orders_with_lines(self, since: str, page_size: int = DEFAULT_PAGE_SIZE) -> Iterator[Dict]:
+        """
+        Stream orders created at or after since (ISO timestamp) that weren't cancelled, with their lines.
+        """
+        return iter_keyset(self._sb, "orders", "order_id", ORDER_LINES_SELECT, page_size,
+                           lambda q: q.neq("status", "CANCELLED").gte("created_at", since))
+
+    def list_orders_by_customer(self, customer_id: int) -> List[Dict]:
+        return list(self.iter_orders_by_customer(customer_id))
+
+    def iter_orders_by_customer(self, customer_id: int, columns: str = "*",
+                                page_size: int = DEFAULT_PAGE_SIZE, compact: Optional[str] = None) -> Iterator:
+        return iter_keyset(self._sb, "orders", "order_id", columns, page_size,
+                           lambda q: q.eq("customer_id", customer_id), compact=compact)
+
     def update_order_status(self, order_id: int, status: str) -> Optional[Dict]:
-        self._sb.table("orders").update({"status": status}).eq("order_id", order_id).execute()
-        resp = self._sb.table("orders").select("*").eq("order_id", order_id).limit(1).execute()
+        return update_one(self._sb, "orders", "order_id", order_id, {"status": status}, OrderDAOError)
+
+    def transition_order_status(self, order_id: int, from_status: str, to_status: str) -> Optional[Dict]:
+        """
+        Move an order to to_status only if it is still in from_status.
+        Returns the updated row, or None if another writer changed it first.
+        """
+        resp = self._sb.table("orders").update({"status": to_status})\
+            .eq("order_id", order_id).eq("status", from_status).execute()
         return resp.data[0] if resp.data else None
 
+    def transition_orders_status(self, order_ids: List[int], from_status: str, to_status: str) -> List[Dict]:
+        """
+        Bulk transition_order_status: one conditional update for many orders.
+        Returns only the rows this call actually moved.
+        """
+        if not order_ids:
+            return []
+        resp = self._sb.table("orders").update({"status": to_status})\
+            .in_("order_id", list(order_ids)).eq("status", from_status).execute()
+        return resp.data or []
+
     def get_order_items(self, order_id: int) -> List[Dict]:
         resp = self._sb.table("order_items").select("*").eq("order_id", order_id).execute()
         return resp.data or []
 
+    def get_items_for_orders(self, order_ids: List[int], columns: str = "*",
+                             page_size: int = DEFAULT_PAGE_SIZE) -> List[Dict]:
+        """
+        Every line of the given orders. Paged by order_item_id, since many orders'
+        lines can exceed the server's max rows per response.
+        """
+        if not order_ids:
+            return []
+        ids = list(order_ids)
+        return list(iter_keyset(self._sb, "order_items", "order_item_id", columns, page_size,
+                                lambda q: q.in_("order_id", ids)))
+
     def delete_order_items(self, order_id: int) -> None:
         self._sb.table("order_items").delete().eq("order_id", order_id).execute()
\ No newline at end of file
@@ -0,0 +1,65 @@
+import os
+from typing import Any, Callable, Dict, Iterator, Optional
+
+DEFAULT_PAGE_SIZE = int(os.getenv("DAO_PAGE_SIZE", "1000"))
+
+def with_key(columns: str, key: str) -> str:
+    """
+    Make sure a projected column list includes the pagination key.
+    """
+    if columns.strip() == "*":
+        return columns
+    names = [c.strip().split(":")[-1] for c in columns.split(",")]
+    return columns if key in names else f"{key}, {columns}"
+
+def escape_like(value: str) -> str:
+    """
+    Escape LIKE wildcards so user input is matched literally.
+    """
+    return value.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+
+def iter_keyset(sb, table: str, key: str, columns: str = "*", page_size: int = DEFAULT_PAGE_SIZE,
+                filters: Optional[Callable[[Any], Any]] = None, after: Optional[Any] = None,
+                compact: Optional[str] = None) -> Iterator:
+    """
+    Yield every row of table ordered by key, one page at a time.
+    Each page asks for key > last key seen, so deep pages cost the same as the first
+    and only one page is held in memory. filters(q) may add eq/lte/... to each page's query.
+    compact="records" yields __slots__ records instead of dicts; compact="columns"
+    yields one ColumnBatch per page (see src.dao.compact).
+    """
+    if page_size <= 0:
+        raise ValueError("page_size must be positive")
+    if compact is not None:
+        return _iter_compact(sb, table, key, columns, page_size, filters, after, compact)
+    return _iter_dicts(sb, table, key, columns, page_size, filters, after)
+
+def _iter_compact(sb, table, key, columns, page_size, filters, after, compact):
+    from src.dao.compact import COLUMNS, ColumnBatch, check_mode, to_records
+    check_mode(compact)
+    for page in _iter_pages(sb, table, key, columns, page_size, filters, after):
+        if compact == COLUMNS:
+            yield ColumnBatch.from_rows(page)
+        else:
+            yield from to_records(page, table)
+
+def _iter_dicts(sb, table, key, columns, page_size, filters, after):
+    for page in _iter_pages(sb, table, key, columns, page_size, filters, after):
+        yield from page
+
+def _iter_pages(sb, table, key, columns, page_size, filters, after) -> Iterator[list]:
+    columns = with_key(columns, key)
+    last = after
+    while True:
+        q = sb.table(table).select(columns)
+        if filters:
+            q = filters(q)
+        if last is not None:
+            q = q.gt(key, last)
+        resp = q.order(key).limit(page_size).execute()
+        rows = resp.data or []
+        if rows:
+            yield rows
+        if len(rows) < page_size:
+            return
+        last = rows[-1][key]
@@ -1,12 +1,19 @@
+import os
 from typing import Optional, Dict, List
 from src.config import get_supabase
+from src.dao.writes import insert_one, update_one, FOREIGN_KEY_VIOLATION
+
+# Process payments with the process_payment() SQL function (sql/payment_functions.sql):
+# the payment and order change together in one transaction
+PAYMENT_USE_RPC = os.getenv("PAYMENT_USE_RPC", "0") == "1"
 
 class PaymentDAOError(Exception):
     pass
 
 class PaymentDAO:
-    def __init__(self):
+    def __init__(self, use_rpc: bool = PAYMENT_USE_RPC):
         self._sb = get_supabase()
+        self.use_rpc = use_rpc
 
     def create_payment(self, order_id: int, amount: float) -> Optional[Dict]:
         payload = {
@@ -15,18 +22,80 @@ class PaymentDAO:
             "status": "PENDING",
             "method": None
         }
-        self._sb.table("payments").insert(payload).execute()
-        resp = self._sb.table("payments").select("*").eq("order_id", order_id).limit(1).execute()
-        return resp.data[0] if resp.data else None
+        # The insert returns the new row; reselecting by order_id could pick up another payment
+        return insert_one(self._sb, "payments", payload, PaymentDAOError,
+                          {FOREIGN_KEY_VIOLATION: f"Order {order_id} does not exist"})
 
     def update_payment(self, payment_id: int, status: str, method: Optional[str] = None) -> Optional[Dict]:
         update_fields = {"status": status}
         if method is not None:
             update_fields["method"] = method
-        self._sb.table("payments").update(update_fields).eq("payment_id", payment_id).execute()
-        resp = self._sb.table("payments").select("*").eq("payment_id", payment_id).limit(1).execute()
+        return update_one(self._sb, "payments", "payment_id", payment_id, update_fields, PaymentDAOError)
+
+    def mark_paid(self, payment_id: int, method: str, idempotency_key: Optional[str] = None) -> Optional[Dict]:
+        """
+        Move a payment from PENDING to PAID, recording the method and request key.
+        Returns the updated row, or None if it was no longer PENDING.
+        """
+        fields = {"status": "PAID", "method": method}
+        if idempotency_key is not None:
+            fields["idempotency_key"] = idempotency_key
+        resp = self._sb.table("payments").update(fields)\
+            .eq("payment_id", payment_id).eq("status", "PENDING").execute()
+        return resp.data[0] if resp.data else None
+
+    def mark_refunded(self, payment_id: int) -> Optional[Dict]:
+        """
+        Move a payment from PAID to REFUNDED. Returns the updated row, or None if it wasn't PAID.
+        """
+        resp = self._sb.table("payments").update({"status": "REFUNDED"})\
+            .eq("payment_id", payment_id).eq("status", "PAID").execute()
         return resp.data[0] if resp.data else None
 
+    def process_payment_rpc(self, order_id: int, method: str, idempotency_key: Optional[str] = None) -> Dict:
+        """
+        Pay and complete an order in one server-side transaction.
+        Returns {"payment", "order", "replayed"}.
+        """
+        resp = self._sb.rpc("process_payment", {"p_order_id": order_id, "p_method": method,
+                                                "p_key": idempotency_key}).execute()
+        if not resp.data:
+            raise PaymentDAOError("process_payment returned nothing")
+        return resp.data[0] if isinstance(resp.data, list) else resp.data
+
     def get_payment_by_order(self, order_id: int) -> Optional[Dict]:
-        resp = self._sb.table("payments").select("*").eq("order_id", order_id).limit(1).execute()
-        return resp.data[0] if resp.data else None
\ No newline at end of file
+        resp = self._sb.table("payments").select("*").eq("order_id", order_id)\
+            .order("payment_id", desc=True).limit(1).execute()
+        return resp.data[0] if resp.data else None
+
+    def get_payments_by_orders(self, order_ids: List[int]) -> List[Dict]:
+        """
+        Payments of many orders, oldest first (by payment_id) so the latest per order comes last.
+        """
+        if not order_ids:
+            return []
+        resp = self._sb.table("payments").select("*").in_("order_id", list(order_ids))\
+            .order("payment_id").execute()
+        return resp.data or []
+
+    def mark_payments_paid(self, payment_ids: List[int], method: str) -> List[Dict]:
+        """
+        Move many payments from PENDING to PAID in one request. Returns the rows
+        that moved; payments no longer PENDING are left alone.
+        """
+        if not payment_ids:
+            return []
+        resp = self._sb.table("payments").update({"status": "PAID", "method": method})\
+            .in_("payment_id", list(payment_ids)).eq("status", "PENDING").execute()
+        return resp.data or []
+
+    def mark_payments_refunded(self, payment_ids: List[int]) -> List[Dict]:
+        """
+        Move many payments from PAID to REFUNDED in one request. Returns the rows
+        that moved; payments not PAID are left alone.
+        """
+        if not payment_ids:
+            return []
+        resp = self._sb.table("payments").update({"status": "REFUNDED"})\
+            .in_("payment_id", list(payment_ids)).eq("status", "PAID").execute()
+        return resp.data or []
@@ -0,0 +1,158 @@
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, Optional
+from src.dao.product_dao import ProductDAO
+from src.dao.stock_dao import add_stock_listener
+
+PRODUCT_CACHE_SIZE = int(os.getenv("PRODUCT_CACHE_SIZE", "10000"))
+PRODUCT_CACHE_TTL = float(os.getenv("PRODUCT_CACHE_TTL", "300"))
+# Stock moves much faster than name/price/category; 0 means always re-read stock
+PRODUCT_STOCK_TTL = float(os.getenv("PRODUCT_STOCK_TTL", "5"))
+
+class ProductCache:
+    """
+    Bounded LRU of product rows. Each entry keeps two timestamps: one for the
+    catalog fields (long TTL) and one for stock (short TTL).
+    """
+    def __init__(self, capacity: int = PRODUCT_CACHE_SIZE, ttl: float = PRODUCT_CACHE_TTL,
+                 stock_ttl: float = PRODUCT_STOCK_TTL):
+        self.capacity = capacity
+        self.ttl = ttl
+        self.stock_ttl = stock_ttl
+        self._entries: "OrderedDict[int, list]" = OrderedDict()  # prod_id -> [row, loaded_at, stock_at]
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.stock_refreshes = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.invalidations = 0
+
+    def get(self, prod_id: int, need_stock: bool = True):
+        """
+        Return (row, stock_is_fresh), or (None, False) on a miss.
+        """
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(prod_id)
+            if entry is None:
+                self.misses += 1
+                return None, False
+            row, loaded_at, stock_at = entry
+            if now - loaded_at > self.ttl:
+                del self._entries[prod_id]
+                self.expirations += 1
+                self.misses += 1
+                return None, False
+            self._entries.move_to_end(prod_id)
+            stock_fresh = not need_stock or now - stock_at <= self.stock_ttl
+            if stock_fresh:
+                self.hits += 1
+            else:
+                self.stock_refreshes += 1
+            return dict(row), stock_fresh
+
+    def put(self, row: Dict) -> None:
+        now = time.monotonic()
+        with self._lock:
+            self._entries[row["product_id"]] = [dict(row), now, now]
+            self._entries.move_to_end(row["product_id"])
+            while len(self._entries) > self.capacity:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def set_stock(self, prod_id: int, stock: int) -> None:
+        with self._lock:
+            entry = self._entries.get(prod_id)
+            if entry is not None:
+                entry[0]["stock"] = stock
+                entry[2] = time.monotonic()
+
+    def invalidate(self, prod_id: int) -> None:
+        with self._lock:
+            if self._entries.pop(prod_id, None) is not None:
+                self.invalidations += 1
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> Dict:
+        with self._lock:
+            lookups = self.hits + self.misses + self.stock_refreshes
+            return {
+                "size": len(self._entries),
+                "capacity": self.capacity,
+                "hits": self.hits,
+                "misses": self.misses,
+                "stock_refreshes": self.stock_refreshes,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+                "invalidations": self.invalidations,
+                "hit_ratio": self.hits / lookups if lookups else 0.0,
+            }
+
+_shared_cache: Optional[ProductCache] = None
+_shared_lock = threading.Lock()
+
+def get_product_cache() -> ProductCache:
+    """
+    Process-wide product cache; kept in sync with every StockDAO change.
+    """
+    global _shared_cache
+    if _shared_cache is None:
+        with _shared_lock:
+            if _shared_cache is None:
+                cache = ProductCache()
+                add_stock_listener(cache.set_stock)
+                _shared_cache = cache
+    return _shared_cache
+
+class CachedProductDAO(ProductDAO):
+    """
+    ProductDAO with a read-through cache in front of get_product_by_id.
+    Writes go straight to the database and drop the cached row.
+    """
+    def __init__(self, cache: Optional[ProductCache] = None):
+        super().__init__()
+        self.cache = cache or get_product_cache()
+
+    def get_product_by_id(self, prod_id: int, fresh_stock: bool = True) -> Optional[Dict]:
+        row, stock_fresh = self.cache.get(prod_id, need_stock=fresh_stock)
+        if row is not None and stock_fresh:
+            return row
+        if row is not None:
+            # Catalog fields are still good, only re-read stock
+            resp = self._sb.table("products").select("product_id, stock").eq("product_id", prod_id).limit(1).execute()
+            if resp.data:
+                self.cache.set_stock(prod_id, resp.data[0]["stock"])
+                row["stock"] = resp.data[0]["stock"]
+                return row
+            self.cache.invalidate(prod_id)
+            return None
+        row = super().get_product_by_id(prod_id)
+        if row:
+            self.cache.put(row)
+        return row
+
+    def create_product(self, name: str, sku: str, price: float, stock: int = 0, category: str | None = None) -> Optional[Dict]:
+        row = super().create_product(name, sku, price, stock, category)
+        if row:
+            self.cache.put(row)
+        return row
+
+    def update_product(self, prod_id: int, fields: Dict) -> Optional[Dict]:
+        self.cache.invalidate(prod_id)
+        row = super().update_product(prod_id, fields)
+        if row:
+            self.cache.put(row)
+        return row
+
+    def delete_product(self, prod_id: int) -> Optional[Dict]:
+        self.cache.invalidate(prod_id)
+        return super().delete_product(prod_id)
+
+    def cache_stats(self) -> Dict:
+        return self.cache.stats()
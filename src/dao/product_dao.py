@@ -1,5 +1,14 @@
-from typing import Optional, List, Dict
+from itertools import islice
+from typing import Optional, List, Dict, Iterator
 from src.config import get_supabase
+from src.dao.pagination import iter_keyset, DEFAULT_PAGE_SIZE
+from src.dao.writes import insert_one, update_one, delete_one, UNIQUE_VIOLATION, FOREIGN_KEY_VIOLATION
+
+# Just what a replenishment job needs, not the whole row
+LOW_STOCK_COLUMNS = "product_id, name, sku, stock, category"
+
+class ProductDAOError(Exception):
+    pass
 
 class ProductDAO:
     def __init__(self):
@@ -7,18 +16,13 @@ class ProductDAO:
 
     def create_product(self, name: str, sku: str, price: float, stock: int = 0, category: str | None = None) -> Optional[Dict]:
         """
-        Insert a product and return the inserted row (two-step: insert then select by unique sku).
+        Insert a product and return the inserted row. A duplicate sku raises ProductDAOError.
         """
         payload = {"name": name, "sku": sku, "price": price, "stock": stock}
         if category is not None:
             payload["category"] = category
-
-        # Insert (no select chaining)
-        self._sb.table("products").insert(payload).execute()
-
-        # Fetch inserted row by unique column (sku)
-        resp = self._sb.table("products").select("*").eq("sku", sku).limit(1).execute()
-        return resp.data[0] if resp.data else None
+        return insert_one(self._sb, "products", payload, ProductDAOError,
+                          {UNIQUE_VIOLATION: f"SKU already exists: {sku}"})
 
     def get_product_by_id(self, prod_id: int) -> Optional[Dict]:
         resp = self._sb.table("products").select("*").eq("product_id", prod_id).limit(1).execute()
@@ -30,22 +34,57 @@ class ProductDAO:
 
     def update_product(self, prod_id: int, fields: Dict) -> Optional[Dict]:
         """
-        Update and then return the updated row (two-step).
+        Update and return the updated row, or None if there is no such product.
         """
-        self._sb.table("products").update(fields).eq("product_id", prod_id).execute()
-        resp = self._sb.table("products").select("*").eq("product_id", prod_id).limit(1).execute()
-        return resp.data[0] if resp.data else None
+        return update_one(self._sb, "products", "product_id", prod_id, fields, ProductDAOError,
+                          {UNIQUE_VIOLATION: "SKU already exists"})
 
     def delete_product(self, prod_id: int) -> Optional[Dict]:
-        # fetch row before delete (so we can return it)
-        resp_before = self._sb.table("products").select("*").eq("product_id", prod_id).limit(1).execute()
-        row = resp_before.data[0] if resp_before.data else None
-        self._sb.table("products").delete().eq("product_id", prod_id).execute()
-        return row
-
-    def list_products(self, limit: int = 100, category: str | None = None) -> List[Dict]:
-        q = self._sb.table("products").select("*").order("product_id", desc=False).limit(limit)
-        if category:
-            q = q.eq("category", category)
-        resp = q.execute()
-        return resp.data or []
\ No newline at end of file
+        return delete_one(self._sb, "products", "product_id", prod_id, ProductDAOError,
+                          {FOREIGN_KEY_VIOLATION: "Cannot delete product that appears in orders."})
+
+    def list_products(self, limit: int = 100, category: str | None = None, columns: str = "*") -> List[Dict]:
+        return list(islice(self.iter_products(category, columns, max(1, min(limit, DEFAULT_PAGE_SIZE))), limit))
+
+    def iter_products(self, category: str | None = None, columns: str = "*",
+                      page_size: int = DEFAULT_PAGE_SIZE, compact: str | None = None) -> Iterator:
+        """
+        Stream all products (optionally one category) in product_id order, page by page.
+        compact="records"/"columns" returns compact rows (see src.dao.compact).
+        """
+        filters = (lambda q: q.eq("category", category)) if category else None
+        return iter_keyset(self._sb, "products", "product_id", columns, page_size, filters, compact=compact)
+
+    def iter_low_stock(self, threshold: int, category: str | None = None, columns: str = LOW_STOCK_COLUMNS,
+                       page_size: int = DEFAULT_PAGE_SIZE, compact: str | None = None) -> Iterator:
+        """
+        Stream products with stock <= threshold; the filter runs on the server.
+        """
+        def filters(q):
+            q = q.lte("stock", threshold)
+            return q.eq("category", category) if category else q
+        return iter_keyset(self._sb, "products", "product_id", columns, page_size, filters, compact=compact)
+
+    def get_products_by_ids(self, prod_ids: List[int], columns: str = "*") -> List[Dict]:
+        if not prod_ids:
+            return []
+        resp = self._sb.table("products").select(columns).in_("product_id", list(prod_ids)).execute()
+        return resp.data or []
+
+    def existing_skus(self, skus: List[str]) -> set:
+        if not skus:
+            return set()
+        resp = self._sb.table("products").select("sku").in_("sku", list(skus)).execute()
+        return {row["sku"] for row in (resp.data or [])}
+
+    def bulk_create_products(self, rows: List[Dict], upsert: bool = False) -> List[Dict]:
+        """
+        Insert many products in one request; with upsert, rows with an existing sku are updated.
+        """
+        if not rows:
+            return []
+        if upsert:
+            resp = self._sb.table("products").upsert(rows, on_conflict="sku").execute()
+        else:
+            resp = self._sb.table("products").insert(rows).execute()
+        return resp.data or []
@@ -0,0 +1,73 @@
+import os
+import random
+import time
+from typing import Awaitable, Callable, TypeVar
+
+T = TypeVar("T")
+
+# Attempts (first try included) and backoff for transient database/HTTP failures
+DB_RETRY_ATTEMPTS = int(os.getenv("DB_RETRY_ATTEMPTS", "4"))
+DB_RETRY_BACKOFF = float(os.getenv("DB_RETRY_BACKOFF", "0.1"))
+DB_RETRY_MAX_BACKOFF = float(os.getenv("DB_RETRY_MAX_BACKOFF", "2.0"))
+
+# PostgREST error codes worth another try: HTTP statuses from gateways (non-JSON
+# bodies), Postgres serialization/deadlock/connection errors, PostgREST's own
+# "can't reach the database" errors.
+TRANSIENT_CODES = {
+    "408", "425", "429", "500", "502", "503", "504",
+    "40001", "40P01", "57P01", "57P03", "08000", "08003", "08006", "53300",
+    "PGRST000", "PGRST001", "PGRST002",
+}
+# Transport errors raised before the request reached the server
+_NOT_SENT = ("ConnectError", "ConnectTimeout", "PoolTimeout")
+
+def retry_backoff(attempt: int) -> float:
+    """
+    Seconds to wait before retry number attempt: exponential with full jitter.
+    """
+    return random.uniform(0, min(DB_RETRY_MAX_BACKOFF, DB_RETRY_BACKOFF * (2 ** attempt)))
+
+def is_transient(exc: BaseException, idempotent: bool = True) -> bool:
+    """
+    True if exc is worth retrying. A non-idempotent call (a plain insert) is only
+    retried when the request provably never left this process.
+    """
+    name = type(exc).__name__
+    if name in _NOT_SENT:
+        return True
+    if not idempotent:
+        return False
+    import httpx  # already loaded whenever a request has been made
+    if isinstance(exc, httpx.TransportError):
+        return True
+    code = getattr(exc, "code", None)
+    return code is not None and str(code) in TRANSIENT_CODES
+
+def with_retries(fn: Callable[..., T], *args, idempotent: bool = True, attempts: int = DB_RETRY_ATTEMPTS,
+                 **kwargs) -> T:
+    """
+    Call fn(*args, **kwargs), retrying transient failures with jittered backoff.
+    Only pass calls that are safe to repeat (reads, conditional updates) unless
+    idempotent=False is given.
+    """
+    for attempt in range(attempts):
+        try:
+            return fn(*args, **kwargs)
+        except Exception as e:
+            if attempt + 1 >= attempts or not is_transient(e, idempotent):
+                raise
+            time.sleep(retry_backoff(attempt + 1))
+
+async def with_retries_async(fn: Callable[..., Awaitable[T]], *args, idempotent: bool = True,
+                             attempts: int = DB_RETRY_ATTEMPTS, **kwargs) -> T:
+    """
+    with_retries for coroutine functions: fn(*args, **kwargs) is awaited afresh on each attempt.
+    """
+    import asyncio
+    for attempt in range(attempts):
+        try:
+            return await fn(*args, **kwargs)
+        except Exception as e:
+            if attempt + 1 >= attempts or not is_transient(e, idempotent):
+                raise
+            await asyncio.sleep(retry_backoff(attempt + 1))
@@ -0,0 +1,107 @@
+from typing import Dict, List, Optional, Tuple
+from src.dao.local_store import LocalStore, get_local_store
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS revenue_daily (
+    day TEXT PRIMARY KEY,
+    revenue REAL NOT NULL DEFAULT 0,
+    orders INTEGER NOT NULL DEFAULT 0
+);
+CREATE TABLE IF NOT EXISTS revenue_daily_category (
+    day TEXT NOT NULL,
+    category TEXT NOT NULL,
+    revenue REAL NOT NULL DEFAULT 0,
+    units INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY (day, category)
+);
+-- What each counted order contributed, so reversing it is exact and idempotent
+CREATE TABLE IF NOT EXISTS revenue_orders (
+    order_id INTEGER PRIMARY KEY,
+    day TEXT NOT NULL,
+    revenue REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS revenue_order_lines (
+    order_id INTEGER NOT NULL,
+    category TEXT NOT NULL,
+    revenue REAL NOT NULL,
+    units INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS revenue_order_lines_order ON revenue_order_lines (order_id);
+CREATE TABLE IF NOT EXISTS rollup_meta (
+    key TEXT PRIMARY KEY,
+    value TEXT
+);
+"""
+
+class RevenueRollupDAO:
+    """
+    Daily revenue totals (overall and per category) kept in the local store.
+    """
+    def __init__(self, store: Optional[LocalStore] = None):
+        self.store = store or get_local_store()
+        self.store.ensure_schema(SCHEMA)
+
+    def apply_order(self, order_id: int, day: str, revenue: float, lines: List[Tuple[str, float, int]]) -> bool:
+        """
+        Count an order's revenue on its day. Returns False if it was already counted.
+        lines are (category, revenue, units).
+        """
+        with self.store.transaction() as conn:
+            if conn.execute("SELECT 1 FROM revenue_orders WHERE order_id = ?", (order_id,)).fetchone():
+                return False
+            conn.execute("INSERT INTO revenue_orders (order_id, day, revenue) VALUES (?, ?, ?)", (order_id, day, revenue))
+            conn.execute("""INSERT INTO revenue_daily (day, revenue, orders) VALUES (?, ?, 1)
+                            ON CONFLICT(day) DO UPDATE SET revenue = revenue + excluded.revenue, orders = orders + 1""",
+                         (day, revenue))
+            for category, line_revenue, units in lines:
+                conn.execute("INSERT INTO revenue_order_lines (order_id, category, revenue, units) VALUES (?, ?, ?, ?)",
+                             (order_id, category, line_revenue, units))
+                conn.execute("""INSERT INTO revenue_daily_category (day, category, revenue, units) VALUES (?, ?, ?, ?)
+                                ON CONFLICT(day, category) DO UPDATE SET revenue = revenue + excluded.revenue,
+                                                                         units = units + excluded.units""",
+                             (day, category, line_revenue, units))
+            return True
+
+    def reverse_order(self, order_id: int) -> bool:
+        """
+        Take a counted order back out (refund). Returns False if it wasn't counted.
+        """
+        with self.store.transaction() as conn:
+            row = conn.execute("SELECT day, revenue FROM revenue_orders WHERE order_id = ?", (order_id,)).fetchone()
+            if not row:
+                return False
+            day = row["day"]
+            conn.execute("UPDATE revenue_daily SET revenue = revenue - ?, orders = orders - 1 WHERE day = ?",
+                         (row["revenue"], day))
+            for line in conn.execute("SELECT category, revenue, units FROM revenue_order_lines WHERE order_id = ?",
+                                     (order_id,)).fetchall():
+                conn.execute("""UPDATE revenue_daily_category SET revenue = revenue - ?, units = units - ?
+                                WHERE day = ? AND category = ?""", (line["revenue"], line["units"], day, line["category"]))
+            conn.execute("DELETE FROM revenue_order_lines WHERE order_id = ?", (order_id,))
+            conn.execute("DELETE FROM revenue_orders WHERE order_id = ?", (order_id,))
+            return True
+
+    def clear(self) -> None:
+        with self.store.transaction() as conn:
+            for table in ("revenue_daily", "revenue_daily_category", "revenue_orders", "revenue_order_lines"):
+                conn.execute(f"DELETE FROM {table}")
+
+    def daily(self, start_day: str, end_day: str) -> List[Dict]:
+        """
+        Rows for days in [start_day, end_day] (ISO dates, inclusive).
+        """
+        return self.store.query("SELECT day, revenue, orders FROM revenue_daily WHERE day >= ? AND day <= ? ORDER BY day",
+                                (start_day, end_day))
+
+    def by_category(self, start_day: str, end_day: str) -> List[Dict]:
+        return self.store.query("""SELECT category, SUM(revenue) AS revenue, SUM(units) AS units
+                                   FROM revenue_daily_category WHERE day >= ? AND day <= ?
+                                   GROUP BY category ORDER BY revenue DESC""", (start_day, end_day))
+
+    def get_meta(self, key: str) -> Optional[str]:
+        row = self.store.query_one("SELECT value FROM rollup_meta WHERE key = ?", (key,))
+        return row["value"] if row else None
+
+    def set_meta(self, key: str, value: str) -> None:
+        self.store.execute("INSERT INTO rollup_meta (key, value) VALUES (?, ?) "
+                           "ON CONFLICT(key) DO UPDATE SET value = excluded.value", (key, value))
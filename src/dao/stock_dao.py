@@ -0,0 +1,247 @@
+import logging
+import os
+import random
+import threading
+import time
+from collections import defaultdict
+from typing import Callable, Dict, List, Optional
+from src.config import get_supabase
+
+logger = logging.getLogger(__name__)
+
+# Use the reserve_stock/release_stock functions from sql/stock_functions.sql
+# (one server-side call per order) instead of per-line conditional updates.
+# On by default; until that migration is applied, the first call finds the
+# function missing and the DAO falls back to conditional updates.
+STOCK_USE_RPC = os.getenv("STOCK_USE_RPC", "1") == "1"
+# "No such function" from PostgREST's schema cache / from Postgres
+RPC_MISSING_CODES = {"PGRST202", "42883"}
+# Compare-and-set attempts per stock change, with jittered backoff between them
+STOCK_CAS_RETRIES = int(os.getenv("STOCK_CAS_RETRIES", "10"))
+STOCK_CAS_BACKOFF = float(os.getenv("STOCK_CAS_BACKOFF", "0.005"))
+
+def cas_backoff(attempt: int) -> float:
+    """
+    Seconds to wait before compare-and-set retry number attempt (full jitter, capped at 0.25s).
+    """
+    return random.uniform(0, min(0.25, STOCK_CAS_BACKOFF * (2 ** attempt)))
+
+class StockDAOError(Exception):
+    pass
+
+class InsufficientStockError(StockDAOError):
+    pass
+
+class StockRollbackError(StockDAOError):
+    """
+    A failed reserve could not give back everything it had taken.
+    unreleased is {product_id: quantity} still held and needing a manual release.
+    """
+    def __init__(self, message: str, unreleased: Dict[int, int]):
+        super().__init__(message)
+        self.unreleased = unreleased
+
+def rollback_failed(cause: BaseException, unreleased: Dict[int, int]) -> StockRollbackError:
+    logger.error("reserve failed (%s) and rollback left stock taken: %s", cause, unreleased)
+    ids = ", ".join(str(pid) for pid in sorted(unreleased))
+    return StockRollbackError(f"{cause}; stock for product id(s) {ids} was not released", unreleased)
+
+# Called as listener(product_id, new_stock) after every committed stock change
+_stock_listeners: List[Callable[[int, int], None]] = []
+
+def add_stock_listener(listener: Callable[[int, int], None]) -> None:
+    if listener not in _stock_listeners:
+        _stock_listeners.append(listener)
+
+def remove_stock_listener(listener: Callable[[int, int], None]) -> None:
+    if listener in _stock_listeners:
+        _stock_listeners.remove(listener)
+
+def _notify(changes: Dict[int, int]) -> None:
+    for prod_id, stock in changes.items():
+        for listener in list(_stock_listeners):
+            listener(prod_id, stock)
+
+_rpc_missing_logged = False
+
+def rpc_missing(exc: BaseException) -> bool:
+    """
+    True if exc says the stock functions aren't installed; logs it the first time.
+    """
+    global _rpc_missing_logged
+    if str(getattr(exc, "code", "")) not in RPC_MISSING_CODES:
+        return False
+    if not _rpc_missing_logged:
+        _rpc_missing_logged = True
+        logger.warning("stock functions from sql/stock_functions.sql are not installed; "
+                       "using per-line conditional updates (%s)", exc)
+    return True
+
+def aggregate_items(items: List[Dict]) -> Dict[int, int]:
+    """
+    Sum quantities per product. Accepts order lines keyed by prod_id or product_id.
+    """
+    totals: Dict[int, int] = defaultdict(int)
+    for item in items:
+        prod_id = item["prod_id"] if "prod_id" in item else item["product_id"]
+        quantity = item["quantity"]
+        if quantity <= 0:
+            raise StockDAOError(f"Quantity must be positive for product id {prod_id}")
+        totals[prod_id] += quantity
+    return dict(totals)
+
+class StockDAO:
+    """
+    Atomic stock changes. Every decrement is conditional on the stock the
+    server still holds, so concurrent checkouts can never oversell.
+    """
+    def __init__(self, use_rpc: bool = STOCK_USE_RPC, max_retries: int = STOCK_CAS_RETRIES):
+        self._sb = get_supabase()
+        self.use_rpc = use_rpc
+        self.max_retries = max_retries
+
+    def get_stock(self, prod_id: int) -> int:
+        resp = self._sb.table("products").select("product_id, stock").eq("product_id", prod_id).limit(1).execute()
+        if not resp.data:
+            raise StockDAOError(f"Product with id {prod_id} not found")
+        return resp.data[0]["stock"] or 0
+
+    def adjust_stock(self, prod_id: int, delta: int) -> int:
+        """
+        Add delta (may be negative) to a product's stock and return the new stock.
+        Uses compare-and-set on the current value, retrying if another writer got there first.
+        """
+        for attempt in range(self.max_retries):
+            if attempt:
+                time.sleep(cas_backoff(attempt))
+            resp = self._sb.table("products").select("product_id, stock").eq("product_id", prod_id).limit(1).execute()
+            if not resp.data:
+                raise StockDAOError(f"Product with id {prod_id} not found")
+            current = resp.data[0]["stock"]
+            new_stock = (current or 0) + delta
+            if new_stock < 0:
+                raise InsufficientStockError(f"Not enough stock for product id {prod_id}")
+            q = self._sb.table("products").update({"stock": new_stock}).eq("product_id", prod_id)
+            q = q.is_("stock", "null") if current is None else q.eq("stock", current)
+            if q.execute().data:
+                _notify({prod_id: new_stock})
+                return new_stock
+        raise StockDAOError(f"Stock for product id {prod_id} changed too often, try again")
+
+    def reserve(self, items: List[Dict]) -> Dict[int, int]:
+        """
+        Take stock for every order line, all or nothing. Returns {product_id: new_stock}.
+        """
+        totals = aggregate_items(items)
+        if self.use_rpc:
+            changes = self._call_rpc("reserve_stock", totals)
+            if changes is not None:
+                return changes
+
+        applied: Dict[int, int] = {}
+        try:
+            # Sorted so two orders touching the same products contend in the same order
+            for prod_id in sorted(totals):
+                applied[prod_id] = self.adjust_stock(prod_id, -totals[prod_id])
+        except Exception as e:
+            unreleased = {}
+            for prod_id in applied:
+                try:
+                    self.adjust_stock(prod_id, totals[prod_id])
+                except Exception:
+                    unreleased[prod_id] = totals[prod_id]
+            if unreleased:
+                raise rollback_failed(e, unreleased) from e
+            raise
+        return applied
+
+    def release(self, items: List[Dict]) -> Dict[int, int]:
+        """
+        Put stock back for every order line. Returns {product_id: new_stock}.
+        """
+        totals = aggregate_items(items)
+        if self.use_rpc:
+            changes = self._call_rpc("release_stock", totals)
+            if changes is not None:
+                return changes
+        return {prod_id: self.adjust_stock(prod_id, totals[prod_id]) for prod_id in sorted(totals)}
+
+    def _call_rpc(self, fn: str, totals: Dict[int, int]) -> Optional[Dict[int, int]]:
+        """
+        None if the function isn't installed (use_rpc is then turned off for this DAO).
+        """
+        payload = [{"product_id": pid, "quantity": qty} for pid, qty in totals.items()]
+        try:
+            resp = self._sb.rpc(fn, {"p_items": payload}).execute()
+        except Exception as e:
+            if rpc_missing(e):
+                self.use_rpc = False
+                return None
+            if "Not enough stock" in str(e):
+                raise InsufficientStockError(str(e))
+            raise StockDAOError(str(e))
+        changes = {row["product_id"]: row["stock"] for row in (resp.data or [])}
+        _notify(changes)
+        return changes
+
+class InMemoryStockDAO:
+    """
+    Local stand-in for StockDAO with the same reserve/release semantics,
+    guarded by one lock per product. Useful offline and in tests.
+    """
+    def __init__(self, stock: Dict[int, int] | None = None):
+        self._stock: Dict[int, int] = dict(stock or {})
+        self._locks: Dict[int, threading.Lock] = defaultdict(threading.Lock)
+        self._locks_guard = threading.Lock()
+
+    def _lock(self, prod_id: int) -> threading.Lock:
+        with self._locks_guard:
+            return self._locks[prod_id]
+
+    def set_stock(self, prod_id: int, stock: int) -> None:
+        with self._lock(prod_id):
+            self._stock[prod_id] = stock
+        _notify({prod_id: stock})
+
+    def get_stock(self, prod_id: int) -> int:
+        if prod_id not in self._stock:
+            raise StockDAOError(f"Product with id {prod_id} not found")
+        return self._stock[prod_id]
+
+    def adjust_stock(self, prod_id: int, delta: int) -> int:
+        with self._lock(prod_id):
+            new_stock = self._apply(prod_id, delta)
+        _notify({prod_id: new_stock})
+        return new_stock
+
+    def _apply(self, prod_id: int, delta: int) -> int:
+        if prod_id not in self._stock:
+            raise StockDAOError(f"Product with id {prod_id} not found")
+        new_stock = self._stock[prod_id] + delta
+        if new_stock < 0:
+            raise InsufficientStockError(f"Not enough stock for product id {prod_id}")
+        self._stock[prod_id] = new_stock
+        return new_stock
+
+    def reserve(self, items: List[Dict]) -> Dict[int, int]:
+        totals = aggregate_items(items)
+        locks = [self._lock(pid) for pid in sorted(totals)]
+        for lock in locks:
+            lock.acquire()
+        try:
+            # Check every line before touching anything, so failure needs no rollback
+            for prod_id, qty in totals.items():
+                if prod_id not in self._stock:
+                    raise StockDAOError(f"Product with id {prod_id} not found")
+                if self._stock[prod_id] < qty:
+                    raise InsufficientStockError(f"Not enough stock for product id {prod_id}")
+            changes = {pid: self._apply(pid, -qty) for pid, qty in totals.items()}
+        finally:
+            for lock in reversed(locks):
+                lock.release()
+        _notify(changes)
+        return changes
+
+    def release(self, items: List[Dict]) -> Dict[int, int]:
+        totals = aggregate_items(items)
+        return {pid: self.adjust_stock(pid, qty) for pid, qty in sorted(totals.items())}
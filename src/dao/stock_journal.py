@@ -0,0 +1,340 @@
+import atexit
+import glob
+import logging
+import os
+import threading
+import time
+from typing import Dict, List, Optional
+from src.dao.stock_dao import StockDAO, StockDAOError, InsufficientStockError, aggregate_items
+
+try:
+    import fcntl
+except ImportError:  # not on Windows; journals are then not protected against a second process
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+# Buffer stock increments (restocks, cancellations) and write them in coalesced batches
+STOCK_WRITE_BEHIND = os.getenv("STOCK_WRITE_BEHIND", "0") == "1"
+# Append-only journal so buffered deltas survive a crash (empty keeps them in memory only)
+STOCK_JOURNAL_PATH = os.getenv("STOCK_JOURNAL_PATH", "stock_journal.log")
+# Flush when this many increments are buffered, or when the oldest is this many seconds old
+STOCK_FLUSH_MAX_PENDING = int(os.getenv("STOCK_FLUSH_MAX_PENDING", "500"))
+STOCK_FLUSH_INTERVAL = float(os.getenv("STOCK_FLUSH_INTERVAL", "2"))
+
+class StockJournalError(Exception):
+    pass
+
+def _read_journal(path: str) -> Dict[int, int]:
+    """
+    Net unflushed delta per product: "A pid delta" lines add, "F pid delta" lines subtract.
+    A torn last line (crash mid-write) is ignored.
+    """
+    net: Dict[int, int] = {}
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            parts = line.split()
+            if len(parts) != 3 or parts[0] not in ("A", "F"):
+                continue
+            try:
+                pid, delta = int(parts[1]), int(parts[2])
+            except ValueError:
+                continue
+            net[pid] = net.get(pid, 0) + (delta if parts[0] == "A" else -delta)
+    return {pid: d for pid, d in net.items() if d > 0}
+
+class StockJournal:
+    """
+    Write-behind buffer for stock increments.
+
+    add() coalesces deltas per product in memory and appends them to the
+    journal file; flush() applies one aggregated delta per product (a single
+    release_stock call in RPC mode) and records what was applied. Flushes
+    happen when max_pending increments are buffered, every interval seconds
+    on a background thread, on close() and at process exit.
+
+    Only increments are buffered: decrements must check the stock the server
+    holds, so they stay synchronous (see BufferedStockDAO). Delivery is
+    at-least-once: a crash between a product's database write and its "F"
+    line replays that product's delta on restart.
+    """
+    def __init__(self, stock_dao=None, path: Optional[str] = STOCK_JOURNAL_PATH,
+                 max_pending: int = STOCK_FLUSH_MAX_PENDING, interval: float = STOCK_FLUSH_INTERVAL):
+        self.stock_dao = stock_dao or StockDAO()
+        self.max_pending = max_pending
+        self.interval = interval
+        self._pending: Dict[int, int] = {}
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._buffered = 0
+        self._oldest: Optional[float] = None
+        self._timer: Optional[threading.Thread] = None
+        self._closed = threading.Event()
+        self.stats = {"increments": 0, "flushes": 0, "products_written": 0, "writes_saved": 0,
+                      "flush_errors": 0, "recovered": 0}
+        self._file = None
+        self.path = self._open(path) if path else None
+        self._per_process = bool(path) and self.path != path
+
+    # journal file
+    def _open(self, path: str) -> str:
+        chosen = path
+        self._file = open(path, "a", encoding="utf-8", buffering=1)
+        if not self._try_lock(self._file):
+            # Another live process owns the main journal; keep a per-process one next to it
+            self._file.close()
+            chosen = f"{path}.{os.getpid()}"
+            self._file = open(chosen, "a", encoding="utf-8", buffering=1)
+            self._try_lock(self._file)
+        recovered = _read_journal(chosen)
+        if chosen == path:
+            # Journals left by dead per-process writers are adopted by the owner of the main one
+            for orphan in glob.glob(f"{path}.*"):
+                with open(orphan, "a", encoding="utf-8") as f:
+                    if not self._try_lock(f):
+                        continue
+                    for pid, delta in _read_journal(orphan).items():
+                        recovered[pid] = recovered.get(pid, 0) + delta
+                os.remove(orphan)
+        self._pending = recovered
+        self.stats["recovered"] = len(recovered)
+        self._rewrite()
+        if recovered:
+            logger.info("stock journal %s: %d product delta(s) recovered", chosen, len(recovered))
+        return chosen
+
+    @staticmethod
+    def _try_lock(f) -> bool:
+        if fcntl is None:
+            return True
+        try:
+            fcntl.flock(f.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+            return True
+        except OSError:
+            return False
+
+    def _append(self, lines: List[str]) -> None:
+        if self._file is not None:
+            self._file.write("".join(lines))
+
+    def _rewrite(self) -> None:
+        """
+        Compact the journal to just the pending deltas (caller holds _lock or is initializing).
+        """
+        if self._file is None:
+            return
+        self._file.seek(0)
+        self._file.truncate()
+        self._append([f"A {pid} {delta}\n" for pid, delta in sorted(self._pending.items())])
+
+    # buffering
+    def add(self, prod_id: int, delta: int) -> None:
+        self.add_many({prod_id: delta})
+
+    def add_many(self, deltas: Dict[int, int]) -> None:
+        if any(d <= 0 for d in deltas.values()):
+            raise StockJournalError("Only positive stock deltas can be buffered")
+        with self._lock:
+            if self._closed.is_set():
+                raise StockJournalError("Stock journal is closed")
+            self._append([f"A {pid} {delta}\n" for pid, delta in deltas.items()])
+            for pid, delta in deltas.items():
+                self._pending[pid] = self._pending.get(pid, 0) + delta
+            self._buffered += len(deltas)
+            self.stats["increments"] += len(deltas)
+            if self._oldest is None:
+                self._oldest = time.monotonic()
+            full = self._buffered >= self.max_pending
+        self._start_timer()
+        if full:
+            self.flush()
+
+    def pending(self, prod_id: Optional[int] = None):
+        """
+        Buffered delta for one product, or a copy of all of them.
+        """
+        with self._lock:
+            return self._pending.get(prod_id, 0) if prod_id is not None else dict(self._pending)
+
+    def project(self, row: Optional[Dict]) -> Optional[Dict]:
+        """
+        row with its stock as it will be once buffered deltas are flushed.
+        """
+        if not row or "stock" not in row:
+            return row
+        delta = self.pending(row.get("product_id"))
+        if not delta:
+            return row
+        row = dict(row)
+        row["stock"] = (row["stock"] or 0) + delta
+        return row
+
+    # flushing
+    def flush(self, prod_ids: Optional[List[int]] = None) -> Dict[int, int]:
+        """
+        Write buffered deltas (all, or just prod_ids) to the database.
+        Returns {product_id: delta applied}; failed products stay buffered.
+        """
+        with self._flush_lock:
+            with self._lock:
+                wanted = self._pending if prod_ids is None else {p: self._pending[p] for p in prod_ids if p in self._pending}
+                batch = dict(wanted)
+                for pid in batch:
+                    del self._pending[pid]
+                coalesced = self._buffered
+                if not self._pending:
+                    self._buffered, self._oldest = 0, None
+            if not batch:
+                return {}
+            applied, failed = self._apply(batch)
+            with self._lock:
+                self._append([f"F {pid} {delta}\n" for pid, delta in applied.items()])
+                for pid, delta in failed.items():
+                    self._pending[pid] = self._pending.get(pid, 0) + delta
+                    if self._oldest is None:
+                        self._oldest = time.monotonic()
+                self.stats["flushes"] += 1
+                self.stats["products_written"] += len(applied)
+                if prod_ids is None:
+                    self.stats["writes_saved"] += max(0, coalesced - len(batch))
+                if failed:
+                    self.stats["flush_errors"] += 1
+                elif not self._pending:
+                    self._rewrite()
+            return applied
+
+    def _apply(self, batch: Dict[int, int]):
+        if getattr(self.stock_dao, "use_rpc", False):
+            try:
+                self.stock_dao.release([{"product_id": pid, "quantity": d} for pid, d in sorted(batch.items())])
+                return batch, {}
+            except StockDAOError as e:
+                logger.warning("stock journal flush failed, will retry: %s", e)
+                return {}, batch
+        applied, failed = {}, {}
+        for pid in sorted(batch):
+            try:
+                self.stock_dao.adjust_stock(pid, batch[pid])
+                applied[pid] = batch[pid]
+            except Exception as e:
+                logger.warning("stock journal flush of product %s failed, will retry: %s", pid, e)
+                failed[pid] = batch[pid]
+        return applied, failed
+
+    def _start_timer(self) -> None:
+        if self._timer is None and self.interval > 0:
+            with self._lock:
+                if self._timer is None:
+                    self._timer = threading.Thread(target=self._run_timer, name="stock-journal", daemon=True)
+                    self._timer.start()
+
+    def _run_timer(self) -> None:
+        while not self._closed.wait(self.interval / 2):
+            oldest = self._oldest
+            if oldest is not None and time.monotonic() - oldest >= self.interval:
+                try:
+                    self.flush()
+                except Exception:
+                    logger.exception("stock journal background flush failed")
+
+    def close(self) -> None:
+        if self._closed.is_set():
+            return
+        try:
+            self.flush()
+        finally:
+            self._closed.set()
+            if self.path:
+                self._file.close()
+                if self._per_process and not self._pending:
+                    os.remove(self.path)
+
+    def journal_stats(self) -> Dict:
+        with self._lock:
+            return {**self.stats, "pending_products": len(self._pending),
+                    "pending_units": sum(self._pending.values()), "path": self.path}
+
+class BufferedStockDAO:
+    """
+    StockDAO with increments routed through a StockJournal. Reservations and
+    other decrements go to the database straight away; if one fails for lack
+    of stock while increments for its products are still buffered, those are
+    flushed and the decrement is retried once.
+    """
+    buffered = True
+
+    def __init__(self, stock_dao=None, journal: Optional[StockJournal] = None):
+        self.stock_dao = stock_dao or StockDAO()
+        self.journal = journal or get_stock_journal()
+
+    def get_stock(self, prod_id: int) -> int:
+        return self.stock_dao.get_stock(prod_id) + self.journal.pending(prod_id)
+
+    def adjust_stock(self, prod_id: int, delta: int) -> Optional[int]:
+        """
+        Returns the new stock, or None for a buffered increment (not known until flushed).
+        """
+        if delta > 0:
+            self.journal.add(prod_id, delta)
+            return None
+        self.journal.flush([prod_id])
+        return self.stock_dao.adjust_stock(prod_id, delta)
+
+    def reserve(self, items: List[Dict]) -> Dict[int, int]:
+        try:
+            return self.stock_dao.reserve(items)
+        except InsufficientStockError:
+            buffered = [pid for pid in aggregate_items(items) if self.journal.pending(pid)]
+            if not buffered:
+                raise
+            self.journal.flush(buffered)
+            return self.stock_dao.reserve(items)
+
+    def release(self, items: List[Dict]) -> Dict[int, int]:
+        """
+        Buffer the stock coming back; returns {product_id: delta buffered}.
+        """
+        totals = aggregate_items(items)
+        if totals:
+            self.journal.add_many(totals)
+        return totals
+
+_shared_journal: Optional[StockJournal] = None
+_shared_lock = threading.Lock()
+
+def get_stock_journal() -> StockJournal:
+    """
+    Process-wide journal, flushed and closed at exit.
+    """
+    global _shared_journal
+    if _shared_journal is None:
+        with _shared_lock:
+            if _shared_journal is None:
+                _shared_journal = StockJournal()
+                atexit.register(_shared_journal.close)
+    return _shared_journal
+
+def close_stock_journal() -> None:
+    """
+    Flush and close the process-wide journal if one was opened. Processes that
+    leave with os._exit (forked workers) skip atexit and must call this first.
+    """
+    global _shared_journal
+    with _shared_lock:
+        journal, _shared_journal = _shared_journal, None
+    if journal is not None:
+        journal.close()
+
+def _forget_in_child() -> None:
+    # A forked child must not flush (or journal into) the parent's buffer; it starts its own
+    global _shared_journal
+    _shared_journal = None
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_forget_in_child)
+
+def make_stock_dao():
+    """
+    The stock DAO services should use: buffered when STOCK_WRITE_BEHIND=1.
+    """
+    return BufferedStockDAO() if STOCK_WRITE_BEHIND else StockDAO()
@@ -0,0 +1,87 @@
+from typing import Dict, Optional, Type
+
+# Postgres integrity errors, as reported in PostgREST's error "code"
+UNIQUE_VIOLATION = "23505"
+FOREIGN_KEY_VIOLATION = "23503"
+NOT_NULL_VIOLATION = "23502"
+CHECK_VIOLATION = "23514"
+
+def error_code(exc: BaseException) -> Optional[str]:
+    code = getattr(exc, "code", None)
+    return str(code) if code is not None else None
+
+def map_integrity_error(exc: Exception, error_cls: Type[Exception], messages: Optional[Dict[str, str]] = None):
+    """
+    Turn a constraint violation into the DAO's own error (with a friendly message
+    from messages when one is given for its code). Anything else is returned
+    unchanged so transient failures stay recognisable to retry logic.
+    """
+    code = error_code(exc)
+    if code is None or not code.startswith("23"):
+        return exc
+    message = (messages or {}).get(code) or getattr(exc, "message", None) or str(exc)
+    return error_cls(message)
+
+# Every helper below is one request: PostgREST returns the written rows
+# (return=representation), so nothing is read back with a second select.
+
+def insert_one(sb, table: str, payload: Dict, error_cls: Type[Exception],
+               messages: Optional[Dict[str, str]] = None) -> Dict:
+    """
+    Insert one row and return it as stored (ids, defaults, created_at).
+    """
+    try:
+        resp = sb.table(table).insert(payload).execute()
+    except Exception as e:
+        raise map_integrity_error(e, error_cls, messages)
+    if not resp.data:
+        raise error_cls(f"Failed to insert into {table}")
+    return resp.data[0]
+
+def update_one(sb, table: str, key: str, value, fields: Dict, error_cls: Type[Exception],
+               messages: Optional[Dict[str, str]] = None) -> Optional[Dict]:
+    """
+    Update the row with key = value and return it, or None if there is no such row.
+    """
+    try:
+        resp = sb.table(table).update(fields).eq(key, value).execute()
+    except Exception as e:
+        raise map_integrity_error(e, error_cls, messages)
+    return resp.data[0] if resp.data else None
+
+def delete_one(sb, table: str, key: str, value, error_cls: Type[Exception],
+               messages: Optional[Dict[str, str]] = None) -> Optional[Dict]:
+    """
+    Delete the row with key = value and return what was deleted, or None if there was none.
+    """
+    try:
+        resp = sb.table(table).delete().eq(key, value).execute()
+    except Exception as e:
+        raise map_integrity_error(e, error_cls, messages)
+    return resp.data[0] if resp.data else None
+
+# The same helpers for the async client (src.dao.async_dao)
+
+async def insert_one_async(sb, table: str, payload: Dict, error_cls: Type[Exception],
+                           messages: Optional[Dict[str, str]] = None) -> Dict:
+    """
+    insert_one for the async client.
+    """
+    try:
+        resp = await sb.table(table).insert(payload).execute()
+    except Exception as e:
+        raise map_integrity_error(e, error_cls, messages)
+    if not resp.data:
+        raise error_cls(f"Failed to insert into {table}")
+    return resp.data[0]
+
+async def update_one_async(sb, table: str, key: str, value, fields: Dict, error_cls: Type[Exception],
+                           messages: Optional[Dict[str, str]] = None) -> Optional[Dict]:
+    """
+    update_one for the async client.
+    """
+    try:
+        resp = await sb.table(table).update(fields).eq(key, value).execute()
+    except Exception as e:
+        raise map_integrity_error(e, error_cls, messages)
+    return resp.data[0] if resp.data else None
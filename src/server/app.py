@@ -0,0 +1,370 @@
+import json
+import logging
+import os
+import re
+import signal
+import socket
+import threading
+from datetime import date
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Callable, Dict, List, Optional, Tuple
+from urllib.parse import urlparse, parse_qs
+from src.dao import instrumentation
+
+logger = logging.getLogger(__name__)
+
+# Largest request body accepted (bytes)
+SERVER_MAX_BODY = int(os.getenv("SERVER_MAX_BODY", str(1 << 20)))
+
+class HTTPError(Exception):
+    def __init__(self, status: int, message: str):
+        super().__init__(message)
+        self.status = status
+
+class Services:
+    """
+    Services built once per worker process and reused by every request,
+    so the pooled client and the product cache stay warm.
+    """
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._built: Dict[str, object] = {}
+
+    def _get(self, name: str, factory: Callable):
+        if name not in self._built:
+            with self._lock:
+                if name not in self._built:
+                    self._built[name] = factory()
+        return self._built[name]
+
+    @property
+    def products(self):
+        from src.services.product_service import ProductService
+        return self._get("products", ProductService)
+
+    @property
+    def customers(self):
+        from src.services.customer_service import CustomerService
+        return self._get("customers", CustomerService)
+
+    @property
+    def orders(self):
+        from src.services.order_service import OrderService
+        return self._get("orders", OrderService)
+
+    @property
+    def payments(self):
+        from src.services.payment_service import PaymentService
+        return self._get("payments", PaymentService)
+
+    @property
+    def reports(self):
+        from src.services.reporting_serivce import ReportingService
+        return self._get("reports", ReportingService)
+
+    @property
+    def revenue(self):
+        from src.services.revenue_service import RevenueService
+        return self._get("revenue", RevenueService)
+
+    @property
+    def summaries(self):
+        from src.services.customer_summary_service import CustomerSummaryService
+        return self._get("summaries", CustomerSummaryService)
+
+def _service_errors() -> Tuple[type, ...]:
+    from src.services.product_service import ProductServiceError
+    from src.services.customer_service import CustomerServiceError
+    from src.services.order_service import OrderServiceError
+    from src.services.payment_service import PaymentServiceError
+    from src.services.revenue_service import RevenueServiceError
+    from src.services.customer_summary_service import CustomerSummaryServiceError
+    from src.services.bestseller_service import BestsellerServiceError
+    return (ProductServiceError, CustomerServiceError, OrderServiceError, PaymentServiceError, RevenueServiceError,
+            CustomerSummaryServiceError, BestsellerServiceError)
+
+def _int(params: Dict, name: str, default: Optional[int] = None) -> Optional[int]:
+    value = params.get(name, default)
+    if value is None:
+        return None
+    # JSON bodies may carry true or 2.5, which int() would quietly accept
+    if isinstance(value, bool) or (isinstance(value, float) and not value.is_integer()):
+        raise HTTPError(400, f"{name} must be an integer")
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        raise HTTPError(400, f"{name} must be an integer")
+
+def _param(params: Dict, name: str) -> str:
+    if not params.get(name):
+        raise HTTPError(400, f"{name} is required")
+    return params[name]
+
+def _flag(params: Dict, name: str) -> bool:
+    return str(params.get(name, "")).lower() in ("1", "true", "yes")
+
+def _require(body: Dict, *names: str) -> None:
+    missing = [n for n in names if body.get(n) in (None, "")]
+    if missing:
+        raise HTTPError(400, f"Missing field(s): {', '.join(missing)}")
+
+def _found(row, what: str):
+    if not row:
+        raise HTTPError(404, f"{what} not found")
+    return row
+
+class Router:
+    def __init__(self, services: Services):
+        self.s = services
+        self.routes: List[Tuple[str, str, re.Pattern, Callable]] = []
+        add = self.add
+        add("GET", r"/health", lambda p, b: {"status": "ok", "pid": os.getpid()})
+        add("GET", r"/metrics", self.metrics)
+        add("GET", r"/metrics/prometheus", lambda p, b: instrumentation.render_report("prometheus"))
+        # products
+        add("GET", r"/products", lambda p, b: self.s.products.list_products(_int(p, "limit", 100), p.get("category")))
+        add("POST", r"/products", self.add_product)
+        add("GET", r"/products/low-stock", lambda p, b: self.s.products.get_low_stock(_int(p, "threshold", 5), p.get("category")))
+        add("GET", r"/products/(\d+)", lambda p, b, pid: _found(self.s.products.get_product(int(pid)), "Product"))
+        add("POST", r"/products/(\d+)/restock", self.restock_product)
+        # customers
+        add("GET", r"/customers", lambda p, b: self.s.customers.list_customers(_int(p, "limit", 100)))
+        add("POST", r"/customers", self.add_customer)
+        add("GET", r"/customers/search", self.search_customers)
+        add("GET", r"/customers/email-available",
+            lambda p, b: {"email": p.get("email"), "available": self.s.customers.email_available(_param(p, "email"))})
+        add("GET", r"/customers/(\d+)", lambda p, b, cid: _found(self.s.customers.get_customer(int(cid)), "Customer"))
+        add("PATCH", r"/customers/(\d+)", lambda p, b, cid: self.s.customers.update_customer(int(cid), b.get("phone"), b.get("city")))
+        add("DELETE", r"/customers/(\d+)", lambda p, b, cid: _found(self.s.customers.delete_customer(int(cid)), "Customer"))
+        add("GET", r"/customers/(\d+)/orders", lambda p, b, cid: self.s.orders.list_orders_by_customer(int(cid)))
+        add("GET", r"/customers/(\d+)/summary", lambda p, b, cid: self.s.summaries.get_summary(int(cid)))
+        # orders
+        add("POST", r"/orders", self.create_order)
+        add("GET", r"/orders/(\d+)", lambda p, b, oid: self.s.orders.get_order_details(int(oid)))
+        add("POST", r"/orders/(\d+)/cancel", lambda p, b, oid: self.s.orders.cancel_order(int(oid)))
+        add("POST", r"/orders/(\d+)/complete", lambda p, b, oid: self.s.orders.complete_order(int(oid)))
+        # payments
+        add("POST", r"/payments/(\d+)/process",
+            lambda p, b, oid: self.s.payments.process_payment(int(oid), b.get("method"), b.get("idempotency_key")))
+        add("POST", r"/payments/(\d+)/refund", lambda p, b, oid: self.s.payments.refund_payment(int(oid)))
+        # reports
+        add("GET", r"/reports/top-products",
+            lambda p, b: self.s.reports.get_top_selling_products(_int(p, "top_n", 5), _int(p, "hours"), _int(p, "days"),
+                                                                 p.get("by", "quantity")))
+        add("GET", r"/reports/revenue", self.revenue)
+        add("GET", r"/reports/order-count", lambda p, b: self.s.reports.get_order_count_per_customer())
+        add("GET", r"/reports/active-customers",
+            lambda p, b: self.s.reports.get_customers_with_multiple_orders(_int(p, "min_orders", 2)))
+
+    def add(self, method: str, pattern: str, handler: Callable) -> None:
+        self.routes.append((method, pattern, re.compile(f"^{pattern}/?$"), handler))
+
+    def dispatch(self, method: str, path: str, params: Dict, body: Dict):
+        allowed = False
+        for m, pattern, rx, handler in self.routes:
+            match = rx.match(path)
+            if not match:
+                continue
+            if m != method:
+                allowed = True
+                continue
+            with instrumentation.scope(f"{method} {pattern}"):
+                return handler(params, body, *match.groups())
+        raise HTTPError(405 if allowed else 404, "Method not allowed" if allowed else "Not found")
+
+    def metrics(self, params, body):
+        stats = {"pid": os.getpid(), "product_cache": self.s.products.cache_stats(),
+                 "customer_index": self.s.customers.index_stats()}
+        journal = self.s.products.stock_journal_stats()
+        if journal is not None:
+            stats["stock_journal"] = journal
+        if instrumentation.is_enabled():
+            stats["db"] = instrumentation.recorder.snapshot()
+        return stats
+
+    def add_product(self, params, body):
+        _require(body, "name", "sku", "price")
+        return self.s.products.add_product(body["name"], body["sku"], float(body["price"]),
+                                           int(body.get("stock") or 0), body.get("category"))
+
+    def restock_product(self, params, body, pid):
+        _require(body, "delta")
+        return self.s.products.restock_product(int(pid), _int(body, "delta"))
+
+    def search_customers(self, params, body):
+        return self.s.customers.search_customers(params.get("email"), params.get("city"), params.get("name"),
+                                                 _flag(params, "prefix"), _flag(params, "ignore_case"),
+                                                 _int(params, "limit", 100), _int(params, "after"))
+
+    def add_customer(self, params, body):
+        _require(body, "name", "email")
+        return self.s.customers.create_customer(body["name"], body["email"], body.get("phone"), body.get("city"))
+
+    def create_order(self, params, body):
+        _require(body, "customer_id", "items")
+        try:
+            items = [{"prod_id": int(i["prod_id"]), "quantity": int(i["quantity"])} for i in body["items"]]
+        except (KeyError, TypeError, ValueError):
+            raise HTTPError(400, "items must be a list of {prod_id, quantity}")
+        return self.s.orders.create_order(int(body["customer_id"]), items)
+
+    def revenue(self, params, body):
+        from src.services.revenue_service import last_month_range
+        default_start, default_end = last_month_range()
+        try:
+            start = date.fromisoformat(params["from"]) if params.get("from") else default_start
+            end = date.fromisoformat(params["to"]) if params.get("to") else default_end
+        except ValueError:
+            raise HTTPError(400, "from/to must be YYYY-MM-DD")
+        return self.s.revenue.report(start, end, params.get("by", "day"))
+
+def make_handler(router: Router):
+    service_errors = _service_errors()
+
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"  # keep-alive for POS terminals and tools
+        timeout = 15  # idle keep-alive connections are dropped so shutdown doesn't wait on them
+
+        def _handle(self, method: str):
+            url = urlparse(self.path)
+            params = {k: v[-1] for k, v in parse_qs(url.query).items()}
+            try:
+                body = self._read_body()
+                if not isinstance(body, dict):
+                    raise HTTPError(400, "Request body must be a JSON object")
+                status, payload = 200, router.dispatch(method, url.path.rstrip("/") or "/", params, body)
+            except HTTPError as e:
+                status, payload = e.status, {"error": str(e)}
+            except ValueError as e:
+                status, payload = 400, {"error": f"Invalid request: {e}"}
+            except service_errors as e:
+                status, payload = 400, {"error": str(e)}
+            except Exception as e:
+                # Details (PostgREST messages, SQL) stay in the log
+                logger.exception("Unhandled error on %s %s", method, self.path)
+                status, payload = 500, {"error": "Internal error"}
+            if isinstance(payload, str):
+                data, content_type = payload.encode(), "text/plain; version=0.0.4"
+            else:
+                data, content_type = json.dumps(payload, default=str).encode(), "application/json"
+            self.send_response(status)
+            self.send_header("Content-Type", content_type)
+            self.send_header("Content-Length", str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+
+        def _read_body(self) -> Dict:
+            try:
+                length = int(self.headers.get("Content-Length") or 0)
+            except ValueError:
+                length = -1
+            if length < 0 or length > SERVER_MAX_BODY:
+                # The body is left unread, so this connection can't carry another request
+                self.close_connection = True
+                if length < 0:
+                    raise HTTPError(400, "Invalid Content-Length")
+                raise HTTPError(413, f"Request body larger than {SERVER_MAX_BODY} bytes")
+            return json.loads(self.rfile.read(length) or b"{}") if length else {}
+
+        def do_GET(self):
+            self._handle("GET")
+
+        def do_POST(self):
+            self._handle("POST")
+
+        def do_PATCH(self):
+            self._handle("PATCH")
+
+        def do_DELETE(self):
+            self._handle("DELETE")
+
+        def log_message(self, fmt, *args):
+            logger.info("%s - %s", self.address_string(), fmt % args)
+
+    return Handler
+
+class RetailHTTPServer(ThreadingHTTPServer):
+    daemon_threads = False  # let in-flight requests finish on shutdown
+    allow_reuse_address = True
+
+def serve_forever_on(sock: Optional[socket.socket], host: str, port: int) -> None:
+    """
+    Run one worker until SIGTERM/SIGINT. With sock, serve on an already bound
+    listening socket shared with sibling workers.
+    """
+    services = Services()
+    router = Router(services)
+    handler = make_handler(router)
+    if sock is None:
+        server = RetailHTTPServer((host, port), handler)
+    else:
+        server = RetailHTTPServer((host, port), handler, bind_and_activate=False)
+        server.socket.close()
+        server.socket = sock
+
+    def stop(signum, frame):
+        # shutdown() blocks until serve_forever returns, so call it off the main thread
+        threading.Thread(target=server.shutdown, daemon=True).start()
+
+    signal.signal(signal.SIGTERM, stop)
+    signal.signal(signal.SIGINT, stop)
+    try:
+        server.serve_forever()
+    finally:
+        server.server_close()  # joins request threads
+
+def run_server(host: str = "127.0.0.1", port: int = 8080, workers: int = 1) -> None:
+    """
+    Serve the JSON API. workers > 1 pre-forks that many processes sharing one
+    listening socket (POSIX only); the parent forwards shutdown signals to them.
+    """
+    if workers <= 1 or not hasattr(os, "fork"):
+        serve_forever_on(None, host, port)
+        return
+
+    sock = socket.socket(socket.AF_INET6 if ":" in host else socket.AF_INET, socket.SOCK_STREAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    sock.bind((host, port))
+    sock.listen(128 * workers)
+
+    children = []
+    for _ in range(workers):
+        pid = os.fork()
+        if pid == 0:
+            code = 0
+            try:
+                serve_forever_on(sock, host, port)
+            except Exception:
+                logger.exception("Worker %s crashed", os.getpid())
+                code = 1
+            finally:
+                # os._exit skips atexit: apply queued order events and write buffered stock increments now
+                try:
+                    from src.services import order_events
+                    from src.dao.stock_journal import close_stock_journal
+                    order_events.flush(order_events.ORDER_EVENTS_EXIT_TIMEOUT)
+                    close_stock_journal()
+                except Exception:
+                    logger.exception("Worker %s could not flush the stock journal", os.getpid())
+                os._exit(code)
+        children.append(pid)
+
+    def forward(signum, frame):
+        for child in children:
+            try:
+                os.kill(child, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+
+    signal.signal(signal.SIGTERM, forward)
+    signal.signal(signal.SIGINT, forward)
+    for child in children:
+        while True:
+            try:
+                os.waitpid(child, 0)
+                break
+            except InterruptedError:
+                continue
+            except ChildProcessError:
+                break
+    sock.close()
@@ -0,0 +1,102 @@
+import asyncio
+import os
+from typing import Dict, List
+from src.config import get_async_supabase
+from src.dao.async_dao import AsyncOrderDAO, AsyncProductDAO, AsyncCustomerDAO, AsyncStockDAO, bounded_gather
+from src.dao.stock_dao import StockDAOError
+from src.dao.instrumentation import instrumented
+from src.services.order_service import OrderServiceError, shape_order_details, priced_items
+from src.services import order_events
+
+# Upper bound on requests one service instance keeps in flight
+ASYNC_MAX_CONCURRENCY = int(os.getenv("ASYNC_MAX_CONCURRENCY", "32"))
+
+@instrumented
+class AsyncOrderService:
+    """
+    asyncio version of OrderService. Independent lookups are gathered
+    concurrently, bounded by one semaphore per service instance.
+    Build it with `await AsyncOrderService.create()`.
+    """
+    def __init__(self, sb, max_concurrency: int = ASYNC_MAX_CONCURRENCY):
+        self.order_dao = AsyncOrderDAO(sb)
+        self.product_dao = AsyncProductDAO(sb)
+        self.customer_dao = AsyncCustomerDAO(sb)
+        self.stock_dao = AsyncStockDAO(sb)
+        self.sem = asyncio.Semaphore(max_concurrency)
+
+    @classmethod
+    async def create(cls, max_concurrency: int = ASYNC_MAX_CONCURRENCY) -> "AsyncOrderService":
+        return cls(await get_async_supabase(), max_concurrency)
+
+    async def create_order(self, customer_id: int, items: List[Dict[str, int]]) -> Dict:
+        # Customer and product checks don't depend on each other; one permit each
+        cust, products = await bounded_gather(
+            self.sem,
+            self.customer_dao.get_customer_by_id(customer_id),
+            self.product_dao.get_products_by_ids({i["prod_id"] for i in items}, "product_id, price"),
+        )
+        if not cust:
+            raise OrderServiceError("Customer not found")
+        prices = {p["product_id"]: p["price"] for p in products}
+        for item in items:
+            if item["prod_id"] not in prices:
+                raise OrderServiceError(f"Product with id {item['prod_id']} not found")
+
+        try:
+            await self.stock_dao.reserve(items, self.sem)
+        except StockDAOError as e:
+            raise OrderServiceError(str(e))
+        try:
+            async with self.sem:
+                order = await self.order_dao.create_order(customer_id, items, prices)
+        except Exception:
+            await self.stock_dao.release(items, self.sem)
+            raise
+        await asyncio.to_thread(order_events.publish, order_events.ORDER_CREATED, order=order,
+                                items=priced_items(items, prices))
+        return order
+
+    async def get_order_details(self, order_id: int) -> Dict:
+        async with self.sem:
+            row = await self.order_dao.get_order_with_details(order_id)
+        if not row:
+            raise OrderServiceError("Order not found")
+        return shape_order_details(row)
+
+    async def get_orders_details(self, order_ids: List[int]) -> List[Dict]:
+        rows = await self.order_dao.get_orders_with_details(order_ids, self.sem)
+        return [shape_order_details(row) for row in rows]
+
+    async def cancel_order(self, order_id: int) -> Dict:
+        async with self.sem:
+            order = await self.order_dao.get_order_by_id(order_id)
+        if not order:
+            raise OrderServiceError("Order not found")
+        if order["status"] != "PLACED":
+            raise OrderServiceError("Only orders with status PLACED can be cancelled")
+        async with self.sem:
+            updated_order = await self.order_dao.transition_order_status(order_id, "PLACED", "CANCELLED")
+        if not updated_order:
+            raise OrderServiceError("Only orders with status PLACED can be cancelled")
+        async with self.sem:
+            items = await self.order_dao.get_order_items(order_id)
+        if items:
+            try:
+                await self.stock_dao.release(items, self.sem)
+            except StockDAOError as e:
+                raise OrderServiceError(str(e))
+        await asyncio.to_thread(order_events.publish, order_events.ORDER_CANCELLED, order=updated_order, items=items)
+        return updated_order
+
+    async def complete_order(self, order_id: int) -> Dict:
+        async with self.sem:
+            updated_order = await self.order_dao.transition_order_status(order_id, "PLACED", "COMPLETED")
+        if not updated_order:
+            async with self.sem:
+                order = await self.order_dao.get_order_by_id(order_id)
+            if not order:
+                raise OrderServiceError("Order not found")
+            raise OrderServiceError("Only orders with status PLACED can be marked as Completed")
+        await asyncio.to_thread(order_events.publish, order_events.ORDER_COMPLETED, order=updated_order)
+        return updated_order
@@ -0,0 +1,128 @@
+import asyncio
+from typing import Optional
+from src.config import get_async_supabase
+from src.dao.async_dao import AsyncPaymentDAO, AsyncOrderDAO
+from src.dao.payment_dao import PaymentDAOError
+from src.dao.retry import with_retries_async
+from src.dao.instrumentation import instrumented
+from src.services.payment_service import PaymentServiceError, PAYMENT_STATE_ATTEMPTS, refund_refusal
+from src.services.async_order_service import ASYNC_MAX_CONCURRENCY
+from src.services import order_events
+
+@instrumented
+class AsyncPaymentService:
+    """
+    asyncio version of PaymentService; build it with `await AsyncPaymentService.create()`.
+    """
+    def __init__(self, sb, max_concurrency: int = ASYNC_MAX_CONCURRENCY):
+        self.payment_dao = AsyncPaymentDAO(sb)
+        self.order_dao = AsyncOrderDAO(sb)
+        self.sem = asyncio.Semaphore(max_concurrency)
+
+    @classmethod
+    async def create(cls, max_concurrency: int = ASYNC_MAX_CONCURRENCY) -> "AsyncPaymentService":
+        return cls(await get_async_supabase(), max_concurrency)
+
+    async def create_pending_payment(self, order_id: int, amount: float) -> dict:
+        try:
+            async with self.sem:
+                return await self.payment_dao.create_payment(order_id, amount)
+        except PaymentDAOError as e:
+            raise PaymentServiceError(str(e))
+
+    async def _bounded(self, fn, *args):
+        async with self.sem:
+            return await fn(*args)
+
+    async def _db(self, fn, *args):
+        # One permit per attempt, released while backing off
+        return await with_retries_async(self._bounded, fn, *args)
+
+    async def process_payment(self, order_id: int, method: str, idempotency_key: Optional[str] = None) -> dict:
+        """
+        Same conditional steps as PaymentService.process_payment: safe to retry,
+        and a repeat with the same idempotency_key returns the original result.
+        """
+        if method not in ("Cash", "Card", "UPI"):
+            raise PaymentServiceError("Invalid payment method")
+        if self.payment_dao.use_rpc:
+            return await self._process_payment_rpc(order_id, method, idempotency_key)
+
+        for _ in range(PAYMENT_STATE_ATTEMPTS):
+            # The order and its payment are independent lookups
+            order, payment = await asyncio.gather(
+                self._db(self.order_dao.get_order_by_id, order_id),
+                self._db(self.payment_dao.get_payment_by_order, order_id),
+            )
+            if not order:
+                raise PaymentServiceError("Order not found")
+            if not payment:
+                raise PaymentServiceError("Payment record not found for order")
+
+            if payment["status"] == "PAID":
+                # Only a repeat of the call that paid (same key) may see success
+                same_request = idempotency_key is not None and payment.get("idempotency_key") == idempotency_key
+                if not same_request:
+                    raise PaymentServiceError("Payment already processed for order")
+                if order["status"] == "COMPLETED":
+                    return {"payment": payment, "order": order}
+                if order["status"] != "PLACED":
+                    raise PaymentServiceError("Payment already processed for order")
+                # Paid by an interrupted call with this key: finish the job
+                return await self._complete_paid_order(order_id, payment)
+
+            if order["status"] != "PLACED":
+                raise PaymentServiceError("Payment can only be processed for orders with status PLACED")
+            if payment["status"] != "PENDING":
+                raise PaymentServiceError("Payment already processed for order")
+            paid = await self._db(self.payment_dao.mark_paid, payment["payment_id"], method, idempotency_key)
+            if paid:
+                return await self._complete_paid_order(order_id, paid)
+            # Another worker moved the payment first; look again
+        raise PaymentServiceError("Payment is being processed concurrently, try again")
+
+    async def _complete_paid_order(self, order_id: int, payment: dict) -> dict:
+        updated_order = await self._db(self.order_dao.transition_order_status, order_id, "PLACED", "COMPLETED")
+        if updated_order:
+            # Only the call that made the transition announces it
+            await asyncio.to_thread(order_events.publish, order_events.ORDER_COMPLETED, order=updated_order)
+        else:
+            # Either a retried update already applied, or someone else completed or cancelled it
+            updated_order = await self._db(self.order_dao.get_order_by_id, order_id)
+            if not updated_order or updated_order["status"] != "COMPLETED":
+                raise PaymentServiceError("Payment can only be processed for orders with status PLACED")
+        return {
+            "payment": payment,
+            "order": updated_order
+        }
+
+    async def _process_payment_rpc(self, order_id: int, method: str, idempotency_key: Optional[str]) -> dict:
+        try:
+            result = await self._db(self.payment_dao.process_payment_rpc, order_id, method, idempotency_key)
+        except PaymentDAOError as e:
+            raise PaymentServiceError(str(e))
+        except Exception as e:
+            raise PaymentServiceError(getattr(e, "message", None) or str(e))
+        if not result.get("replayed"):
+            await asyncio.to_thread(order_events.publish, order_events.ORDER_COMPLETED, order=result["order"])
+        return {
+            "payment": result["payment"],
+            "order": result["order"]
+        }
+
+    async def refund_payment(self, order_id: int) -> dict:
+        async with self.sem:
+            payment = await self.payment_dao.get_payment_by_order(order_id)
+        if not payment:
+            raise PaymentServiceError("Payment record not found for order")
+        if payment["status"] != "PAID":
+            raise PaymentServiceError(refund_refusal(payment["status"]))
+        async with self.sem:
+            updated_payment = await self.payment_dao.mark_refunded(payment["payment_id"])
+        if not updated_payment:
+            async with self.sem:
+                payment = await self.payment_dao.get_payment_by_order(order_id)
+            raise PaymentServiceError(refund_refusal((payment or {}).get("status")))
+        await asyncio.to_thread(order_events.publish, order_events.PAYMENT_REFUNDED,
+                                order_id=order_id, payment=updated_payment)
+        return updated_payment
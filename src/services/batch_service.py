@@ -0,0 +1,285 @@
+import contextvars
+import os
+import sys
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, Iterable, List, Tuple
+from src.dao.order_dao import OrderDAO
+from src.dao.payment_dao import PaymentDAO
+from src.dao.stock_dao import StockDAOError, aggregate_items
+from src.dao.stock_journal import make_stock_dao
+from src.dao.instrumentation import instrumented
+from src.services import order_events
+from src.services.payment_service import refund_refusal
+
+# Threads for the requests that can't be folded into one (id chunks, per-product stock writes)
+BATCH_WORKERS = int(os.getenv("BATCH_WORKERS", "4"))
+# Ids per in_() request; keeps URLs well under PostgREST/proxy limits
+BATCH_CHUNK_SIZE = int(os.getenv("BATCH_CHUNK_SIZE", "200"))
+
+PAYMENT_METHODS = ("Cash", "Card", "UPI")
+
+class BatchServiceError(Exception):
+    pass
+
+def read_ids(path: str) -> List[int]:
+    """
+    Read order ids, one per line ("-" reads stdin). Blank lines and # comments are skipped.
+    """
+    f = sys.stdin if path == "-" else open(path, encoding="utf-8")
+    try:
+        ids = []
+        for line_no, line in enumerate(f, start=1):
+            text = line.split("#", 1)[0].strip()
+            if not text:
+                continue
+            try:
+                ids.append(int(text))
+            except ValueError:
+                raise BatchServiceError(f"{path}:{line_no}: not an order id: {text!r}")
+        return ids
+    except OSError as e:
+        raise BatchServiceError(str(e))
+    finally:
+        if f is not sys.stdin:
+            f.close()
+
+def _pool_map(pool: ThreadPoolExecutor, fn: Callable, items: List):
+    """
+    pool.map that runs each call in a copy of the caller's context, so the
+    queries keep the caller's tracing scope.
+    """
+    contexts = [contextvars.copy_context() for _ in items]
+    return pool.map(lambda ctx, item: ctx.run(fn, item), contexts, items)
+
+class _Results:
+    """
+    Per-id outcome of a batch, reported in the order the ids were given.
+    """
+    def __init__(self, ids: List[int]):
+        self.ids = ids
+        self.by_id: Dict[int, Dict] = {}
+
+    def ok(self, order_id: int, **fields) -> None:
+        self.by_id[order_id] = {"order_id": order_id, "ok": True, **fields}
+
+    def fail(self, order_id: int, error: str) -> None:
+        self.by_id.setdefault(order_id, {"order_id": order_id, "ok": False, "error": error})
+
+    def pending(self, ids: Iterable[int]) -> List[int]:
+        return [i for i in ids if i not in self.by_id]
+
+    def summary(self, **extra) -> Dict:
+        results = [self.by_id.get(i) or {"order_id": i, "ok": False, "error": "Not processed"} for i in self.ids]
+        succeeded = sum(1 for r in results if r["ok"])
+        return {"processed": len(results), "succeeded": succeeded, "failed": len(results) - succeeded,
+                **extra, "results": results}
+
+@instrumented
+class BatchOrderService:
+    """
+    Complete, cancel, pay or refund many orders at once. Statuses are checked with
+    one in_() fetch per chunk of ids, moved with one conditional update per chunk,
+    and cancelled orders give their stock back as one delta per product.
+    """
+    def __init__(self, workers: int = BATCH_WORKERS, chunk_size: int = BATCH_CHUNK_SIZE, stock_dao=None):
+        if workers <= 0 or chunk_size <= 0:
+            raise BatchServiceError("workers and chunk_size must be positive")
+        self.workers = workers
+        self.chunk_size = chunk_size
+        self.order_dao = OrderDAO()
+        self.payment_dao = PaymentDAO()
+        self.stock_dao = stock_dao or make_stock_dao()
+
+    def complete_orders(self, order_ids: List[int]) -> Dict:
+        ids = list(dict.fromkeys(order_ids))
+        results = _Results(ids)
+        moved = self._transition(ids, "COMPLETED", results,
+                                 "Only orders with status PLACED can be marked as Completed")
+        for order in moved:
+            results.ok(order["order_id"], status=order["status"])
+        order_events.publish_many(order_events.ORDER_COMPLETED, [{"order": o} for o in moved])
+        return results.summary()
+
+    def cancel_orders(self, order_ids: List[int]) -> Dict:
+        ids = list(dict.fromkeys(order_ids))
+        results = _Results(ids)
+        moved = self._transition(ids, "CANCELLED", results, "Only orders with status PLACED can be cancelled")
+
+        # Stock goes back for all cancelled orders together, one delta per product
+        items_by_order: Dict[int, List[Dict]] = {}
+        item_rows, failed = self._map(self.order_dao.get_items_for_orders, [o["order_id"] for o in moved])
+        for item in item_rows:
+            items_by_order.setdefault(item["order_id"], []).append(item)
+        restored, stock_errors = self._release([i for i in item_rows if i["order_id"] not in failed])
+
+        cancelled = []
+        for order in moved:
+            oid = order["order_id"]
+            if oid in failed:
+                results.fail(oid, f"Cancelled, but stock was not restored: {failed[oid]}")
+                continue
+            results.ok(oid, status=order["status"])
+            cancelled.append({"order": order, "items": items_by_order.get(oid, [])})
+        order_events.publish_many(order_events.ORDER_CANCELLED, cancelled)
+        return results.summary(stock_restored=restored, stock_errors=stock_errors)
+
+    def process_payments(self, order_ids: List[int], method: str) -> Dict:
+        if method not in PAYMENT_METHODS:
+            raise BatchServiceError("Invalid payment method")
+        ids = list(dict.fromkeys(order_ids))
+        results = _Results(ids)
+        payments = self._payments_by_order(ids, results)
+        placed = self._check_placed(results.pending(ids), results,
+                                    "Payment can only be processed for orders with status PLACED")
+
+        # As in PaymentService.process_payment: the payment moves first, with a
+        # conditional PENDING -> PAID update, and only orders whose payment is PAID
+        # are completed. A payment already PAID for a PLACED order was left by an
+        # interrupted run, so its order is completed too.
+        paid: Dict[int, Dict] = {}
+        pending = []
+        for oid in placed:
+            payment = payments[oid]
+            if payment["status"] == "PAID":
+                paid[oid] = payment
+            elif payment["status"] == "PENDING":
+                pending.append(oid)
+            else:
+                results.fail(oid, "Payment already processed for order")
+        flipped, failed = self._map(lambda chunk: self.payment_dao.mark_payments_paid(chunk, method),
+                                    [payments[oid]["payment_id"] for oid in pending])
+        paid.update((p["order_id"], p) for p in flipped)
+        for oid in pending:
+            if oid not in paid:
+                results.fail(oid, failed.get(payments[oid]["payment_id"], "Payment already processed for order"))
+
+        moved = self._move(list(paid), "COMPLETED", results,
+                           "Payment recorded, but the order is no longer PLACED")
+        for order in moved:
+            oid = order["order_id"]
+            results.ok(oid, status=order["status"], payment_id=paid[oid]["payment_id"])
+        order_events.publish_many(order_events.ORDER_COMPLETED, [{"order": o} for o in moved])
+        return results.summary()
+
+    def refund_payments(self, order_ids: List[int]) -> Dict:
+        ids = list(dict.fromkeys(order_ids))
+        results = _Results(ids)
+        payments = self._payments_by_order(ids, results)
+        for oid in results.pending(ids):
+            if payments[oid]["status"] != "PAID":
+                results.fail(oid, refund_refusal(payments[oid]["status"]))
+        pay_ids = [payments[oid]["payment_id"] for oid in results.pending(ids)]
+        # Conditional on PAID: a payment refunded meanwhile is reported, not refunded (and announced) twice
+        refunded, failed = self._map(self.payment_dao.mark_payments_refunded, pay_ids)
+        for payment in refunded:
+            results.ok(payment["order_id"], payment_id=payment["payment_id"], status=payment["status"])
+        order_events.publish_many(order_events.PAYMENT_REFUNDED,
+                                  [{"order_id": p["order_id"], "payment": p} for p in refunded])
+        for oid in results.pending(ids):
+            results.fail(oid, failed.get(payments[oid]["payment_id"], "Payment is no longer PAID"))
+        return results.summary()
+
+    def _transition(self, ids: List[int], to_status: str, results: _Results, wrong_status: str) -> List[Dict]:
+        """
+        Check every id with one fetch per chunk, then move the PLACED ones with one
+        conditional update per chunk. Failures are recorded in results.
+        """
+        return self._move(self._check_placed(ids, results, wrong_status), to_status, results, wrong_status)
+
+    def _check_placed(self, ids: List[int], results: _Results, wrong_status: str) -> List[int]:
+        rows, failed = self._map(lambda chunk: self.order_dao.get_orders_by_ids(chunk, "order_id, status"), ids)
+        status = {r["order_id"]: r["status"] for r in rows}
+        placed = []
+        for oid in ids:
+            if oid in failed:
+                results.fail(oid, failed[oid])
+            elif oid not in status:
+                results.fail(oid, "Order not found")
+            elif status[oid] != "PLACED":
+                results.fail(oid, wrong_status)
+            else:
+                placed.append(oid)
+        return placed
+
+    def _move(self, placed: List[int], to_status: str, results: _Results, wrong_status: str) -> List[Dict]:
+        moved, failed = self._map(
+            lambda chunk: self.order_dao.transition_orders_status(chunk, "PLACED", to_status), placed)
+        moved_ids = {o["order_id"] for o in moved}
+        for oid in placed:
+            if oid in failed:
+                results.fail(oid, failed[oid])
+            elif oid not in moved_ids:
+                # Another writer changed it between the fetch and the update
+                results.fail(oid, wrong_status)
+        return moved
+
+    def _payments_by_order(self, ids: List[int], results: _Results) -> Dict[int, Dict]:
+        rows, failed = self._map(self.payment_dao.get_payments_by_orders, ids)
+        # Like PaymentDAO.get_payment_by_order, an order with several payments uses its latest
+        payments: Dict[int, Dict] = {}
+        for p in rows:
+            if p["order_id"] not in payments or p["payment_id"] > payments[p["order_id"]]["payment_id"]:
+                payments[p["order_id"]] = p
+        for oid in ids:
+            if oid in failed:
+                results.fail(oid, failed[oid])
+            elif oid not in payments:
+                results.fail(oid, "Payment record not found for order")
+        return payments
+
+    def _release(self, items: List[Dict]) -> Tuple[Dict[int, int], List[Dict]]:
+        """
+        Give back stock for all lines, aggregated per product. RPC mode does it in one
+        call and write-behind mode buffers it (the result is then the deltas buffered);
+        otherwise each product's compare-and-set write runs on the pool.
+        """
+        totals = aggregate_items(items)
+        if not totals:
+            return {}, []
+        if getattr(self.stock_dao, "use_rpc", False) or getattr(self.stock_dao, "buffered", False):
+            try:
+                return self.stock_dao.release(items), []
+            except StockDAOError as e:
+                return {}, [{"product_id": pid, "error": str(e)} for pid in sorted(totals)]
+
+        def release_one(prod_id: int):
+            try:
+                return prod_id, self.stock_dao.adjust_stock(prod_id, totals[prod_id]), None
+            except StockDAOError as e:
+                return prod_id, None, str(e)
+
+        restored, errors = {}, []
+        with ThreadPoolExecutor(max_workers=self.workers) as pool:
+            for prod_id, stock, error in _pool_map(pool, release_one, sorted(totals)):
+                if error:
+                    errors.append({"product_id": prod_id, "error": error})
+                else:
+                    restored[prod_id] = stock
+        return restored, errors
+
+    def _map(self, fn: Callable[[List[int]], List[Dict]], ids: List[int]) -> Tuple[List[Dict], Dict[int, str]]:
+        """
+        Run fn over chunks of ids on the pool. Returns the concatenated rows and
+        {id: error} for every id whose chunk raised.
+        """
+        chunks = [ids[i:i + self.chunk_size] for i in range(0, len(ids), self.chunk_size)]
+        if not chunks:
+            return [], {}
+
+        def run(chunk):
+            try:
+                return fn(chunk), None
+            except Exception as e:
+                return [], str(e)
+
+        rows, failed = [], {}
+        if len(chunks) == 1:
+            outcomes = [run(chunks[0])]
+        else:
+            with ThreadPoolExecutor(max_workers=min(self.workers, len(chunks))) as pool:
+                outcomes = list(_pool_map(pool, run, chunks))
+        for chunk, (chunk_rows, error) in zip(chunks, outcomes):
+            rows.extend(chunk_rows)
+            if error:
+                failed.update((i, error) for i in chunk)
+        return rows, failed
@@ -0,0 +1,163 @@
+import heapq
+import os
+import threading
+import time
+from datetime import datetime, timezone
+from typing import Dict, Iterable, List, Optional, Tuple
+from src.dao.order_dao import OrderDAO
+from src.dao.product_cache import CachedProductDAO
+from src.dao.bestseller_dao import BestsellerDAO, HOUR, DAY, BUCKET_SECONDS, bucket_start
+from src.dao.local_store import to_epoch
+from src.dao.instrumentation import instrumented
+from src.services import order_events
+
+# How far back hourly and daily best-seller buckets are kept
+BESTSELLER_HOURS = int(os.getenv("BESTSELLER_HOURS", "48"))
+BESTSELLER_DAYS = int(os.getenv("BESTSELLER_DAYS", "365"))
+# Old buckets are dropped at most this often (seconds)
+BESTSELLER_PRUNE_INTERVAL = float(os.getenv("BESTSELLER_PRUNE_INTERVAL", "3600"))
+
+RANK_BY = ("quantity", "revenue")
+
+class BestsellerServiceError(Exception):
+    pass
+
+@instrumented
+class BestsellerService:
+    """
+    Top-selling products over a recent window, read from hourly/daily buckets
+    in the local store. Buckets are updated as orders are created and
+    cancelled (via order_events) and can be rebuilt from the orders table, so
+    polling the report doesn't touch the database. Revenue is quantity times
+    the price the order was placed at (current prices when rebuilding, as
+    order lines don't store one).
+    """
+    def __init__(self, bestseller_dao: Optional[BestsellerDAO] = None, hours: int = BESTSELLER_HOURS,
+                 days: int = BESTSELLER_DAYS):
+        self.bestseller_dao = bestseller_dao or BestsellerDAO()
+        self.hours = hours
+        self.days = days
+        self._order_dao = None
+        self._product_dao = None
+        self._pruned_at: Optional[float] = None
+
+    @property
+    def order_dao(self) -> OrderDAO:
+        if self._order_dao is None:
+            self._order_dao = OrderDAO()
+        return self._order_dao
+
+    @property
+    def product_dao(self) -> CachedProductDAO:
+        if self._product_dao is None:
+            self._product_dao = CachedProductDAO()
+        return self._product_dao
+
+    def _prices(self, prod_ids: Iterable[int]) -> Dict[int, float]:
+        """
+        Prices from the product cache; misses are fetched in one request and cached.
+        """
+        prices, missing = {}, []
+        for pid in set(prod_ids):
+            row, _ = self.product_dao.cache.get(pid, need_stock=False)
+            if row is not None:
+                prices[pid] = float(row.get("price") or 0)
+            else:
+                missing.append(pid)
+        if missing:
+            for row in self.product_dao.get_products_by_ids(missing):
+                self.product_dao.cache.put(row)
+                prices[row["product_id"]] = float(row.get("price") or 0)
+        return prices
+
+    def record_created(self, order: Dict, items: List[Dict]) -> bool:
+        """
+        items carry the unit price the order was priced at (see OrderService.create_order);
+        lines without one are priced from the product cache.
+        """
+        pids = [item.get("prod_id", item.get("product_id")) for item in items]
+        unpriced = [pid for pid, item in zip(pids, items) if item.get("price") is None]
+        prices = self._prices(unpriced) if unpriced else {}
+        lines = [(pid, item["quantity"],
+                  float(item["price"] if item.get("price") is not None else prices.get(pid, 0.0)) * item["quantity"])
+                 for pid, item in zip(pids, items)]
+        created = to_epoch(order.get("created_at")) if order.get("created_at") else time.time()
+        return self.bestseller_dao.apply_order(order["order_id"], created, lines)
+
+    def record_cancelled(self, order_id: int) -> bool:
+        return self.bestseller_dao.reverse_order(order_id)
+
+    def _cutoffs(self, now: float) -> Tuple[int, int]:
+        return (bucket_start(now, HOUR) - (self.hours - 1) * BUCKET_SECONDS[HOUR],
+                bucket_start(now, DAY) - (self.days - 1) * BUCKET_SECONDS[DAY])
+
+    def rebuild(self) -> Dict:
+        started = time.monotonic()
+        self.bestseller_dao.clear()
+        since = datetime.fromtimestamp(self._cutoffs(time.time())[1], tz=timezone.utc).isoformat()
+        orders = 0
+        for order in self.order_dao.iter_orders_with_lines(since):
+            lines = [(item["product_id"], item["quantity"],
+                      float((item.get("products") or {}).get("price") or 0) * item["quantity"])
+                     for item in order.get("order_items") or []]
+            self.bestseller_dao.apply_order(order["order_id"], to_epoch(order.get("created_at")), lines)
+            orders += 1
+        self.bestseller_dao.set_meta("bestsellers_rebuilt_at", datetime.now(timezone.utc).isoformat())
+        self._pruned_at = time.monotonic()
+        return {"orders": orders, "since": since, "seconds": round(time.monotonic() - started, 3)}
+
+    def _prune(self, now: float) -> None:
+        if self._pruned_at is None or time.monotonic() - self._pruned_at >= BESTSELLER_PRUNE_INTERVAL:
+            self.bestseller_dao.prune(*self._cutoffs(now))
+            self._pruned_at = time.monotonic()
+
+    def top(self, top_n: int = 5, hours: Optional[int] = None, days: Optional[int] = None,
+            by: str = "quantity") -> List[Dict]:
+        """
+        Top top_n products over the last hours (hourly buckets, current hour
+        included) or days (daily buckets, today included); default is every
+        day kept. Ties go to the lower product_id.
+        """
+        if by not in RANK_BY:
+            raise BestsellerServiceError(f"Unknown ranking: {by} (use one of {', '.join(RANK_BY)})")
+        if hours is not None and days is not None:
+            raise BestsellerServiceError("Give either hours or days, not both")
+        if hours is not None and not 0 < hours <= self.hours:
+            raise BestsellerServiceError(f"hours must be between 1 and {self.hours}")
+        if days is not None and not 0 < days <= self.days:
+            raise BestsellerServiceError(f"days must be between 1 and {self.days}")
+        if top_n <= 0:
+            return []
+        order_events.flush()
+        if self.bestseller_dao.get_meta("bestsellers_rebuilt_at") is None:
+            self.rebuild()
+        now = time.time()
+        self._prune(now)
+        if hours is not None:
+            granularity, start = HOUR, bucket_start(now, HOUR) - (hours - 1) * BUCKET_SECONDS[HOUR]
+        else:
+            granularity, start = DAY, bucket_start(now, DAY) - ((days or self.days) - 1) * BUCKET_SECONDS[DAY]
+        rows = self.bestseller_dao.totals(granularity, start)
+        ranked = heapq.nsmallest(top_n, rows, key=lambda r: (-r[by], r["product_id"]))
+        return [{"product_id": r["product_id"], "sum_quantity": r["quantity"], "revenue": round(r["revenue"], 2)}
+                for r in ranked]
+
+_service: Optional[BestsellerService] = None
+_service_lock = threading.Lock()
+
+def _shared_service() -> BestsellerService:
+    global _service
+    with _service_lock:
+        if _service is None:
+            _service = BestsellerService()
+        return _service
+
+def _on_created(order: Dict, items: List[Dict], **_) -> None:
+    _shared_service().record_created(order, items)
+
+def _on_cancelled(order: Dict, **_) -> None:
+    _shared_service().record_cancelled(order["order_id"])
+
+def register() -> None:
+    order_events.subscribe(order_events.ORDER_CREATED, _on_created)
+    order_events.subscribe(order_events.ORDER_CANCELLED, _on_cancelled)
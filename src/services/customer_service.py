@@ -1,12 +1,16 @@
-from typing import Optional, List, Dict
-from src.dao.customer_dao import CustomerDAO, CustomerDAOError
+from typing import Optional, List, Dict, Iterator
+from src.dao.customer_dao import CustomerDAOError
+from src.dao.customer_index import IndexedCustomerDAO
+from src.dao.pagination import DEFAULT_PAGE_SIZE
+from src.dao.instrumentation import instrumented
 
 class CustomerServiceError(Exception):
     pass
 
+@instrumented
 class CustomerService:
     def __init__(self):
-        self.dao = CustomerDAO()
+        self.dao = IndexedCustomerDAO()
 
     def create_customer(self, name: str, email: str, phone: Optional[str] = None, city: Optional[str] = None) -> Dict:
         try:
@@ -39,5 +43,28 @@ class CustomerService:
     def list_customers(self, limit: int = 100) -> List[Dict]:
         return self.dao.list_customers(limit)
 
-    def search_customers(self, email: Optional[str] = None, city: Optional[str] = None) -> List[Dict]:
-        return self.dao.search_customers(email, city)
\ No newline at end of file
+    def search_customers(self, email: Optional[str] = None, city: Optional[str] = None, name: Optional[str] = None,
+                         prefix: bool = False, ignore_case: bool = False, limit: int = 100,
+                         after: Optional[int] = None) -> List[Dict]:
+        return self.dao.search_customers(email, city, name, prefix, ignore_case, limit, after)
+
+    def iter_customers(self, columns: str = "*", page_size: int = DEFAULT_PAGE_SIZE) -> Iterator[Dict]:
+        return self.dao.iter_customers(columns, page_size)
+
+    def iter_search_customers(self, email: Optional[str] = None, city: Optional[str] = None,
+                              name: Optional[str] = None, prefix: bool = False, ignore_case: bool = False,
+                              columns: str = "*", page_size: int = DEFAULT_PAGE_SIZE,
+                              after: Optional[int] = None) -> Iterator[Dict]:
+        return self.dao.iter_search_customers(email, city, name, prefix, ignore_case, columns, page_size, after)
+
+    def email_available(self, email: str) -> bool:
+        return self.dao.email_available(email)
+
+    def customer_ids_in_city(self, city: str) -> List[int]:
+        return self.dao.customer_ids_in_city(city)
+
+    def warm_index(self) -> int:
+        return self.dao.warm()
+
+    def index_stats(self) -> Dict:
+        return self.dao.index_stats()
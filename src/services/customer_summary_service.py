@@ -0,0 +1,134 @@
+import threading
+import time
+from datetime import datetime, timezone
+from itertools import islice
+from typing import Dict, List, Optional
+from src.dao.order_dao import OrderDAO
+from src.dao.customer_dao import CustomerDAO
+from src.dao.customer_summary_dao import CustomerSummaryDAO
+from src.dao.pagination import DEFAULT_PAGE_SIZE
+from src.dao.instrumentation import instrumented
+from src.services import order_events
+
+class CustomerSummaryServiceError(Exception):
+    pass
+
+def _refunded(order: Dict) -> bool:
+    payments = order.get("payments") or []
+    if isinstance(payments, dict):
+        payments = [payments]
+    return any((p or {}).get("status") == "REFUNDED" for p in payments)
+
+def summary_row(order: Dict, refunded: Optional[bool] = None) -> Dict:
+    return {
+        "order_id": order["order_id"],
+        "customer_id": order["customer_id"],
+        "status": order.get("status") or "PLACED",
+        "amount": float(order.get("total_amount") or 0),
+        "created_at": order.get("created_at"),
+        "refunded": _refunded(order) if refunded is None else refunded,
+    }
+
+@instrumented
+class CustomerSummaryService:
+    """
+    Customer order summaries read from the local store. They are updated as
+    orders are created, completed, cancelled and refunded (via order_events),
+    and can be rebuilt from the orders table in one streaming pass.
+    """
+    def __init__(self, summary_dao: Optional[CustomerSummaryDAO] = None):
+        self.summary_dao = summary_dao or CustomerSummaryDAO()
+        self._order_dao = None
+        self._customer_dao = None
+
+    @property
+    def order_dao(self) -> OrderDAO:
+        if self._order_dao is None:
+            self._order_dao = OrderDAO()
+        return self._order_dao
+
+    @property
+    def customer_dao(self) -> CustomerDAO:
+        if self._customer_dao is None:
+            self._customer_dao = CustomerDAO()
+        return self._customer_dao
+
+    def record_order(self, order: Dict) -> bool:
+        """
+        Apply an order row as published with an event (it carries its new status).
+        """
+        if not order or order.get("customer_id") is None:
+            return False
+        return self.summary_dao.apply_orders([summary_row(order, refunded=False)]) > 0
+
+    def record_refunded(self, order_id: int) -> bool:
+        known = self.summary_dao.get_order(order_id)
+        if known:
+            row = dict(known, refunded=True)
+        else:
+            order = self.order_dao.get_order_for_summary(order_id)
+            if not order:
+                return False
+            row = summary_row(order, refunded=True)
+        return self.summary_dao.apply_orders([row]) > 0
+
+    def rebuild(self, page_size: int = DEFAULT_PAGE_SIZE) -> Dict:
+        started = time.monotonic()
+        self.summary_dao.clear()
+        orders = 0
+        rows = self.order_dao.iter_orders_for_summary(page_size)
+        while True:
+            # One local transaction per page of orders
+            page = [summary_row(o) for o in islice(rows, page_size)]
+            if not page:
+                break
+            self.summary_dao.apply_orders(page)
+            orders += len(page)
+        self.summary_dao.set_meta("customer_summary_rebuilt_at", datetime.now(timezone.utc).isoformat())
+        return {"orders": orders, "seconds": round(time.monotonic() - started, 3)}
+
+    def _ensure_built(self) -> None:
+        order_events.flush()
+        if self.summary_dao.get_meta("customer_summary_rebuilt_at") is None:
+            self.rebuild()
+
+    def get_summary(self, customer_id: int) -> Dict:
+        self._ensure_built()
+        summary = self.summary_dao.get_summary(customer_id)
+        if summary is not None:
+            summary["lifetime_value"] = round(summary["lifetime_value"], 2)
+            return summary
+        # No orders recorded: only now is it worth asking whether the customer exists
+        if not self.customer_dao.get_customer_by_id(customer_id):
+            raise CustomerSummaryServiceError("Customer not found")
+        return {"customer_id": customer_id, "order_count": 0, "lifetime_value": 0.0, "refunded": 0,
+                "last_order_at": None, "by_status": {}}
+
+    def order_count_per_customer(self) -> List[Dict]:
+        self._ensure_built()
+        return self.summary_dao.order_counts()
+
+    def customers_with_multiple_orders(self, min_orders: int = 2) -> List[Dict]:
+        self._ensure_built()
+        return self.summary_dao.order_counts(min_orders)
+
+_service: Optional[CustomerSummaryService] = None
+_service_lock = threading.Lock()
+
+def _shared_service() -> CustomerSummaryService:
+    global _service
+    with _service_lock:
+        if _service is None:
+            _service = CustomerSummaryService()
+        return _service
+
+def _on_order(order: Dict, **_) -> None:
+    _shared_service().record_order(order)
+
+def _on_refunded(order_id: int, **_) -> None:
+    _shared_service().record_refunded(order_id)
+
+def register() -> None:
+    for event in (order_events.ORDER_CREATED, order_events.ORDER_COMPLETED, order_events.ORDER_CANCELLED):
+        order_events.subscribe(event, _on_order)
+    order_events.subscribe(order_events.PAYMENT_REFUNDED, _on_refunded)
@@ -0,0 +1,157 @@
+import csv
+import gzip
+import json
+import os
+import time
+from typing import Dict, Iterator, List, Optional
+from src.dao.export_dao import ExportDAO, ExportDAOError, EXPORT_TABLES
+from src.dao.pagination import DEFAULT_PAGE_SIZE
+from src.dao.instrumentation import instrumented
+
+FORMATS = ("csv", "jsonl", "parquet")
+
+class ExportServiceError(Exception):
+    pass
+
+class _TextWriter:
+    def __init__(self, path: str, compress: bool):
+        self._f = gzip.open(path, "wt", encoding="utf-8", newline="") if compress \
+            else open(path, "w", encoding="utf-8", newline="")
+
+    def close(self) -> None:
+        self._f.close()
+
+class CsvWriter(_TextWriter):
+    def __init__(self, path: str, compress: bool = False):
+        super().__init__(path, compress)
+        self._csv = None
+
+    def write(self, row: Dict) -> None:
+        if self._csv is None:
+            # Header comes from the first row; every row of a table has the same columns
+            self._csv = csv.DictWriter(self._f, fieldnames=list(row), extrasaction="ignore")
+            self._csv.writeheader()
+        self._csv.writerow({k: (json.dumps(v) if isinstance(v, (dict, list)) else v) for k, v in row.items()})
+
+class JsonlWriter(_TextWriter):
+    def write(self, row: Dict) -> None:
+        self._f.write(json.dumps(row, default=str) + "\n")
+
+class ParquetWriter:
+    """
+    Buffers rows into row groups of batch_size and writes them with pyarrow.
+    pyarrow is optional and only imported when this format is used.
+    """
+    def __init__(self, path: str, compress: bool = False, batch_size: int = 50000):
+        try:
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+        except ImportError:
+            raise ExportServiceError("Parquet export needs pyarrow (pip install pyarrow)")
+        self._pa, self._pq = pa, pq
+        self.path = path
+        self.compression = "gzip" if compress else "snappy"
+        self.batch_size = batch_size
+        self._rows: List[Dict] = []
+        self._writer = None
+
+    def write(self, row: Dict) -> None:
+        self._rows.append(row)
+        if len(self._rows) >= self.batch_size:
+            self._flush()
+
+    def _flush(self) -> None:
+        if not self._rows:
+            return
+        if self._writer is None:
+            table = self._pa.Table.from_pylist(self._rows)
+            self._writer = self._pq.ParquetWriter(self.path, table.schema, compression=self.compression)
+        else:
+            table = self._pa.Table.from_pylist(self._rows, schema=self._writer.schema)
+        self._writer.write_table(table)
+        self._rows = []
+
+    def close(self) -> None:
+        self._flush()
+        if self._writer is not None:
+            self._writer.close()
+
+def open_writer(path: str, fmt: str, compress: bool):
+    if fmt == "csv":
+        return CsvWriter(path, compress)
+    if fmt == "jsonl":
+        return JsonlWriter(path, compress)
+    if fmt == "parquet":
+        return ParquetWriter(path, compress)
+    raise ExportServiceError(f"Unsupported format: {fmt} (use one of {', '.join(FORMATS)})")
+
+def export_path(out_dir: str, table: str, fmt: str, compress: bool, since_id: Optional[int] = None) -> str:
+    # Incremental runs get their own file instead of overwriting the last one
+    name = f"{table}.{fmt}" if since_id is None else f"{table}.after-{since_id}.{fmt}"
+    if compress and fmt != "parquet":
+        name += ".gz"
+    return os.path.join(out_dir, name)
+
+@instrumented
+class ExportService:
+    """
+    Streams tables to files page by page. With a state file, each table's last
+    exported key is remembered so the next run only picks up newer rows.
+    """
+    def __init__(self, page_size: int = DEFAULT_PAGE_SIZE):
+        self.dao = ExportDAO()
+        self.page_size = page_size
+
+    def load_state(self, path: Optional[str]) -> Dict:
+        if not path or not os.path.exists(path):
+            return {}
+        try:
+            with open(path) as f:
+                return json.load(f)
+        except (OSError, ValueError) as e:
+            raise ExportServiceError(f"Cannot read state file {path}: {e}")
+
+    def save_state(self, path: str, state: Dict) -> None:
+        tmp = path + ".tmp"
+        with open(tmp, "w") as f:
+            json.dump(state, f, indent=2)
+        os.replace(tmp, path)
+
+    def export_table(self, table: str, out_dir: str, fmt: str = "jsonl", compress: bool = False,
+                     columns: str = "*", since_id: Optional[int] = None, since: Optional[str] = None) -> Dict:
+        if fmt not in FORMATS:
+            raise ExportServiceError(f"Unsupported format: {fmt} (use one of {', '.join(FORMATS)})")
+        key = EXPORT_TABLES.get(table)
+        if key is None:
+            raise ExportServiceError(f"Unknown table: {table} (use one of {', '.join(EXPORT_TABLES)})")
+        os.makedirs(out_dir, exist_ok=True)
+        path = export_path(out_dir, table, fmt, compress, since_id)
+        started = time.monotonic()
+        rows, last_id = 0, since_id
+        writer = open_writer(path, fmt, compress)
+        try:
+            for row in self.dao.iter_table(table, columns, since_id, since, self.page_size):
+                writer.write(row)
+                rows += 1
+                last_id = row[key]
+        except ExportDAOError as e:
+            raise ExportServiceError(str(e))
+        finally:
+            writer.close()
+        return {"table": table, "path": path, "rows": rows, "last_id": last_id,
+                "seconds": round(time.monotonic() - started, 3)}
+
+    def export(self, tables: List[str], out_dir: str, fmt: str = "jsonl", compress: bool = False,
+               columns: str = "*", since_id: Optional[int] = None, since: Optional[str] = None,
+               state_path: Optional[str] = None) -> Iterator[Dict]:
+        """
+        Export each table in turn, yielding its stats. The state file is updated after every table.
+        """
+        state = self.load_state(state_path)
+        for table in tables:
+            start_id = since_id if since_id is not None else state.get(table)
+            result = self.export_table(table, out_dir, fmt, compress, columns, start_id, since)
+            if state_path and result["last_id"] is not None:
+                state[table] = result["last_id"]
+                self.save_state(state_path, state)
+            yield result
@@ -0,0 +1,257 @@
+import csv
+import gzip
+import json
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from typing import Callable, Dict, Iterator, List, Optional, Tuple
+from src.dao.product_dao import ProductDAO
+from src.dao.customer_index import IndexedCustomerDAO
+from src.dao.instrumentation import instrumented
+from src.dao.retry import with_retries
+from src.dao.writes import map_integrity_error
+
+class ImportServiceError(Exception):
+    pass
+
+class RowError(Exception):
+    pass
+
+def detect_format(path: str, fmt: Optional[str] = None) -> str:
+    if fmt:
+        fmt = fmt.lower()
+    else:
+        name = path[:-3] if path.endswith(".gz") else path
+        fmt = "jsonl" if name.endswith((".jsonl", ".ndjson", ".json")) else "csv"
+    if fmt not in ("csv", "jsonl"):
+        raise ImportServiceError(f"Unsupported format: {fmt} (use csv or jsonl)")
+    return fmt
+
+def _open_text(path: str, mode: str = "rt"):
+    if path.endswith(".gz"):
+        return gzip.open(path, mode, encoding="utf-8", newline="")
+    return open(path, mode, encoding="utf-8", newline="")
+
+def read_rows(path: str, fmt: Optional[str] = None) -> Iterator[Tuple[int, Dict]]:
+    """
+    Stream (line_number, row) pairs from a CSV or JSONL file (optionally .gz).
+    Malformed JSON lines come back as {"__error__": message}.
+    """
+    fmt = detect_format(path, fmt)
+    try:
+        with _open_text(path) as f:
+            if fmt == "csv":
+                for n, row in enumerate(csv.DictReader(f), start=2):
+                    yield n, {k.strip(): (v.strip() if isinstance(v, str) else v) for k, v in row.items() if k}
+            else:
+                for n, line in enumerate(f, start=1):
+                    if not line.strip():
+                        continue
+                    try:
+                        row = json.loads(line)
+                    except ValueError as e:
+                        row = {"__error__": f"Invalid JSON: {e}"}
+                    yield n, row if isinstance(row, dict) else {"__error__": "Expected a JSON object"}
+    except OSError as e:
+        raise ImportServiceError(f"Cannot read {path}: {e}")
+
+def chunked(rows: Iterator, size: int) -> Iterator[List]:
+    chunk = []
+    for row in rows:
+        chunk.append(row)
+        if len(chunk) >= size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+def _blank(v) -> bool:
+    return v is None or (isinstance(v, str) and not v.strip())
+
+def clean_product(row: Dict) -> Dict:
+    if not row.get("name") or not row.get("sku"):
+        raise RowError("name and sku are required")
+    try:
+        price = float(row.get("price"))
+    except (TypeError, ValueError):
+        raise RowError(f"Invalid price: {row.get('price')!r}")
+    if price <= 0:
+        raise RowError("Price must be greater than 0")
+    try:
+        stock = 0 if _blank(row.get("stock")) else int(row.get("stock"))
+    except (TypeError, ValueError):
+        raise RowError(f"Invalid stock: {row.get('stock')!r}")
+    if stock < 0:
+        raise RowError("Stock cannot be negative")
+    out = {"name": str(row["name"]), "sku": str(row["sku"]), "price": price, "stock": stock}
+    if not _blank(row.get("category")):
+        out["category"] = row["category"]
+    return out
+
+def clean_customer(row: Dict) -> Dict:
+    if not row.get("name") or not row.get("email"):
+        raise RowError("Name and email are required")
+    return {
+        "name": str(row["name"]),
+        "email": str(row["email"]).strip(),
+        "phone": None if _blank(row.get("phone")) else str(row["phone"]),
+        "city": None if _blank(row.get("city")) else str(row["city"]),
+    }
+
+class RejectWriter:
+    """
+    Thread-safe rejected-rows report; .csv paths get CSV, anything else JSONL.
+    """
+    def __init__(self, path: Optional[str]):
+        self.path = path
+        self.count = 0
+        self._lock = threading.Lock()
+        self._f = _open_text(path, "wt") if path else None
+        self._csv = None
+
+    def write(self, line: int, row: Dict, reason: str) -> None:
+        with self._lock:
+            self.count += 1
+            if not self._f:
+                return
+            record = {"line": line, "reason": reason, **{k: v for k, v in row.items() if k != "__error__"}}
+            if self.path.endswith((".csv", ".csv.gz")):
+                if self._csv is None:
+                    self._csv = csv.DictWriter(self._f, fieldnames=list(record), extrasaction="ignore")
+                    self._csv.writeheader()
+                self._csv.writerow(record)
+            else:
+                self._f.write(json.dumps(record, default=str) + "\n")
+
+    def close(self) -> None:
+        if self._f:
+            self._f.close()
+
+@instrumented
+class ImportService:
+    """
+    Streaming bulk loader. Rows are read and validated in chunks, deduplicated
+    locally, checked against the database with one in_() query per chunk and
+    written with one bulk insert (or upsert) per chunk on a small thread pool.
+    """
+    def __init__(self, batch_size: int = 500, workers: int = 4):
+        if batch_size <= 0 or workers <= 0:
+            raise ImportServiceError("batch_size and workers must be positive")
+        self.batch_size = batch_size
+        self.workers = workers
+        self._product_dao = None
+        self._customer_dao = None
+
+    @property
+    def product_dao(self) -> ProductDAO:
+        if self._product_dao is None:
+            self._product_dao = ProductDAO()
+        return self._product_dao
+
+    @property
+    def customer_dao(self) -> IndexedCustomerDAO:
+        if self._customer_dao is None:
+            self._customer_dao = IndexedCustomerDAO()
+        return self._customer_dao
+
+    def import_products(self, path: str, fmt: Optional[str] = None, upsert: bool = False,
+                        rejects_path: Optional[str] = None) -> Dict:
+        dao = self.product_dao
+        return self._run(read_rows(path, fmt), "sku", clean_product, dao.existing_skus,
+                         dao.bulk_create_products, upsert, rejects_path)
+
+    def import_customers(self, path: str, fmt: Optional[str] = None, upsert: bool = False,
+                         rejects_path: Optional[str] = None, warm_index: bool = False) -> Dict:
+        """
+        With warm_index, the customer index is loaded first (one paged scan) so
+        chunks only check emails its Bloom filter can't rule out.
+        """
+        dao = self.customer_dao
+        if warm_index and not dao.index.warm:
+            dao.warm()
+        return self._run(read_rows(path, fmt), "email", clean_customer, dao.existing_emails,
+                         dao.bulk_create_customers, upsert, rejects_path)
+
+    def _run(self, rows: Iterator[Tuple[int, Dict]], key: str, clean: Callable[[Dict], Dict],
+             existing: Callable[[List[str]], set], insert: Callable[[List[Dict], bool], List[Dict]],
+             upsert: bool, rejects_path: Optional[str]) -> Dict:
+        started = time.monotonic()
+        rejects = RejectWriter(rejects_path)
+        stats = {"read": 0, "inserted": 0, "rejected": 0, "batches": 0}
+        stats_lock = threading.Lock()
+        seen = set()
+
+        def load(batch: List[Tuple[int, Dict, Dict]]) -> None:
+            if not upsert:
+                try:
+                    found = with_retries(existing, [clean_row[key] for _, _, clean_row in batch])
+                except Exception as e:
+                    raise ImportServiceError(f"Failed to check existing {key}s (line {batch[0][0]} on): {e}")
+                kept = []
+                for line, raw, clean_row in batch:
+                    if clean_row[key] in found:
+                        rejects.write(line, raw, f"{key} already exists: {clean_row[key]}")
+                    else:
+                        kept.append((line, raw, clean_row))
+                batch = kept
+            written = self._insert_batch(batch, insert, upsert, rejects)
+            with stats_lock:
+                stats["inserted"] += written
+                stats["batches"] += 1
+
+        try:
+            with ThreadPoolExecutor(max_workers=self.workers) as pool:
+                pending = set()
+                for chunk in chunked(rows, self.batch_size):
+                    batch = []
+                    for line, raw in chunk:
+                        stats["read"] += 1
+                        if "__error__" in raw:
+                            rejects.write(line, raw, raw["__error__"])
+                            continue
+                        try:
+                            clean_row = clean(raw)
+                        except RowError as e:
+                            rejects.write(line, raw, str(e))
+                            continue
+                        if clean_row[key] in seen:
+                            rejects.write(line, raw, f"Duplicate {key} in file: {clean_row[key]}")
+                            continue
+                        seen.add(clean_row[key])
+                        batch.append((line, raw, clean_row))
+                    if not batch:
+                        continue
+                    # Bound the work in flight so a huge file doesn't pile up in memory
+                    if len(pending) >= self.workers * 2:
+                        done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                        for fut in done:
+                            fut.result()
+                    pending.add(pool.submit(load, batch))
+                for fut in pending:
+                    fut.result()
+        finally:
+            rejects.close()
+
+        stats["rejected"] = rejects.count
+        stats["seconds"] = round(time.monotonic() - started, 3)
+        return stats
+
+    def _insert_batch(self, batch: List[Tuple[int, Dict, Dict]], insert, upsert: bool, rejects: RejectWriter) -> int:
+        if not batch:
+            return 0
+        try:
+            # Transient failures are retried whole; a plain insert only if it was never sent
+            return len(with_retries(insert, [clean_row for _, _, clean_row in batch], upsert, idempotent=upsert))
+        except Exception as e:
+            error = map_integrity_error(e, RowError)
+            if not isinstance(error, RowError):
+                # Not caused by the rows themselves: splitting the chunk wouldn't help
+                raise ImportServiceError(f"Failed to write rows (line {batch[0][0]} on): {e}")
+            if len(batch) == 1:
+                line, raw, _ = batch[0]
+                rejects.write(line, raw, str(error))
+                return 0
+            # Split the chunk to isolate the bad rows; good rows still go in as bulk writes
+            mid = len(batch) // 2
+            return self._insert_batch(batch[:mid], insert, upsert, rejects) + \
+                self._insert_batch(batch[mid:], insert, upsert, rejects)
@@ -0,0 +1,299 @@
+import multiprocessing
+import os
+import queue
+import threading
+import time
+from typing import Dict, Iterator, List, Optional, Tuple
+from src.services.import_service import RejectWriter, chunked, read_rows, ImportServiceError
+
+# Worker processes; each owns a set of products so their stock rows aren't contended
+INGEST_WORKERS = int(os.getenv("INGEST_WORKERS", "4"))
+# Chunks buffered per worker before the feed reader blocks (backpressure)
+INGEST_QUEUE_SIZE = int(os.getenv("INGEST_QUEUE_SIZE", "8"))
+# Orders per message to a worker
+INGEST_CHUNK_SIZE = int(os.getenv("INGEST_CHUNK_SIZE", "50"))
+
+class IngestServiceError(Exception):
+    pass
+
+class OrderRecordError(Exception):
+    pass
+
+def parse_items(value) -> List[Dict[str, int]]:
+    """
+    Accepts [{"prod_id"|"product_id": n, "quantity": q}, ...] or ["pid:qty", ...].
+    """
+    if not isinstance(value, list) or not value:
+        raise OrderRecordError("items must be a non-empty list")
+    items = []
+    for item in value:
+        try:
+            if isinstance(item, str):
+                pid, qty = item.split(":")
+            else:
+                pid, qty = item.get("prod_id", item.get("product_id")), item.get("quantity")
+            pid, qty = int(pid), int(qty)
+        except (AttributeError, TypeError, ValueError):
+            raise OrderRecordError(f"Invalid item: {item!r}")
+        if qty <= 0:
+            raise OrderRecordError(f"Quantity must be positive: {item!r}")
+        items.append({"prod_id": pid, "quantity": qty})
+    return items
+
+def parse_order(record: Dict) -> Tuple[int, List[Dict[str, int]]]:
+    if "__error__" in record:
+        raise OrderRecordError(record["__error__"])
+    try:
+        customer_id = int(record.get("customer_id"))
+    except (TypeError, ValueError):
+        raise OrderRecordError(f"Invalid customer_id: {record.get('customer_id')!r}")
+    return customer_id, parse_items(record.get("items"))
+
+class Partitioner:
+    """
+    Routes orders so that each product's stock is only written by one worker.
+    A product is owned by the partition that first sees it (the least loaded
+    one); an order goes to the partition owning most of its lines. Orders that
+    span owners still work (stock reservation is atomic) and are counted.
+    """
+    def __init__(self, partitions: int):
+        self.partitions = partitions
+        self.owner: Dict[int, int] = {}
+        self.load = [0] * partitions
+        self.cross_partition = 0
+
+    def assign(self, items: List[Dict[str, int]]) -> int:
+        votes: Dict[int, int] = {}
+        for item in items:
+            part = self.owner.get(item["prod_id"])
+            if part is not None:
+                votes[part] = votes.get(part, 0) + 1
+        if votes:
+            part = max(sorted(votes), key=votes.get)
+            if len(votes) > 1:
+                self.cross_partition += 1
+        else:
+            part = min(range(self.partitions), key=self.load.__getitem__)
+        for item in items:
+            self.owner.setdefault(item["prod_id"], part)
+        self.load[part] += 1
+        return part
+
+def _create_orders(svc, chunk: List[Tuple]) -> List[Tuple]:
+    """
+    Run create_order for each (line, record, customer_id, items); returns
+    (line, record, order_id, error, seconds) per order.
+    """
+    results = []
+    for line, record, customer_id, items in chunk:
+        started = time.perf_counter()
+        try:
+            order = svc.create_order(customer_id, items)
+            results.append((line, None, order.get("order_id"), None, time.perf_counter() - started))
+        except Exception as e:
+            results.append((line, record, None, str(e) or type(e).__name__, time.perf_counter() - started))
+    return results
+
+def _worker_main(partition: int, inbox, outbox) -> None:
+    from src import config
+    from src.services.order_service import OrderService
+    # A forked child must not reuse the parent's HTTP connections
+    config.reset_supabase()
+    from src.dao.stock_journal import close_stock_journal
+    from src.services import order_events
+    svc = OrderService()
+    try:
+        while True:
+            chunk = inbox.get()
+            if chunk is None:
+                break
+            outbox.put((partition, _create_orders(svc, chunk)))
+    finally:
+        # Forked workers exit without atexit: apply queued order events and
+        # write buffered stock increments before going
+        order_events.flush(order_events.ORDER_EVENTS_EXIT_TIMEOUT)
+        close_stock_journal()
+    outbox.put((partition, None))
+
+class _Stats:
+    def __init__(self, partitions: int, dead_letters: RejectWriter):
+        self.dead_letters = dead_letters
+        self.read = self.invalid = self.submitted = self.created = self.failed = 0
+        self.per_partition = [0] * partitions
+        self.latencies: List[float] = []
+        self.backpressure = 0.0
+        self.crashed: List[int] = []
+        # Orders handed to each worker and not yet reported back: line -> record
+        self.outstanding: List[Dict[int, Dict]] = [{} for _ in range(partitions)]
+        self._lock = threading.Lock()
+
+    def sent(self, partition: int, chunk: List[Tuple]) -> None:
+        with self._lock:
+            if partition in self.crashed:
+                for line, record, _, _ in chunk:
+                    self.failed += 1
+                    self.dead_letters.write(line, record, "Ingest worker for this order's products exited")
+                return
+            self.outstanding[partition].update((line, record) for line, record, _, _ in chunk)
+
+    def record(self, partition: int, results: List[Tuple]) -> None:
+        with self._lock:
+            for line, record, order_id, error, seconds in results:
+                self.outstanding[partition].pop(line, None)
+                self.latencies.append(seconds)
+                self.per_partition[partition] += 1
+                if error is None:
+                    self.created += 1
+                else:
+                    self.failed += 1
+                    self.dead_letters.write(line, record, error)
+
+    def lost(self, partition: int) -> None:
+        """
+        A worker died: everything it hadn't reported goes to the dead letters.
+        Some of those orders may have been created just before the crash.
+        """
+        with self._lock:
+            self.crashed.append(partition)
+            for line, record in sorted(self.outstanding[partition].items()):
+                self.failed += 1
+                self.dead_letters.write(line, record, "Ingest worker exited before confirming this order; "
+                                                      "check whether it was created before re-feeding")
+            self.outstanding[partition].clear()
+
+    def summary(self, started: float, partitioner: Partitioner, workers: int) -> Dict:
+        elapsed = time.monotonic() - started
+        ordered = sorted(self.latencies)
+        pct = lambda q: round(ordered[min(len(ordered) - 1, int(q * len(ordered)))] * 1000, 2) if ordered else 0.0
+        return {
+            "read": self.read,
+            "invalid": self.invalid,
+            "submitted": self.submitted,
+            "created": self.created,
+            "failed": self.failed,
+            "dead_letters": self.dead_letters.count,
+            "workers": workers,
+            "per_worker": self.per_partition,
+            "crashed_workers": sorted(self.crashed),
+            "cross_partition_orders": partitioner.cross_partition,
+            "backpressure_s": round(self.backpressure, 3),
+            "order_p50_ms": pct(0.50),
+            "order_p99_ms": pct(0.99),
+            "seconds": round(elapsed, 3),
+            "orders_per_s": round(self.created / elapsed, 1) if elapsed else None,
+        }
+
+class IngestService:
+    """
+    Streams a JSONL order feed into create_order across worker processes.
+
+    Each line is {"customer_id": n, "items": [...]} (see parse_items); invalid
+    lines and failed orders go to the dead-letter file with the reason, and
+    that file can be fed back in as-is. Orders are partitioned by product
+    (see Partitioner), sent in chunks over one bounded queue per worker, and
+    the reader blocks when a worker falls behind. workers=0 runs inline.
+    """
+    def __init__(self, workers: int = INGEST_WORKERS, queue_size: int = INGEST_QUEUE_SIZE,
+                 chunk_size: int = INGEST_CHUNK_SIZE):
+        if workers < 0 or queue_size <= 0 or chunk_size <= 0:
+            raise IngestServiceError("workers must be >= 0, queue_size and chunk_size positive")
+        self.workers = workers
+        self.queue_size = queue_size
+        self.chunk_size = chunk_size
+
+    def _orders(self, path: str, stats: _Stats) -> Iterator[Tuple]:
+        try:
+            for line, record in read_rows(path, "jsonl"):
+                stats.read += 1
+                try:
+                    customer_id, items = parse_order(record)
+                except OrderRecordError as e:
+                    stats.invalid += 1
+                    stats.dead_letters.write(line, record, str(e))
+                    continue
+                yield line, record, customer_id, items
+        except ImportServiceError as e:
+            raise IngestServiceError(str(e))
+
+    def ingest(self, path: str, dead_letter_path: Optional[str] = None) -> Dict:
+        started = time.monotonic()
+        partitions = max(1, self.workers)
+        partitioner = Partitioner(partitions)
+        dead_letters = RejectWriter(dead_letter_path)
+        stats = _Stats(partitions, dead_letters)
+        try:
+            if self.workers == 0:
+                self._run_inline(path, stats)
+            else:
+                self._run_pool(path, stats, partitioner)
+        finally:
+            dead_letters.close()
+        return stats.summary(started, partitioner, self.workers)
+
+    def _run_inline(self, path: str, stats: _Stats) -> None:
+        from src.services.order_service import OrderService
+        svc = OrderService()
+        for chunk in chunked(self._orders(path, stats), self.chunk_size):
+            stats.submitted += len(chunk)
+            stats.record(0, _create_orders(svc, chunk))
+
+    def _run_pool(self, path: str, stats: _Stats, partitioner: Partitioner) -> None:
+        ctx = multiprocessing.get_context("fork" if hasattr(os, "fork") else "spawn")
+        inboxes = [ctx.Queue(maxsize=self.queue_size) for _ in range(self.workers)]
+        outbox = ctx.Queue()
+        procs = [ctx.Process(target=_worker_main, args=(i, inboxes[i], outbox), daemon=True)
+                 for i in range(self.workers)]
+        for p in procs:
+            p.start()
+        collector = threading.Thread(target=self._collect, args=(outbox, procs, stats), daemon=True)
+        collector.start()
+
+        pending: List[List[Tuple]] = [[] for _ in range(self.workers)]
+        try:
+            for order in self._orders(path, stats):
+                part = partitioner.assign(order[3])
+                pending[part].append(order)
+                stats.submitted += 1
+                if len(pending[part]) >= self.chunk_size:
+                    self._send(inboxes[part], procs[part], part, pending[part], stats)
+                    pending[part] = []
+            for part, chunk in enumerate(pending):
+                if chunk:
+                    self._send(inboxes[part], procs[part], part, chunk, stats)
+        finally:
+            for part in range(self.workers):
+                self._send(inboxes[part], procs[part], part, None, stats)
+            collector.join()
+            for p in procs:
+                p.join()
+
+    def _send(self, inbox, proc, partition: int, chunk: Optional[List[Tuple]], stats: _Stats) -> None:
+        if chunk is not None:
+            stats.sent(partition, chunk)
+        started = time.monotonic()
+        try:
+            # A full queue blocks the reader (backpressure) until the worker catches up
+            while proc.is_alive():
+                try:
+                    inbox.put(chunk, timeout=1)
+                    return
+                except queue.Full:
+                    continue
+        finally:
+            stats.backpressure += time.monotonic() - started
+
+    def _collect(self, outbox, procs, stats: _Stats) -> None:
+        running = set(range(len(procs)))
+        while running:
+            try:
+                partition, results = outbox.get(timeout=1)
+            except queue.Empty:
+                for i in sorted(running):
+                    if not procs[i].is_alive() and procs[i].exitcode not in (None, 0):
+                        running.discard(i)
+                        stats.lost(i)
+                continue
+            if results is None:
+                running.discard(partition)
+            else:
+                stats.record(partition, results)
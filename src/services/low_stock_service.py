@@ -0,0 +1,154 @@
+import heapq
+import json
+import logging
+import threading
+from typing import Dict, List, Optional, Set
+from src.dao.product_dao import ProductDAO, LOW_STOCK_COLUMNS
+from src.dao.stock_dao import add_stock_listener, remove_stock_listener
+from src.dao.instrumentation import instrumented
+
+logger = logging.getLogger(__name__)
+
+class LowStockServiceError(Exception):
+    pass
+
+@instrumented
+class LowStockMonitor:
+    """
+    Tracks products at or below their reorder threshold.
+
+    refresh() asks the server for candidates (stock <= threshold, projected
+    columns only). After that, StockDAO changes keep an in-process min-heap of
+    stock levels current, so poll()/lowest() need no database round trip
+    except to look up products that turned low since refresh().
+    Threshold lookup order: per-product, then per-category, then the default.
+    """
+    def __init__(self, default_threshold: int = 5, category_thresholds: Optional[Dict[str, int]] = None,
+                 product_thresholds: Optional[Dict[int, int]] = None, dao: Optional[ProductDAO] = None):
+        self.default_threshold = default_threshold
+        self.category_thresholds = dict(category_thresholds or {})
+        self.product_thresholds = {int(k): v for k, v in (product_thresholds or {}).items()}
+        self.dao = dao or ProductDAO()
+        self._rows: Dict[int, Dict] = {}
+        self._heap: List[tuple] = []  # (stock, product_id); stale entries are skipped lazily
+        self._unknown: Set[int] = set()  # untracked products that may have turned low, looked up on poll
+        self._lock = threading.Lock()
+        add_stock_listener(self.record_stock)
+
+    @classmethod
+    def from_file(cls, path: str, dao: Optional[ProductDAO] = None) -> "LowStockMonitor":
+        """
+        Load thresholds from JSON: {"default": 5, "categories": {"Toys": 10}, "products": {"42": 3}}
+        """
+        try:
+            with open(path) as f:
+                cfg = json.load(f)
+        except (OSError, ValueError) as e:
+            raise LowStockServiceError(f"Cannot read thresholds file {path}: {e}")
+        return cls(cfg.get("default", 5), cfg.get("categories"), cfg.get("products"), dao)
+
+    def close(self) -> None:
+        remove_stock_listener(self.record_stock)
+
+    def threshold_for(self, row: Dict) -> int:
+        pid = row.get("product_id")
+        if pid in self.product_thresholds:
+            return self.product_thresholds[pid]
+        return self.category_thresholds.get(row.get("category"), self.default_threshold)
+
+    def refresh(self) -> List[Dict]:
+        """
+        Rebuild the tracked set from the database and return the low-stock products.
+        """
+        # The scan below sees these products' current stock
+        with self._lock:
+            self._unknown.clear()
+        candidates: Dict[int, Dict] = {}
+        for row in self.dao.iter_low_stock(self.default_threshold):
+            candidates[row["product_id"]] = row
+        for category, threshold in self.category_thresholds.items():
+            if threshold > self.default_threshold:
+                for row in self.dao.iter_low_stock(threshold, category=category):
+                    candidates[row["product_id"]] = row
+        for row in self.dao.get_products_by_ids(list(self.product_thresholds), LOW_STOCK_COLUMNS):
+            candidates[row["product_id"]] = row
+
+        with self._lock:
+            self._rows = candidates
+            self._heap = [((r.get("stock") or 0), pid) for pid, r in candidates.items()]
+            heapq.heapify(self._heap)
+        return self.poll()
+
+    def record_stock(self, prod_id: int, stock: int) -> None:
+        """
+        Stock listener: update one product's level in O(log n). It runs inside
+        every stock write, so it never touches the database: a product not
+        tracked yet that could be low is queued, and its row (category
+        included, for the right threshold) is fetched by the next poll().
+        """
+        with self._lock:
+            row = self._rows.get(prod_id)
+            if row is None:
+                highest = self.product_thresholds.get(prod_id, max([self.default_threshold,
+                                                                    *self.category_thresholds.values()]))
+                if stock <= highest:
+                    self._unknown.add(prod_id)
+                return
+            row["stock"] = stock
+            self._push(prod_id, stock)
+
+    def _push(self, prod_id: int, stock: int) -> None:
+        heapq.heappush(self._heap, (stock, prod_id))
+        if len(self._heap) > 2 * len(self._rows) + 64:
+            self._compact()
+
+    def _resolve_unknown(self) -> None:
+        """
+        Start tracking the queued products, fetched in one request.
+        """
+        with self._lock:
+            pids, self._unknown = self._unknown, set()
+        if not pids:
+            return
+        try:
+            found = self.dao.get_products_by_ids(list(pids), LOW_STOCK_COLUMNS)
+        except Exception:
+            logger.exception("Low-stock monitor could not look up %d product(s)", len(pids))
+            with self._lock:
+                self._unknown |= pids
+            return
+        with self._lock:
+            for row in found:
+                # The row is at least as new as the notification that queued it
+                if self._rows.setdefault(row["product_id"], row) is row:
+                    self._push(row["product_id"], row.get("stock") or 0)
+
+    def _compact(self) -> None:
+        self._heap = [((r.get("stock") or 0), pid) for pid, r in self._rows.items()]
+        heapq.heapify(self._heap)
+
+    def lowest(self, n: int = 10) -> List[Dict]:
+        """
+        The n tracked products with the least stock, lowest first.
+        """
+        self._resolve_unknown()
+        with self._lock:
+            out, seen = [], set()
+            for stock, pid in heapq.nsmallest(n + len(self._heap) - len(self._rows), self._heap):
+                row = self._rows.get(pid)
+                if pid in seen or row is None or (row.get("stock") or 0) != stock:
+                    continue
+                seen.add(pid)
+                out.append(dict(row))
+                if len(out) == n:
+                    break
+            return out
+
+    def poll(self) -> List[Dict]:
+        """
+        Tracked products currently at or below their threshold, lowest stock first.
+        """
+        self._resolve_unknown()
+        with self._lock:
+            low = [dict(r) for r in self._rows.values() if (r.get("stock") or 0) <= self.threshold_for(r)]
+        return sorted(low, key=lambda r: ((r.get("stock") or 0), r["product_id"]))
@@ -0,0 +1,171 @@
+import atexit
+import importlib
+import logging
+import os
+import queue
+import threading
+import time
+from collections import defaultdict
+from typing import Callable, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+# Events published by the order and payment services:
+#   order_created(order, items)   order_completed(order)
+#   order_cancelled(order, items) payment_refunded(order_id, payment)
+ORDER_CREATED = "order_created"
+ORDER_COMPLETED = "order_completed"
+ORDER_CANCELLED = "order_cancelled"
+PAYMENT_REFUNDED = "payment_refunded"
+
+# "module:function" hooks that register subscribers; imported on the first publish.
+# Override with ORDER_EVENT_SUBSCRIBERS (comma-separated, empty to disable).
+DEFAULT_SUBSCRIBERS = [
+    "src.services.revenue_service:register",
+    "src.services.customer_summary_service:register",
+    "src.services.bestseller_service:register",
+]
+
+# Subscribers run on a background thread, in publish order, so their local-store
+# writes stay off the request path. ORDER_EVENTS_SYNC=1 runs them inside publish().
+ORDER_EVENTS_SYNC = os.getenv("ORDER_EVENTS_SYNC", "0") == "1"
+# How long process exit waits for queued events to be applied (seconds)
+ORDER_EVENTS_EXIT_TIMEOUT = float(os.getenv("ORDER_EVENTS_EXIT_TIMEOUT", "30"))
+
+_subscribers: Dict[str, List[Callable]] = defaultdict(list)
+# Handlers called once with every payload of a publish_many (batch operations)
+_batch_subscribers: Dict[str, List[Callable]] = defaultdict(list)
+_defaults_loaded = False
+_lock = threading.Lock()
+
+_queue: "queue.SimpleQueue" = queue.SimpleQueue()
+_published = _applied = 0  # events queued / handed to every subscriber so far
+_applied_cond = threading.Condition()
+_worker: Optional[threading.Thread] = None
+
+def subscribe(event: str, handler: Callable) -> None:
+    with _lock:
+        if handler not in _subscribers[event]:
+            _subscribers[event].append(handler)
+
+def unsubscribe(event: str, handler: Callable) -> None:
+    with _lock:
+        if handler in _subscribers[event]:
+            _subscribers[event].remove(handler)
+
+def subscribe_batch(event: str, handler: Callable) -> None:
+    """
+    handler(payloads) gets the list of payloads of each publish_many, and
+    [payload] for a single publish, so it can fetch what it needs in one go.
+    """
+    with _lock:
+        if handler not in _batch_subscribers[event]:
+            _batch_subscribers[event].append(handler)
+
+def unsubscribe_batch(event: str, handler: Callable) -> None:
+    with _lock:
+        if handler in _batch_subscribers[event]:
+            _batch_subscribers[event].remove(handler)
+
+def _load_defaults() -> None:
+    global _defaults_loaded
+    with _lock:
+        if _defaults_loaded:
+            return
+        _defaults_loaded = True
+    env = os.getenv("ORDER_EVENT_SUBSCRIBERS")
+    hooks = DEFAULT_SUBSCRIBERS if env is None else [h.strip() for h in env.split(",") if h.strip()]
+    for hook in hooks:
+        module, _, func = hook.partition(":")
+        try:
+            getattr(importlib.import_module(module), func)()
+        except Exception:
+            logger.exception("Could not register order event subscriber %s", hook)
+
+def publish(event: str, **payload) -> None:
+    """
+    Queue event for every subscriber. Subscribers keep derived data (rollups,
+    summaries) up to date, so a failing one is logged and never fails the order.
+    """
+    publish_many(event, [payload])
+
+def publish_many(event: str, payloads: List[Dict]) -> None:
+    """
+    Publish one event per payload (a batch operation): plain subscribers are
+    called per payload, batch subscribers once with all of them.
+    """
+    global _published
+    if not payloads:
+        return
+    if ORDER_EVENTS_SYNC:
+        _dispatch(event, payloads)
+        return
+    _start_worker()
+    with _applied_cond:
+        _published += 1
+        _queue.put((event, payloads))
+
+def flush(timeout: Optional[float] = None) -> bool:
+    """
+    Wait until every event published before this call has reached its
+    subscribers (later ones aren't waited for). Returns False if timeout ran out first.
+    """
+    deadline = None if timeout is None else time.monotonic() + timeout
+    with _applied_cond:
+        target = _published
+        while _applied < target:
+            remaining = None if deadline is None else deadline - time.monotonic()
+            if remaining is not None and remaining <= 0:
+                return False
+            _applied_cond.wait(remaining)
+    return True
+
+def _start_worker() -> None:
+    global _worker
+    with _lock:
+        if _worker is None or not _worker.is_alive():
+            _worker = threading.Thread(target=_run_worker, name="order-events", daemon=True)
+            _worker.start()
+
+def _run_worker() -> None:
+    global _applied
+    while True:
+        event, payloads = _queue.get()
+        try:
+            _dispatch(event, payloads)
+        finally:
+            with _applied_cond:
+                _applied += 1
+                _applied_cond.notify_all()
+
+def _dispatch(event: str, payloads: List[Dict]) -> None:
+    _load_defaults()
+    with _lock:
+        handlers = list(_subscribers.get(event, ()))
+        batch_handlers = list(_batch_subscribers.get(event, ()))
+    for payload in payloads:
+        for handler in handlers:
+            try:
+                handler(**payload)
+            except Exception:
+                logger.exception("Order event subscriber %r failed on %s", handler, event)
+    for handler in batch_handlers:
+        try:
+            handler(payloads)
+        except Exception:
+            logger.exception("Order event subscriber %r failed on %s", handler, event)
+
+def _flush_at_exit() -> None:
+    if not flush(ORDER_EVENTS_EXIT_TIMEOUT):
+        logger.warning("exiting with %d order event(s) not yet applied", _published - _applied)
+
+atexit.register(_flush_at_exit)
+
+def _reset_in_child() -> None:
+    # A forked child has no worker thread and must not replay the parent's queue
+    global _queue, _published, _applied, _applied_cond, _worker
+    _queue, _worker, _applied_cond = queue.SimpleQueue(), None, threading.Condition()
+    _published = _applied = 0
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_reset_in_child)
@@ -1,16 +1,55 @@
-from typing import List, Dict, Optional
+from itertools import chain
+from typing import List, Dict, Optional, Iterator
 from src.dao.order_dao import OrderDAO, OrderDAOError
-from src.dao.product_dao import ProductDAO, ProductDAOError
+from src.dao.product_dao import ProductDAOError
+from src.dao.product_cache import CachedProductDAO
 from src.dao.customer_dao import CustomerDAO, CustomerDAOError
+from src.dao.stock_dao import StockDAOError
+from src.dao.stock_journal import make_stock_dao
+from src.dao.pagination import DEFAULT_PAGE_SIZE
+from src.dao.instrumentation import instrumented
+from src.services import order_events
 
 class OrderServiceError(Exception):
     pass
 
+def shape_order_details(row: Dict) -> Dict:
+    """
+    Turn an order row with embedded customers/order_items/products into
+    the {order, customer, items} shape callers expect.
+    """
+    order = dict(row)
+    customer = order.pop("customers", None)
+    items = order.pop("order_items", None) or []
+
+    # Add product details to each order item
+    detailed_items = []
+    for item in sorted(items, key=lambda i: i.get("order_item_id") or 0):
+        detailed_items.append({
+            "order_item_id": item.get("order_item_id"),
+            "product": item.get("products"),
+            "quantity": item["quantity"]
+        })
+
+    return {
+        "order": order,
+        "customer": customer,
+        "items": detailed_items
+    }
+
+def priced_items(items: List[Dict], prices: Dict[int, float]) -> List[Dict]:
+    """
+    Order lines with the unit price the order total was computed from, for ORDER_CREATED.
+    """
+    return [dict(item, price=prices.get(item["prod_id"])) for item in items]
+
+@instrumented
 class OrderService:
-    def __init__(self):
+    def __init__(self, stock_dao=None):
         self.order_dao = OrderDAO()
-        self.product_dao = ProductDAO()
+        self.product_dao = CachedProductDAO()
         self.customer_dao = CustomerDAO()
+        self.stock_dao = stock_dao or make_stock_dao()
 
     def create_order(self, customer_id: int, items: List[Dict[str, int]]) -> Dict:
         # Validate customer exists
@@ -18,58 +57,60 @@ class OrderService:
         if not cust:
             raise OrderServiceError("Customer not found")
 
-        # Validate product stock and calculate total
-        for item in items:
-            prod_id = item["prod_id"]
-            quantity = item["quantity"]
-            product = self.product_dao.get_product_by_id(prod_id)
-            if not product:
-                raise OrderServiceError(f"Product with id {prod_id} not found")
-            stock = product.get("stock", 0)
-            if stock < quantity:
-                raise OrderServiceError(f"Not enough stock for product id {prod_id}")
-
-        # Deduct stock for each product
-        for item in items:
-            prod_id = item["prod_id"]
-            quantity = item["quantity"]
-            product = self.product_dao.get_product_by_id(prod_id)
-            new_stock = (product.get("stock") or 0) - quantity
-            self.product_dao.update_product(prod_id, {"stock": new_stock})
-
-        # Create order and order_items records
-        order = self.order_dao.create_order(customer_id, items)
+        # Reserve stock for every line atomically (all or nothing)
+        try:
+            self.stock_dao.reserve(items)
+        except StockDAOError as e:
+            raise OrderServiceError(str(e))
+
+        # Create order and order_items records; give the stock back if that fails
+        try:
+            prices = self.order_dao.get_prices(item["prod_id"] for item in items)
+            order = self.order_dao.create_order(customer_id, items, prices)
+        except Exception:
+            self.stock_dao.release(items)
+            raise
+        order_events.publish(order_events.ORDER_CREATED, order=order, items=priced_items(items, prices))
         return order
 
     def get_order_details(self, order_id: int) -> Dict:
-        order = self.order_dao.get_order_by_id(order_id)
-        if not order:
+        row = self.order_dao.get_order_with_details(order_id)
+        if not row:
             raise OrderServiceError("Order not found")
-
-        customer = self.customer_dao.get_customer_by_id(order["customer_id"])
-        items = self.order_dao.get_order_items(order_id)
-
-        # Add product details to each order item
-        detailed_items = []
-        for item in items:
-            prod = self.product_dao.get_product_by_id(item["product_id"])
-            detailed_items.append({
-                "order_item_id": item.get("order_item_id"),
-                "product": prod,
-                "quantity": item["quantity"]
-            })
-
-        return {
-            "order": order,
-            "customer": customer,
-            "items": detailed_items
-        }
+        return self._shape_details(row)
+
+    def get_orders_details(self, order_ids: List[int]) -> List[Dict]:
+        """
+        Hydrate many orders at once (exports, dashboards). Unknown ids are skipped.
+        """
+        return [self._shape_details(row) for row in self.order_dao.get_orders_with_details(order_ids)]
+
+    def _shape_details(self, row: Dict) -> Dict:
+        details = shape_order_details(row)
+        for item in details["items"]:
+            if item["product"]:
+                self.product_dao.cache.put(item["product"])
+        return details
+
+    def _check_customer(self, customer_id: int) -> None:
+        if not self.customer_dao.get_customer_by_id(customer_id):
+            raise OrderServiceError("Customer not found")
 
     def list_orders_by_customer(self, customer_id: int) -> List[Dict]:
-        cust = self.customer_dao.get_customer_by_id(customer_id)
-        if not cust:
-            raise OrderServiceError("Customer not found")
-        return self.order_dao.list_orders_by_customer(customer_id)
+        # Orders imply the customer exists; only an empty result needs the lookup
+        orders = self.order_dao.list_orders_by_customer(customer_id)
+        if not orders:
+            self._check_customer(customer_id)
+        return orders
+
+    def iter_orders_by_customer(self, customer_id: int, columns: str = "*",
+                                page_size: int = DEFAULT_PAGE_SIZE) -> Iterator[Dict]:
+        rows = self.order_dao.iter_orders_by_customer(customer_id, columns, page_size)
+        first = next(rows, None)
+        if first is None:
+            self._check_customer(customer_id)
+            return iter(())
+        return chain([first], rows)
 
     def cancel_order(self, order_id: int) -> Dict:
         order = self.order_dao.get_order_by_id(order_id)
@@ -78,18 +119,20 @@ class OrderService:
         if order["status"] != "PLACED":
             raise OrderServiceError("Only orders with status PLACED can be cancelled")
 
-        items = self.order_dao.get_order_items(order_id)
+        # Flip the status first so a concurrent cancel can't restore the stock twice
+        updated_order = self.order_dao.transition_order_status(order_id, "PLACED", "CANCELLED")
+        if not updated_order:
+            raise OrderServiceError("Only orders with status PLACED can be cancelled")
 
         # Restore product stock
-        for item in items:
-            prod_id = item["product_id"]
-            quantity = item["quantity"]
-            product = self.product_dao.get_product_by_id(prod_id)
-            new_stock = (product.get("stock") or 0) + quantity
-            self.product_dao.update_product(prod_id, {"stock": new_stock})
-
-        # Update order status
-        updated_order = self.order_dao.update_order_status(order_id, "CANCELLED")
+        items = self.order_dao.get_order_items(order_id)
+        if items:
+            try:
+                self.stock_dao.release(items)
+            except StockDAOError as e:
+                raise OrderServiceError(str(e))
+
+        order_events.publish(order_events.ORDER_CANCELLED, order=updated_order, items=items)
         return updated_order
 
     def complete_order(self, order_id: int) -> Dict:
@@ -99,5 +142,9 @@ class OrderService:
         if order["status"] != "PLACED":
             raise OrderServiceError("Only orders with status PLACED can be marked as Completed")
 
-        updated_order = self.order_dao.update_order_status(order_id, "COMPLETED")
+        # Conditional, so a concurrent cancel (which has already restored the stock) can't be overwritten
+        updated_order = self.order_dao.transition_order_status(order_id, "PLACED", "COMPLETED")
+        if not updated_order:
+            raise OrderServiceError("Only orders with status PLACED can be marked as Completed")
+        order_events.publish(order_events.ORDER_COMPLETED, order=updated_order)
         return updated_order
\ No newline at end of file
@@ -1,10 +1,25 @@
 from typing import Optional
 from src.dao.payment_dao import PaymentDAO, PaymentDAOError
 from src.dao.order_dao import OrderDAO, OrderDAOError
+from src.dao.retry import with_retries
+from src.dao.instrumentation import instrumented
+from src.services import order_events
+
+# Re-reads allowed when a concurrent worker moves the payment or order under us
+PAYMENT_STATE_ATTEMPTS = 3
 
 class PaymentServiceError(Exception):
     pass
 
+def refund_refusal(status: Optional[str]) -> str:
+    """
+    Why a payment with this status can't be refunded (only PAID ones can).
+    """
+    if status == "REFUNDED":
+        return "Payment already refunded"
+    return f"Only PAID payments can be refunded (payment is {status})"
+
+@instrumented
 class PaymentService:
     def __init__(self):
         self.payment_dao = PaymentDAO()
@@ -12,35 +27,94 @@ class PaymentService:
 
     def create_pending_payment(self, order_id: int, amount: float) -> dict:
         try:
-            return self.payment_dao.create_payment(order_id, amount)
+            # A plain insert: only retried when the request never reached the server
+            return with_retries(self.payment_dao.create_payment, order_id, amount, idempotent=False)
         except PaymentDAOError as e:
             raise PaymentServiceError(str(e))
 
-    def process_payment(self, order_id: int, method: str) -> dict:
+    def process_payment(self, order_id: int, method: str, idempotency_key: Optional[str] = None) -> dict:
+        """
+        Mark the order's payment PAID and the order COMPLETED.
+
+        Safe to retry: a call interrupted after the payment step is finished by the
+        next call, and a repeat with the same idempotency_key returns the original
+        result instead of an error. Every step is a conditional update, so workers
+        racing on one order never double-process it.
+        """
         if method not in ("Cash", "Card", "UPI"):
             raise PaymentServiceError("Invalid payment method")
+        if self.payment_dao.use_rpc:
+            return self._process_payment_rpc(order_id, method, idempotency_key)
 
-        order = self.order_dao.get_order_by_id(order_id)
-        if not order:
-            raise PaymentServiceError("Order not found")
-        if order["status"] != "PLACED":
-            raise PaymentServiceError("Payment can only be processed for orders with status PLACED")
+        for _ in range(PAYMENT_STATE_ATTEMPTS):
+            order = with_retries(self.order_dao.get_order_by_id, order_id)
+            if not order:
+                raise PaymentServiceError("Order not found")
+            payment = with_retries(self.payment_dao.get_payment_by_order, order_id)
+            if not payment:
+                raise PaymentServiceError("Payment record not found for order")
 
-        payment = self.payment_dao.get_payment_by_order(order_id)
-        if not payment:
-            raise PaymentServiceError("Payment record not found for order")
+            if payment["status"] == "PAID":
+                # Only a repeat of the call that paid (same key) may see success
+                same_request = idempotency_key is not None and payment.get("idempotency_key") == idempotency_key
+                if not same_request:
+                    raise PaymentServiceError("Payment already processed for order")
+                if order["status"] == "COMPLETED":
+                    return {"payment": payment, "order": order}
+                if order["status"] != "PLACED":
+                    raise PaymentServiceError("Payment already processed for order")
+                # Paid by an interrupted call with this key: finish the job
+                return self._complete_paid_order(order_id, payment)
 
-        updated_payment = self.payment_dao.update_payment(payment["payment_id"], "PAID", method)
-        updated_order = self.order_dao.update_order_status(order_id, "COMPLETED")
+            if order["status"] != "PLACED":
+                raise PaymentServiceError("Payment can only be processed for orders with status PLACED")
+            if payment["status"] != "PENDING":
+                raise PaymentServiceError("Payment already processed for order")
+            paid = with_retries(self.payment_dao.mark_paid, payment["payment_id"], method, idempotency_key)
+            if paid:
+                return self._complete_paid_order(order_id, paid)
+            # Another worker moved the payment first; look again
+        raise PaymentServiceError("Payment is being processed concurrently, try again")
 
+    def _complete_paid_order(self, order_id: int, payment: dict) -> dict:
+        updated_order = with_retries(self.order_dao.transition_order_status, order_id, "PLACED", "COMPLETED")
+        if updated_order:
+            # Only the call that made the transition announces it
+            order_events.publish(order_events.ORDER_COMPLETED, order=updated_order)
+        else:
+            # Either a retried update already applied, or someone else completed or cancelled it
+            updated_order = with_retries(self.order_dao.get_order_by_id, order_id)
+            if not updated_order or updated_order["status"] != "COMPLETED":
+                raise PaymentServiceError("Payment can only be processed for orders with status PLACED")
         return {
-            "payment": updated_payment,
+            "payment": payment,
             "order": updated_order
         }
 
+    def _process_payment_rpc(self, order_id: int, method: str, idempotency_key: Optional[str]) -> dict:
+        try:
+            result = with_retries(self.payment_dao.process_payment_rpc, order_id, method, idempotency_key)
+        except PaymentDAOError as e:
+            raise PaymentServiceError(str(e))
+        except Exception as e:
+            raise PaymentServiceError(getattr(e, "message", None) or str(e))
+        if not result.get("replayed"):
+            order_events.publish(order_events.ORDER_COMPLETED, order=result["order"])
+        return {
+            "payment": result["payment"],
+            "order": result["order"]
+        }
+
     def refund_payment(self, order_id: int) -> dict:
         payment = self.payment_dao.get_payment_by_order(order_id)
         if not payment:
             raise PaymentServiceError("Payment record not found for order")
-        updated_payment = self.payment_dao.update_payment(payment["payment_id"], "REFUNDED")
+        if payment["status"] != "PAID":
+            raise PaymentServiceError(refund_refusal(payment["status"]))
+        # Conditional on PAID, so two refunds racing on one payment publish one event
+        updated_payment = self.payment_dao.mark_refunded(payment["payment_id"])
+        if not updated_payment:
+            current = self.payment_dao.get_payment_by_order(order_id) or {}
+            raise PaymentServiceError(refund_refusal(current.get("status")))
+        order_events.publish(order_events.PAYMENT_REFUNDED, order_id=order_id, payment=updated_payment)
         return updated_payment
\ No newline at end of file
@@ -1,27 +1,73 @@
-from typing import List, Dict, Optional
-import src.dao.product_dao as product_dao
+from typing import List, Dict, Optional, Iterator
+from src.dao.product_dao import ProductDAOError
+from src.dao.product_cache import CachedProductDAO
+from src.dao.stock_dao import StockDAOError
+from src.dao.stock_journal import make_stock_dao
+from src.dao.pagination import DEFAULT_PAGE_SIZE
+from src.dao.instrumentation import instrumented
 
-class ProductError(Exception):
+class ProductServiceError(Exception):
     pass
 
+# Older name, kept for callers that still import it
+ProductError = ProductServiceError
+
+@instrumented
 class ProductService:
+    def __init__(self):
+        self.dao = CachedProductDAO()
+        self.stock_dao = make_stock_dao()
+        # With write-behind stock, reads add the increments still waiting to be flushed
+        self.journal = getattr(self.stock_dao, "journal", None)
+
+    def _project(self, row: Optional[Dict]) -> Optional[Dict]:
+        return self.journal.project(row) if self.journal else row
+
     def add_product(self, name: str, sku: str, price: float, stock: int = 0, category: Optional[str] = None) -> Dict:
         if price <= 0:
-            raise ProductError("Price must be greater than 0")
-        existing = product_dao.get_product_by_sku(sku)
-        if existing:
-            raise ProductError(f"SKU already exists: {sku}")
-        return product_dao.create_product(name, sku, price, stock, category)
+            raise ProductServiceError("Price must be greater than 0")
+        try:
+            return self.dao.create_product(name, sku, price, stock, category)
+        except ProductDAOError as e:
+            raise ProductServiceError(str(e))
+
+    def get_product(self, prod_id: int) -> Optional[Dict]:
+        return self._project(self.dao.get_product_by_id(prod_id))
 
     def restock_product(self, prod_id: int, delta: int) -> Dict:
         if delta <= 0:
-            raise ProductError("Delta must be positive")
-        p = product_dao.get_product_by_id(prod_id)
-        if not p:
-            raise ProductError("Product not found")
-        new_stock = (p.get("stock") or 0) + delta
-        return product_dao.update_product(prod_id, {"stock": new_stock})
-
-    def get_low_stock(self, threshold: int = 5) -> List[Dict]:
-        allp = product_dao.list_products(limit=1000)
-        return [p for p in allp if (p.get("stock") or 0) <= threshold]
+            raise ProductServiceError("Delta must be positive")
+        try:
+            self.stock_dao.adjust_stock(prod_id, delta)
+        except StockDAOError as e:
+            raise ProductServiceError(str(e))
+        return self.get_product(prod_id)
+
+    def list_products(self, limit: int = 100, category: Optional[str] = None) -> List[Dict]:
+        return self.dao.list_products(limit=limit, category=category)
+
+    def iter_products(self, category: Optional[str] = None, columns: str = "*",
+                      page_size: int = DEFAULT_PAGE_SIZE) -> Iterator[Dict]:
+        return self.dao.iter_products(category, columns, page_size)
+
+    def iter_low_stock(self, threshold: int = 5, category: Optional[str] = None) -> Iterator[Dict]:
+        rows = self.dao.iter_low_stock(threshold, category=category)
+        if not self.journal:
+            return rows
+        # Buffered increments only raise stock, so they can only take rows off the list
+        return (r for r in map(self._project, rows) if (r.get("stock") or 0) <= threshold)
+
+    def flush_stock(self) -> Dict:
+        """
+        Write buffered stock increments now; returns {product_id: delta applied}.
+        """
+        return self.journal.flush() if self.journal else {}
+
+    def stock_journal_stats(self) -> Optional[Dict]:
+        return self.journal.journal_stats() if self.journal else None
+
+    def get_low_stock(self, threshold: int = 5, category: Optional[str] = None) -> List[Dict]:
+        return list(self.iter_low_stock(threshold, category))
+
+    def cache_stats(self) -> Dict:
+        return self.dao.cache_stats()
@@ -1,18 +1,52 @@
-from typing import List, Dict
-from src.dao.reporting_dao import ReportingDAO
+from typing import List, Dict, Optional
+from src.services.customer_summary_service import CustomerSummaryService
+from src.services.bestseller_service import BestsellerService
+from src.services.revenue_service import RevenueService
+from src.dao.instrumentation import instrumented
 
+@instrumented
 class ReportingService:
+    """
+    Reports read from the local rollups kept current by order_events
+    (revenue, customer summaries, best-sellers).
+    """
     def __init__(self):
-        self.dao = ReportingDAO()
+        self._summaries = None
+        self._bestsellers = None
+        self._revenue = None
 
-    def get_top_selling_products(self, top_n: int = 5) -> List[Dict]:
-        return self.dao.get_top_selling_products(top_n)
+    @property
+    def summaries(self) -> CustomerSummaryService:
+        # Order counts come from the customer summaries, not a scan of the orders table
+        if self._summaries is None:
+            self._summaries = CustomerSummaryService()
+        return self._summaries
 
-    def get_total_revenue_last_month(self) -> float:
-        return self.dao.get_total_revenue_last_month()
+    @property
+    def bestsellers(self) -> BestsellerService:
+        if self._bestsellers is None:
+            self._bestsellers = BestsellerService()
+        return self._bestsellers
+
+    @property
+    def revenue(self) -> RevenueService:
+        if self._revenue is None:
+            self._revenue = RevenueService()
+        return self._revenue
+
+    def get_top_selling_products(self, top_n: int = 5, hours: Optional[int] = None, days: Optional[int] = None,
+                                 by: str = "quantity") -> List[Dict]:
+        return self.bestsellers.top(top_n, hours, days, by)
 
     def get_order_count_per_customer(self) -> List[Dict]:
-        return self.dao.get_order_count_per_customer()
+        return self.summaries.order_count_per_customer()
 
     def get_customers_with_multiple_orders(self, min_orders: int = 2) -> List[Dict]:
-        return self.dao.get_customers_with_multiple_orders(min_orders)
\ No newline at end of file
+        return self.summaries.customers_with_multiple_orders(min_orders)
+
+    def rebuild(self) -> Dict:
+        """
+        Rebuild every rollup from the database (after a restore, or to repair drift).
+        """
+        return {"revenue": self.revenue.rebuild(), "customer_summaries": self.summaries.rebuild(),
+                "bestsellers": self.bestsellers.rebuild()}
@@ -0,0 +1,149 @@
+import threading
+import time
+from collections import defaultdict
+from datetime import date, datetime, timedelta, timezone
+from typing import Dict, List, Optional, Tuple
+from src.dao.order_dao import OrderDAO
+from src.dao.revenue_rollup_dao import RevenueRollupDAO
+from src.dao.local_store import to_epoch
+from src.dao.instrumentation import instrumented
+from src.services import order_events
+
+GRANULARITIES = ("day", "week", "month", "category")
+
+class RevenueServiceError(Exception):
+    pass
+
+def order_day(order: Dict) -> str:
+    return datetime.fromtimestamp(to_epoch(order.get("created_at")), tz=timezone.utc).date().isoformat()
+
+def split_by_category(order: Dict) -> List[Tuple[str, float, int]]:
+    """
+    Share the order total across its lines' categories in proportion to price * quantity.
+    """
+    amount = float(order.get("total_amount") or 0)
+    weights: Dict[str, float] = defaultdict(float)
+    units: Dict[str, int] = defaultdict(int)
+    for item in order.get("order_items") or []:
+        prod = item.get("products") or {}
+        category = prod.get("category") or "uncategorized"
+        weights[category] += float(prod.get("price") or 0) * item["quantity"]
+        units[category] += item["quantity"]
+    if not weights:
+        return [("uncategorized", amount, 0)]
+    total_weight = sum(weights.values())
+    return [(c, amount * w / total_weight if total_weight else amount / len(weights), units[c])
+            for c, w in weights.items()]
+
+def period_key(day: str, by: str) -> str:
+    if by == "month":
+        return day[:7]
+    if by == "week":
+        d = date.fromisoformat(day)
+        return (d - timedelta(days=d.weekday())).isoformat()  # Monday of that week
+    return day
+
+@instrumented
+class RevenueService:
+    """
+    Revenue reports read from daily rollups in the local store. Rollups are
+    updated as orders complete and payments are refunded (via order_events),
+    and can be rebuilt from the orders table in one streaming pass.
+    """
+    def __init__(self, rollup_dao: Optional[RevenueRollupDAO] = None):
+        self.rollup_dao = rollup_dao or RevenueRollupDAO()
+        self._order_dao = None
+
+    @property
+    def order_dao(self) -> OrderDAO:
+        if self._order_dao is None:
+            self._order_dao = OrderDAO()
+        return self._order_dao
+
+    def record_completed(self, order_id: int) -> bool:
+        order = self.order_dao.get_order_for_revenue(order_id)
+        return bool(order) and self._apply_completed(order)
+
+    def record_completed_many(self, order_ids: List[int]) -> int:
+        """
+        Count many completed orders, fetched with one request per chunk of ids.
+        """
+        if len(order_ids) == 1:
+            return int(self.record_completed(order_ids[0]))
+        return sum(self._apply_completed(order) for order in self.order_dao.get_orders_for_revenue(order_ids))
+
+    def _apply_completed(self, order: Dict) -> bool:
+        if order.get("status") != "COMPLETED":
+            return False
+        return self.rollup_dao.apply_order(order["order_id"], order_day(order),
+                                           float(order.get("total_amount") or 0), split_by_category(order))
+
+    def record_reversed(self, order_id: int) -> bool:
+        return self.rollup_dao.reverse_order(order_id)
+
+    def rebuild(self) -> Dict:
+        started = time.monotonic()
+        self.rollup_dao.clear()
+        counted = skipped = 0
+        for order in self.order_dao.iter_completed_orders_for_revenue():
+            if any((p or {}).get("status") == "REFUNDED" for p in (order.get("payments") or [])):
+                skipped += 1
+                continue
+            self.rollup_dao.apply_order(order["order_id"], order_day(order),
+                                        float(order.get("total_amount") or 0), split_by_category(order))
+            counted += 1
+        self.rollup_dao.set_meta("rebuilt_at", datetime.now(timezone.utc).isoformat())
+        return {"orders": counted, "refunded_skipped": skipped, "seconds": round(time.monotonic() - started, 3)}
+
+    def report(self, start: date, end: date, by: str = "day") -> List[Dict]:
+        """
+        Revenue for days start..end inclusive, grouped by day, week, month or category.
+        """
+        if by not in GRANULARITIES:
+            raise RevenueServiceError(f"Unknown grouping: {by} (use one of {', '.join(GRANULARITIES)})")
+        if end < start:
+            raise RevenueServiceError("--to must not be before --from")
+        # Orders this process just wrote are counted once their queued events are applied
+        order_events.flush()
+        if self.rollup_dao.get_meta("rebuilt_at") is None:
+            self.rebuild()
+        if by == "category":
+            return [{"category": r["category"], "revenue": round(r["revenue"], 2), "units": r["units"]}
+                    for r in self.rollup_dao.by_category(start.isoformat(), end.isoformat())]
+        grouped: Dict[str, Dict] = {}
+        for row in self.rollup_dao.daily(start.isoformat(), end.isoformat()):
+            key = period_key(row["day"], by)
+            g = grouped.setdefault(key, {by: key, "revenue": 0.0, "orders": 0})
+            g["revenue"] += row["revenue"]
+            g["orders"] += row["orders"]
+        for g in grouped.values():
+            g["revenue"] = round(g["revenue"], 2)
+        return list(grouped.values())
+
+    def total(self, start: date, end: date) -> float:
+        return round(float(sum(r["revenue"] for r in self.report(start, end, "day"))), 2)
+
+def last_month_range(today: Optional[date] = None) -> Tuple[date, date]:
+    today = today or datetime.now(timezone.utc).date()
+    last_day = today.replace(day=1) - timedelta(days=1)
+    return last_day.replace(day=1), last_day
+
+_service: Optional[RevenueService] = None
+_service_lock = threading.Lock()
+
+def _shared_service() -> RevenueService:
+    global _service
+    with _service_lock:
+        if _service is None:
+            _service = RevenueService()
+        return _service
+
+def _on_completed(payloads: List[Dict]) -> None:
+    _shared_service().record_completed_many([p["order"]["order_id"] for p in payloads])
+
+def _on_refunded(order_id: int, **_) -> None:
+    _shared_service().record_reversed(order_id)
+
+def register() -> None:
+    order_events.subscribe_batch(order_events.ORDER_COMPLETED, _on_completed)
+    order_events.subscribe(order_events.PAYMENT_REFUNDED, _on_refunded)
@@ -0,0 +1,44 @@
+import os
+import sys
+
+# Keep order events local to the test: no rollup subscribers writing to a store on disk
+os.environ.setdefault("ORDER_EVENT_SUBSCRIBERS", "")
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pytest
+from benchmarks.fake_supabase import FakeSupabase
+from src import config
+
+@pytest.fixture
+def backend():
+    """
+    An empty FakeSupabase installed as the client every DAO gets.
+    """
+    fake = FakeSupabase()
+    config.set_client_factory(lambda: fake)
+    yield fake
+    config.set_client_factory(None)
+
+def add_products(backend, *stocks):
+    backend.load("products", [{"name": f"p{i}", "sku": f"sku-{i}", "price": 10.0, "stock": stock, "category": None}
+                              for i, stock in enumerate(stocks)])
+    return [row["product_id"] for row in backend.tables["products"][-len(stocks):]]
+
+def add_order(backend, lines, status="PLACED", payment=None, customer_id=1, created_at=None):
+    """
+    An order with its items ({product_id: quantity}, priced at 10.0) and, if
+    payment is a status, one payment. Returns the order row.
+    """
+    if not backend.tables["customers"]:
+        backend.load("customers", [{"name": "c", "email": "c@example.com", "city": "Pune"}])
+    order = {"customer_id": customer_id, "status": status, "total_amount": 10.0 * sum(lines.values())}
+    if created_at:
+        order["created_at"] = created_at
+    backend.load("orders", [order])
+    order = backend.tables["orders"][-1]
+    backend.load("order_items", [{"order_id": order["order_id"], "product_id": pid, "quantity": qty}
+                                 for pid, qty in lines.items()])
+    if payment:
+        backend.load("payments", [{"order_id": order["order_id"], "amount": order["total_amount"],
+                                   "status": payment, "method": None}])
+    return order
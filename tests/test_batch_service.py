@@ -0,0 +1,53 @@
+from conftest import add_order, add_products
+from src.services import order_events
+from src.services.batch_service import BatchOrderService
+
+def results(summary):
+    return {r["order_id"]: r.get("error") or "ok" for r in summary["results"]}
+
+def status(backend, table, key, value):
+    return next(r["status"] for r in backend.tables[table] if r[key] == value)
+
+def test_complete_orders_in_few_requests(backend):
+    (pid,) = add_products(backend, 100)
+    placed = [add_order(backend, {pid: 1})["order_id"] for _ in range(30)]
+    done = add_order(backend, {pid: 1}, status="CANCELLED")["order_id"]
+    backend.reset_calls()
+    summary = BatchOrderService(chunk_size=50).complete_orders(placed + [done, 999])
+    assert summary["succeeded"] == 30
+    assert results(summary)[999] == "Order not found" and results(summary)[done] != "ok"
+    assert backend.round_trips <= 3
+
+def test_cancel_orders_gives_stock_back(backend):
+    (pid,) = add_products(backend, 5)
+    oids = [add_order(backend, {pid: 2})["order_id"] for _ in range(3)]
+    summary = BatchOrderService().cancel_orders(oids)
+    assert summary["succeeded"] == 3
+    assert backend.tables["products"][0]["stock"] == 11
+
+def test_process_payments_only_moves_pending(backend):
+    (pid,) = add_products(backend, 10)
+    pending = add_order(backend, {pid: 1}, payment="PENDING")["order_id"]
+    refunded = add_order(backend, {pid: 1}, payment="REFUNDED")["order_id"]
+    summary = BatchOrderService().process_payments([pending, refunded], "UPI")
+    assert results(summary) == {pending: "ok", refunded: "Payment already processed for order"}
+    assert status(backend, "payments", "order_id", refunded) == "REFUNDED"
+    assert status(backend, "orders", "order_id", pending) == "COMPLETED"
+
+def test_refund_payments_only_refunds_paid(backend):
+    (pid,) = add_products(backend, 10)
+    paid = add_order(backend, {pid: 1}, status="COMPLETED", payment="PAID")["order_id"]
+    pending = add_order(backend, {pid: 1}, payment="PENDING")["order_id"]
+    refunded = add_order(backend, {pid: 1}, status="COMPLETED", payment="REFUNDED")["order_id"]
+    seen = []
+    handler = lambda order_id, **_: seen.append(order_id)
+    order_events.subscribe(order_events.PAYMENT_REFUNDED, handler)
+    try:
+        summary = BatchOrderService().refund_payments([paid, pending, refunded])
+        order_events.flush()
+    finally:
+        order_events.unsubscribe(order_events.PAYMENT_REFUNDED, handler)
+    assert results(summary)[paid] == "ok" and seen == [paid]
+    assert results(summary)[refunded] == "Payment already refunded"
+    assert "PENDING" in results(summary)[pending]
+    assert status(backend, "payments", "order_id", pending) == "PENDING"
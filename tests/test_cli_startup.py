@@ -0,0 +1,32 @@
+import json
+import os
+import subprocess
+import sys
+
+from benchmarks.bench_startup import HEAVY_MODULES, ROOT
+
+# Generous bound on importing the CLI and parsing a command (interpreter start excluded)
+CLI_IMPORT_BUDGET_MS = float(os.getenv("CLI_IMPORT_BUDGET_MS", "300"))
+
+PROBE = """
+import json, sys, time
+start = time.perf_counter()
+from src.cli.main import RetailCLI
+RetailCLI().parser.parse_args(["product", "list"])
+elapsed = (time.perf_counter() - start) * 1000
+print(json.dumps({"ms": elapsed, "modules": sorted(sys.modules)}))
+"""
+
+def probe():
+    out = subprocess.run([sys.executable, "-c", PROBE], cwd=ROOT, capture_output=True, text=True, check=True)
+    return json.loads(out.stdout)
+
+def test_cli_import_loads_no_heavy_modules():
+    modules = probe()["modules"]
+    heavy = [m for m in modules if m.split(".")[0] in HEAVY_MODULES]
+    services = [m for m in modules if m.startswith("src.services")]
+    assert heavy == [] and services == []
+
+def test_cli_import_time_is_bounded():
+    # Best of three, so one slow start on a busy machine doesn't fail the suite
+    assert min(probe()["ms"] for _ in range(3)) < CLI_IMPORT_BUDGET_MS
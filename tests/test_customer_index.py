@@ -0,0 +1,22 @@
+from src.dao.customer_index import CustomerIndex, IndexedCustomerDAO
+
+def test_lookups_see_customers_created_after_warm(backend):
+    backend.load("customers", [{"name": "a", "email": "a@example.com", "city": "Pune"}])
+    dao = IndexedCustomerDAO(CustomerIndex(capacity=1000))
+    assert dao.warm() == 1
+    # Another worker's signup: this process's index has not seen it
+    backend.load("customers", [{"name": "b", "email": "b@example.com", "city": "Pune"}])
+    assert dao.get_customer_by_email("b@example.com")["name"] == "b"
+    assert not dao.email_available("b@example.com")
+    assert dao.search_customers(email="b@example.com")[0]["name"] == "b"
+    assert dao.email_available("nobody@example.com")
+
+def test_existing_emails_only_asks_about_possible_matches(backend):
+    backend.load("customers", [{"name": "a", "email": "a@example.com", "city": "Pune"}])
+    dao = IndexedCustomerDAO(CustomerIndex(capacity=1000))
+    dao.warm()
+    backend.reset_calls()
+    assert dao.existing_emails(["new@example.com"]) == set()
+    assert backend.calls == {}
+    assert dao.existing_emails(["a@example.com", "new@example.com"]) == {"a@example.com"}
+    assert backend.calls == {("customers", "select"): 1}
@@ -0,0 +1,65 @@
+import json
+import pytest
+from benchmarks.fake_supabase import FakeAPIError
+from conftest import add_products
+from src.services.import_service import ImportService, ImportServiceError
+
+@pytest.fixture(autouse=True)
+def no_backoff(monkeypatch):
+    monkeypatch.setattr("src.dao.retry.DB_RETRY_BACKOFF", 0)
+
+def write_products(tmp_path, lines):
+    path = tmp_path / "products.csv"
+    path.write_text("name,sku,price,stock\n" + "".join(line + "\n" for line in lines))
+    return str(path)
+
+def test_bad_rows_are_rejected_and_the_rest_written(backend, tmp_path):
+    add_products(backend, 1)  # sku-0
+    path = write_products(tmp_path, ["a,s1,1.5,3", "b,s1,1.5,3", "c,s2,free,3", "d,sku-0,2,1", "e,s3,2,"])
+    rejects = tmp_path / "rejects.jsonl"
+    stats = ImportService(batch_size=2, workers=1).import_products(path, rejects_path=str(rejects))
+    assert (stats["read"], stats["inserted"], stats["rejected"]) == (5, 2, 3)
+    assert [r["sku"] for r in backend.tables["products"]] == ["sku-0", "s1", "s3"]
+    reasons = {r["line"]: r["reason"] for r in map(json.loads, rejects.read_text().splitlines())}
+    assert reasons == {3: "Duplicate sku in file: s1", 4: "Invalid price: 'free'", 5: "sku already exists: sku-0"}
+
+def test_integrity_error_bisects_down_to_the_bad_row(backend, tmp_path):
+    path = write_products(tmp_path, [f"p{i},s{i},1.5,3" for i in range(8)])
+    svc = ImportService(batch_size=8, workers=1)
+    backend.load("products", [{"name": "racer", "sku": "s5", "price": 1.0, "stock": 0}])
+    # Created after the existence check ran: only the insert's unique violation catches it
+    svc.product_dao.existing_skus = lambda skus: set()
+    stats = svc.import_products(path)
+    assert (stats["inserted"], stats["rejected"]) == (7, 1)
+    assert sorted(r["sku"] for r in backend.tables["products"]) == sorted(f"s{i}" for i in range(8))
+
+def test_transient_write_failures_are_retried_not_bisected(backend, tmp_path):
+    path = write_products(tmp_path, [f"p{i},s{i},1.5,3" for i in range(4)])
+    svc = ImportService(batch_size=4, workers=1)
+    insert, calls = svc.product_dao.bulk_create_products, []
+
+    def flaky(rows, upsert):
+        calls.append(len(rows))
+        if len(calls) == 1:
+            raise FakeAPIError("bad gateway", "503")
+        return insert(rows, upsert)
+    svc.product_dao.bulk_create_products = flaky
+    assert svc.import_products(path, upsert=True)["inserted"] == 4
+    assert calls == [4, 4]
+
+    def down(rows, upsert):
+        raise FakeAPIError("bad gateway", "503")
+    svc.product_dao.bulk_create_products = down
+    with pytest.raises(ImportServiceError, match="Failed to write rows"):
+        svc.import_products(path, upsert=True)
+
+def test_failed_existence_check_aborts_the_import(backend, tmp_path):
+    path = write_products(tmp_path, ["a,s1,1.5,3"])
+    svc = ImportService(workers=1)
+
+    def broken(skus):
+        raise FakeAPIError("permission denied", "42501")
+    svc.product_dao.existing_skus = broken
+    with pytest.raises(ImportServiceError, match="Failed to check existing skus"):
+        svc.import_products(path)
+    assert backend.tables["products"] == []
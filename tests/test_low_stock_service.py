@@ -0,0 +1,21 @@
+from conftest import add_products
+from src.dao.stock_dao import StockDAO
+from src.services.low_stock_service import LowStockMonitor
+
+def test_listener_defers_lookup_of_untracked_products(backend):
+    toy, other = add_products(backend, 20, 20)
+    backend.tables["products"][0]["category"] = "Toys"
+    monitor = LowStockMonitor(default_threshold=5, category_thresholds={"Toys": 10})
+    try:
+        assert monitor.refresh() == []
+        stock = StockDAO(use_rpc=False)
+        backend.reset_calls()
+        stock.adjust_stock(toy, -12)
+        stock.adjust_stock(other, -12)
+        # Only the stock writes themselves: the listener made no request
+        assert backend.calls == {("products", "select"): 2, ("products", "update"): 2}
+        assert [(r["product_id"], r["stock"]) for r in monitor.poll()] == [(toy, 8)]
+        stock.adjust_stock(toy, -3)
+        assert monitor.lowest(1)[0]["stock"] == 5
+    finally:
+        monitor.close()
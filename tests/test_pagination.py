@@ -0,0 +1,38 @@
+from conftest import add_products
+from src.dao.customer_dao import CustomerDAO
+from src.dao.pagination import iter_keyset, with_key
+from src.dao.product_dao import ProductDAO
+
+def test_iter_keyset_walks_every_row_one_page_at_a_time(backend):
+    ids = add_products(backend, *range(7))
+    backend.reset_calls()
+    rows = list(iter_keyset(backend, "products", "product_id", "stock", page_size=3))
+    assert [r["product_id"] for r in rows] == ids
+    # Three full-or-partial pages; the last short page ends the scan
+    assert backend.calls == {("products", "select"): 3}
+    assert [r["product_id"] for r in iter_keyset(backend, "products", "product_id", page_size=3,
+                                                 after=ids[4])] == ids[5:]
+    assert with_key("stock", "product_id") == "product_id, stock"
+    assert with_key("product_id, stock", "product_id") == "product_id, stock"
+
+def test_filters_apply_to_every_page(backend):
+    add_products(backend, *range(10))
+    rows = iter_keyset(backend, "products", "product_id", "stock", page_size=2,
+                       filters=lambda q: q.gte("stock", 5))
+    assert [r["stock"] for r in rows] == [5, 6, 7, 8, 9]
+
+def test_list_stops_at_limit(backend):
+    add_products(backend, *range(10))
+    backend.reset_calls()
+    assert len(ProductDAO().list_products(limit=4)) == 4
+    assert backend.calls == {("products", "select"): 1}
+
+def test_search_matches_wildcards_literally_and_resumes_after(backend):
+    backend.load("customers", [{"name": n, "email": f"{n}@example.com", "city": c}
+                               for n, c in [("a_1", "Pune"), ("ab1", "pune"), ("a_2", "Delhi"), ("a_3", "PUNE")]])
+    dao = CustomerDAO()
+    assert [c["name"] for c in dao.search_customers(name="a_", prefix=True)] == ["a_1", "a_2", "a_3"]
+    page = dao.search_customers(city="pune", ignore_case=True, limit=2)
+    assert [c["name"] for c in page] == ["a_1", "ab1"]
+    rest = dao.search_customers(city="pune", ignore_case=True, after=page[-1]["customer_id"])
+    assert [c["name"] for c in rest] == ["a_3"]
@@ -0,0 +1,75 @@
+import pytest
+from src.services import order_events
+from src.services.payment_service import PaymentService, PaymentServiceError
+
+@pytest.fixture
+def order(backend):
+    backend.load("customers", [{"name": "a", "email": "a@example.com"}])
+    backend.load("orders", [{"customer_id": 1, "status": "PLACED", "total_amount": 20.0}])
+    backend.load("payments", [{"order_id": 1, "amount": 20.0, "status": "PENDING", "method": None}])
+    return backend.tables["orders"][0]
+
+@pytest.fixture
+def service(backend, monkeypatch):
+    svc = PaymentService()
+    monkeypatch.setattr(svc.payment_dao, "use_rpc", False)
+    return svc
+
+def test_repeat_with_same_key_returns_original_result(service, order):
+    first = service.process_payment(order["order_id"], "Card", idempotency_key="k1")
+    again = service.process_payment(order["order_id"], "Card", idempotency_key="k1")
+    assert again["payment"]["payment_id"] == first["payment"]["payment_id"]
+    assert again["order"]["status"] == "COMPLETED"
+
+def test_other_key_or_no_key_is_rejected(service, order):
+    service.process_payment(order["order_id"], "Card", idempotency_key="k1")
+    with pytest.raises(PaymentServiceError, match="already processed"):
+        service.process_payment(order["order_id"], "Card", idempotency_key="k2")
+    with pytest.raises(PaymentServiceError):
+        service.process_payment(order["order_id"], "Card")
+
+def test_retry_finishes_a_payment_interrupted_before_completing(service, order, backend):
+    # The payment was marked PAID but the order update never happened
+    service.payment_dao.mark_paid(1, "UPI", "k1")
+    result = service.process_payment(order["order_id"], "UPI", idempotency_key="k1")
+    assert result["order"]["status"] == "COMPLETED"
+    assert [p["status"] for p in backend.tables["payments"]] == ["PAID"]
+
+@pytest.fixture
+def completed_events():
+    seen = []
+    handler = lambda order, **_: seen.append(order["order_id"])
+    order_events.subscribe(order_events.ORDER_COMPLETED, handler)
+    yield seen
+    order_events.unsubscribe(order_events.ORDER_COMPLETED, handler)
+
+def test_second_call_without_key_is_rejected(service, order, completed_events):
+    service.process_payment(order["order_id"], "Cash")
+    with pytest.raises(PaymentServiceError, match="already processed"):
+        service.process_payment(order["order_id"], "Cash")
+    order_events.flush()
+    assert completed_events == [order["order_id"]]
+
+def test_paid_payment_without_key_is_not_finished(service, order, backend):
+    # Paid by someone else (no key): a keyless caller must not be told it succeeded
+    service.payment_dao.mark_paid(1, "UPI", None)
+    with pytest.raises(PaymentServiceError, match="already processed"):
+        service.process_payment(order["order_id"], "UPI")
+    assert backend.tables["orders"][0]["status"] == "PLACED"
+
+def test_completion_is_published_once(service, order, completed_events):
+    paid = service.payment_dao.mark_paid(1, "Card", "k1")
+    service._complete_paid_order(order["order_id"], paid)
+    # A racing worker finds the order already completed
+    result = service._complete_paid_order(order["order_id"], paid)
+    assert result["order"]["status"] == "COMPLETED"
+    order_events.flush()
+    assert completed_events == [order["order_id"]]
+
+def test_refund_requires_a_paid_payment(service, order):
+    with pytest.raises(PaymentServiceError, match="Only PAID"):
+        service.refund_payment(order["order_id"])
+    service.process_payment(order["order_id"], "Card", idempotency_key="k1")
+    assert service.refund_payment(order["order_id"])["status"] == "REFUNDED"
+    with pytest.raises(PaymentServiceError, match="already refunded"):
+        service.refund_payment(order["order_id"])
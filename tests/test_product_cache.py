@@ -0,0 +1,55 @@
+from conftest import add_products
+from src.dao.product_cache import CachedProductDAO, ProductCache
+from src.dao.stock_dao import StockDAO, add_stock_listener, remove_stock_listener
+
+def test_read_through_serves_repeat_reads_from_memory(backend):
+    pid, = add_products(backend, 7)
+    dao = CachedProductDAO(ProductCache(capacity=10))
+    backend.reset_calls()
+    assert dao.get_product_by_id(pid)["stock"] == 7
+    assert dao.get_product_by_id(pid)["stock"] == 7
+    assert backend.calls == {("products", "select"): 1}
+    assert dao.cache_stats()["hits"] == 1
+
+def test_stale_stock_rereads_only_stock(backend):
+    pid, = add_products(backend, 7)
+    dao = CachedProductDAO(ProductCache(capacity=10, stock_ttl=0))
+    dao.get_product_by_id(pid)
+    backend.tables["products"][0]["stock"] = 3
+    backend.tables["products"][0]["name"] = "renamed elsewhere"
+    row = dao.get_product_by_id(pid)
+    assert (row["stock"], row["name"]) == (3, "p0")
+    assert dao.get_product_by_id(pid, fresh_stock=False)["stock"] == 3
+    assert dao.cache_stats()["stock_refreshes"] == 1
+
+def test_stock_changes_and_writes_keep_the_cache_in_step(backend):
+    pid, = add_products(backend, 7)
+    cache = ProductCache(capacity=10)
+    dao = CachedProductDAO(cache)
+    add_stock_listener(cache.set_stock)
+    try:
+        dao.get_product_by_id(pid)
+        StockDAO(use_rpc=False).adjust_stock(pid, -2)
+        backend.reset_calls()
+        assert dao.get_product_by_id(pid)["stock"] == 5
+        assert backend.calls == {}
+    finally:
+        remove_stock_listener(cache.set_stock)
+    dao.update_product(pid, {"price": 12.5})
+    assert dao.get_product_by_id(pid)["price"] == 12.5
+    assert dao.delete_product(pid)
+    assert dao.get_product_by_id(pid) is None
+
+def test_least_recently_used_rows_are_evicted(backend):
+    a, b, c = add_products(backend, 1, 2, 3)
+    dao = CachedProductDAO(ProductCache(capacity=2))
+    dao.get_product_by_id(a)
+    dao.get_product_by_id(b)
+    dao.get_product_by_id(a)
+    dao.get_product_by_id(c)
+    backend.reset_calls()
+    dao.get_product_by_id(a)
+    assert backend.calls == {}
+    dao.get_product_by_id(b)
+    assert backend.calls == {("products", "select"): 1}
+    assert dao.cache_stats()["evictions"] == 2
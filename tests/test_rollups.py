@@ -0,0 +1,98 @@
+from collections import defaultdict
+from datetime import datetime, timezone
+import pytest
+from conftest import add_products
+from src.dao.local_store import LocalStore
+from src.dao.bestseller_dao import BestsellerDAO
+from src.dao.customer_summary_dao import CustomerSummaryDAO
+from src.dao.revenue_rollup_dao import RevenueRollupDAO
+from src.services import bestseller_service, customer_summary_service, order_events, revenue_service
+from src.services.order_service import OrderService
+from src.services.payment_service import PaymentService
+
+@pytest.fixture
+def store(tmp_path):
+    store = LocalStore(str(tmp_path / "local.db"))
+    yield store
+    store.close()
+
+@pytest.fixture
+def events(monkeypatch):
+    """
+    A private subscriber registry, so register() calls don't outlive the test.
+    """
+    monkeypatch.setattr(order_events, "_subscribers", defaultdict(list))
+    monkeypatch.setattr(order_events, "_batch_subscribers", defaultdict(list))
+    yield
+    order_events.flush()
+
+def subscribe(monkeypatch, module, service):
+    monkeypatch.setattr(module, "_service", service)
+    module.register()
+    return service
+
+def place_orders(backend):
+    """
+    Three orders from one customer: completed, cancelled, and completed then refunded.
+    """
+    a, b = add_products(backend, 50, 50)
+    backend.load("customers", [{"name": "c", "email": "c@example.com", "city": "Pune"}])
+    orders, payments = OrderService(), PaymentService()
+
+    def pay(order):
+        payments.create_pending_payment(order["order_id"], order["total_amount"])
+        payments.process_payment(order["order_id"], "Card")
+    kept = orders.create_order(1, [{"prod_id": a, "quantity": 2}, {"prod_id": b, "quantity": 1}])
+    pay(kept)
+    cancelled = orders.create_order(1, [{"prod_id": b, "quantity": 5}])
+    orders.cancel_order(cancelled["order_id"])
+    refunded = orders.create_order(1, [{"prod_id": a, "quantity": 1}])
+    pay(refunded)
+    payments.refund_payment(refunded["order_id"])
+    return a, b
+
+def today():
+    return datetime.now(timezone.utc).date()
+
+def test_revenue_rollups_follow_events_and_match_a_rebuild(backend, store, events, monkeypatch):
+    svc = subscribe(monkeypatch, revenue_service, revenue_service.RevenueService(RevenueRollupDAO(store)))
+    svc.rebuild()
+    place_orders(backend)
+    # Only the completed, unrefunded order counts
+    assert svc.report(today(), today()) == [{"day": today().isoformat(), "revenue": 30.0, "orders": 1}]
+    assert svc.report(today(), today(), by="category") == [{"category": "uncategorized", "revenue": 30.0, "units": 3}]
+    live = svc.report(today(), today(), by="month")
+    svc.rebuild()
+    assert svc.report(today(), today(), by="month") == live
+
+def test_customer_summaries_follow_events_and_match_a_rebuild(backend, store, events, monkeypatch):
+    svc = subscribe(monkeypatch, customer_summary_service,
+                    customer_summary_service.CustomerSummaryService(CustomerSummaryDAO(store)))
+    svc.rebuild()
+    place_orders(backend)
+    backend.reset_calls()
+    live = svc.get_summary(1)
+    assert backend.calls == {}
+    assert (live["order_count"], live["lifetime_value"], live["refunded"]) == (3, 30.0, 1)
+    assert live["by_status"] == {"CANCELLED": 1, "COMPLETED": 2}
+    assert svc.customers_with_multiple_orders(2) == [{"customer_id": 1, "order_count": 3}]
+    svc.rebuild()
+    assert svc.get_summary(1) == live
+    with pytest.raises(customer_summary_service.CustomerSummaryServiceError):
+        svc.get_summary(99)
+
+def test_bestsellers_follow_events_and_match_a_rebuild(backend, store, events, monkeypatch):
+    svc = subscribe(monkeypatch, bestseller_service, bestseller_service.BestsellerService(BestsellerDAO(store)))
+    svc.rebuild()
+    a, b = place_orders(backend)
+    backend.reset_calls()
+    # The cancelled order's lines are taken back out; a refund doesn't un-sell anything
+    live = svc.top(5)
+    assert live == [{"product_id": a, "sum_quantity": 3, "revenue": 30.0},
+                    {"product_id": b, "sum_quantity": 1, "revenue": 10.0}]
+    assert svc.top(1, hours=1, by="revenue") == live[:1]
+    assert backend.calls == {}
+    svc.rebuild()
+    assert svc.top(5) == live
+    with pytest.raises(bestseller_service.BestsellerServiceError):
+        svc.top(5, hours=1, days=1)
@@ -0,0 +1,121 @@
+import threading
+
+import pytest
+from benchmarks.fake_supabase import FakeQuery, FakeResponse
+from conftest import add_products
+from src.dao import stock_dao
+from src.dao.stock_dao import StockDAO, InMemoryStockDAO, StockDAOError, InsufficientStockError, StockRollbackError
+
+def stock(backend, prod_id):
+    return next(r["stock"] for r in backend.tables["products"] if r["product_id"] == prod_id)
+
+def run_threads(n, fn):
+    errors = []
+    def target(i):
+        try:
+            fn(i)
+        except Exception as e:
+            errors.append(e)
+    threads = [threading.Thread(target=target, args=(i,)) for i in range(n)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    return errors
+
+@pytest.fixture(autouse=True)
+def no_backoff(monkeypatch):
+    monkeypatch.setattr(stock_dao, "STOCK_CAS_BACKOFF", 0.0)
+
+def test_reserve_takes_every_line(backend):
+    a, b = add_products(backend, 5, 5)
+    dao = StockDAO(use_rpc=False)
+    assert dao.reserve([{"prod_id": a, "quantity": 2}, {"prod_id": b, "quantity": 1},
+                        {"prod_id": a, "quantity": 1}]) == {a: 2, b: 4}
+
+def test_reserve_rolls_back_taken_lines(backend):
+    a, b = add_products(backend, 5, 1)
+    dao = StockDAO(use_rpc=False)
+    with pytest.raises(InsufficientStockError):
+        dao.reserve([{"prod_id": a, "quantity": 2}, {"prod_id": b, "quantity": 3}])
+    assert (stock(backend, a), stock(backend, b)) == (5, 1)
+
+def test_failed_rollback_reports_unreleased_products(backend, monkeypatch, caplog):
+    a, b, c = add_products(backend, 5, 5, 0)
+    dao = StockDAO(use_rpc=False)
+    adjust = dao.adjust_stock
+
+    def flaky(prod_id, delta):
+        if prod_id == b and delta > 0:
+            raise ConnectionError("connection reset")
+        return adjust(prod_id, delta)
+    monkeypatch.setattr(dao, "adjust_stock", flaky)
+
+    with pytest.raises(StockRollbackError) as info:
+        dao.reserve([{"prod_id": a, "quantity": 1}, {"prod_id": b, "quantity": 2}, {"prod_id": c, "quantity": 1}])
+    assert info.value.unreleased == {b: 2}
+    assert isinstance(info.value.__cause__, InsufficientStockError)
+    assert (stock(backend, a), stock(backend, b)) == (5, 3)
+    assert "rollback" in caplog.text
+
+def test_concurrent_adjust_stock_loses_no_update(backend):
+    backend.latency = 0.001
+    (pid,) = add_products(backend, 0)
+    dao = StockDAO(use_rpc=False, max_retries=200)
+    errors = run_threads(8, lambda i: [dao.adjust_stock(pid, 1) for _ in range(5)])
+    assert errors == []
+    assert stock(backend, pid) == 40
+
+def test_concurrent_reserve_never_oversells(backend):
+    backend.latency = 0.001
+    (pid,) = add_products(backend, 5)
+    dao = StockDAO(use_rpc=False, max_retries=200)
+    errors = run_threads(8, lambda i: dao.reserve([{"prod_id": pid, "quantity": 1}]))
+    assert len(errors) == 3 and all(isinstance(e, InsufficientStockError) for e in errors)
+    assert stock(backend, pid) == 0
+
+def test_adjust_stock_gives_up_after_max_retries(backend, monkeypatch):
+    (pid,) = add_products(backend, 5)
+    dao = StockDAO(use_rpc=False, max_retries=3)
+    execute = FakeQuery.execute
+
+    def always_conflict(query):
+        # Every conditional update finds the stock already changed
+        return FakeResponse([]) if query._op == "update" else execute(query)
+    monkeypatch.setattr(FakeQuery, "execute", always_conflict)
+    with pytest.raises(StockDAOError, match="changed too often"):
+        dao.adjust_stock(pid, 1)
+    assert stock(backend, pid) == 5
+
+def test_in_memory_reserve_is_all_or_nothing():
+    dao = InMemoryStockDAO({1: 5, 2: 1})
+    with pytest.raises(InsufficientStockError):
+        dao.reserve([{"prod_id": 1, "quantity": 2}, {"prod_id": 2, "quantity": 3}])
+    assert (dao.get_stock(1), dao.get_stock(2)) == (5, 1)
+
+def test_in_memory_concurrent_reserve_and_release():
+    dao = InMemoryStockDAO({1: 50, 2: 50})
+    # Opposite line order on alternate threads: per-product locks are taken sorted, so no deadlock
+    def order(i):
+        lines = [{"prod_id": 1, "quantity": 1}, {"prod_id": 2, "quantity": 1}]
+        for _ in range(20):
+            dao.reserve(lines if i % 2 else lines[::-1])
+            dao.release(lines)
+    assert run_threads(8, order) == []
+    assert (dao.get_stock(1), dao.get_stock(2)) == (50, 50)
+
+def test_reserve_is_one_rpc_call_by_default(backend):
+    a, b = add_products(backend, 5, 5)
+    dao = StockDAO()
+    assert dao.reserve([{"prod_id": a, "quantity": 2}, {"prod_id": b, "quantity": 1}]) == {a: 3, b: 4}
+    assert backend.calls == {("rpc", "reserve_stock"): 1}
+    with pytest.raises(InsufficientStockError):
+        dao.reserve([{"prod_id": a, "quantity": 1}, {"prod_id": b, "quantity": 9}])
+    assert (stock(backend, a), stock(backend, b)) == (3, 4)
+
+def test_falls_back_when_stock_functions_are_missing(backend):
+    del backend.functions["reserve_stock"]
+    (pid,) = add_products(backend, 5)
+    dao = StockDAO()
+    assert dao.reserve([{"prod_id": pid, "quantity": 2}]) == {pid: 3}
+    assert not dao.use_rpc
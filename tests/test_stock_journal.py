@@ -0,0 +1,58 @@
+from conftest import add_products
+from src.dao.stock_dao import StockDAO
+from src.dao.stock_journal import BufferedStockDAO, StockJournal
+
+def journal(tmp_path, stock_dao=None, **kwargs):
+    kwargs.setdefault("interval", 0)
+    return StockJournal(stock_dao or StockDAO(use_rpc=False), str(tmp_path / "stock.log"), **kwargs)
+
+def test_increments_are_coalesced_into_one_write_per_product(backend, tmp_path):
+    a, b = add_products(backend, 0, 0)
+    j = journal(tmp_path)
+    for pid, delta in [(a, 1), (a, 2), (b, 5), (a, 3)]:
+        j.add(pid, delta)
+    assert backend.round_trips == 0
+    assert j.flush() == {a: 6, b: 5}
+    assert [r["stock"] for r in backend.tables["products"]] == [6, 5]
+    assert backend.calls[("products", "update")] == 2
+    assert j.journal_stats()["writes_saved"] == 2
+    j.close()
+
+def test_rpc_mode_flushes_with_one_release_call(backend, tmp_path):
+    a, b = add_products(backend, 0, 0)
+    j = journal(tmp_path, StockDAO(use_rpc=True))
+    j.add_many({a: 2, b: 3})
+    backend.reset_calls()
+    j.flush()
+    assert backend.calls == {("rpc", "release_stock"): 1}
+    assert [r["stock"] for r in backend.tables["products"]] == [2, 3]
+    j.close()
+
+def test_unflushed_deltas_are_recovered_from_the_journal(backend, tmp_path):
+    a, b = add_products(backend, 0, 0)
+    j = journal(tmp_path)
+    j.add(a, 4)
+    j.add(b, 1)
+    j.flush([b])
+    j.add(a, 1)
+    # Crash: the process goes away without flushing
+    j._file.write("A 99")
+    j._file.close()
+    recovered = journal(tmp_path)
+    assert recovered.pending() == {a: 5}
+    recovered.close()
+    assert [r["stock"] for r in backend.tables["products"]] == [5, 1]
+    assert journal(tmp_path).pending() == {}
+
+def test_buffered_dao_flushes_before_stock_is_needed(backend, tmp_path):
+    a, = add_products(backend, 1)
+    dao = BufferedStockDAO(StockDAO(use_rpc=False), journal(tmp_path, max_pending=100))
+    assert dao.adjust_stock(a, 4) is None
+    assert dao.get_stock(a) == 5
+    assert backend.tables["products"][0]["stock"] == 1
+    # Needs the buffered units: flushed, then the reservation is retried
+    assert dao.reserve([{"product_id": a, "quantity": 3}]) == {a: 2}
+    assert backend.tables["products"][0]["stock"] == 2
+    dao.release([{"product_id": a, "quantity": 2}])
+    assert dao.adjust_stock(a, -4) == 0
+    dao.journal.close()